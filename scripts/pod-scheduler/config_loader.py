@@ -4,9 +4,12 @@ JSON configuration loader for pod-based scheduling.
 
 import json
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List, Set
 
 from models import (
+    CoalesceSettings,
+    DeadlineSettings,
+    HealthSettings,
     PipelineSettings,
     Pod,
     Scenario,
@@ -22,6 +25,58 @@ class ConfigError(ValueError):
 _CRON_HOUR_RE = re.compile(r"^\d+(/\d+)?$")
 
 
+def _validate_sequencing(scenarios: List[Scenario]) -> None:
+    """Check ``after`` / ``reuses`` references and reject cycles."""
+    by_name = {sc.name: sc for sc in scenarios}
+    edges: Dict[str, Set[str]] = {}
+    for sc in scenarios:
+        for other in list(sc.after) + list(sc.reuses):
+            if other not in by_name:
+                raise ConfigError(
+                    f"scenario '{sc.name}' is sequenced after unknown "
+                    f"scenario '{other}'"
+                )
+            if other == sc.name:
+                raise ConfigError(
+                    f"scenario '{sc.name}' is sequenced after itself"
+                )
+            if by_name[other].filler:
+                raise ConfigError(
+                    f"scenario '{sc.name}' is sequenced after filler "
+                    f"scenario '{other}'"
+                )
+            edges.setdefault(sc.name, set()).add(other)
+        if sc.filler and (sc.after or sc.reuses):
+            raise ConfigError(
+                f"filler scenario '{sc.name}' cannot be sequenced"
+            )
+        for other, minutes in sc.reuses.items():
+            if minutes <= 0 or minutes >= sc.estimated_runtime:
+                raise ConfigError(
+                    f"scenario '{sc.name}' reuses '{other}' for {minutes} "
+                    f"min; must be positive and below its estimated_runtime"
+                )
+
+    # Depth-first search for a cycle; 1 = on the current path, 2 = done.
+    state: Dict[str, int] = {}
+
+    def visit(name: str, path: List[str]) -> None:
+        state[name] = 1
+        for other in sorted(edges.get(name, ())):
+            if state.get(other) == 1:
+                cycle = path[path.index(other):] + [name, other]
+                raise ConfigError(
+                    f"scenario sequencing has a cycle: {' -> '.join(cycle)}"
+                )
+            if other not in state:
+                visit(other, path + [name])
+        state[name] = 2
+
+    for name in sorted(edges):
+        if name not in state:
+            visit(name, [])
+
+
 def _require(node: Dict[str, Any], key: str, context: str) -> Any:
     if key not in node:
         raise ConfigError(f"Missing required field '{key}' in {context}")
@@ -47,7 +102,11 @@ def load_config(path: str) -> ScheduleConfig:
     """Load and validate a pod-scheduler JSON configuration file."""
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    return parse_config(data)
+
 
+def parse_config(data: Dict[str, Any]) -> ScheduleConfig:
+    """Validate an already-decoded configuration document."""
     metadata = _require(data, "metadata", "config root")
     schedule = _require(metadata, "schedule", "metadata")
     _validate_cron(schedule)
@@ -71,8 +130,53 @@ def load_config(path: str) -> ScheduleConfig:
             "service_bus_namespace",
             PipelineSettings.service_bus_namespace,
         ),
+        join_jobs=bool(pipeline_meta.get("join_jobs", False)),
+        lease_connection=pipeline_meta.get("lease_connection") or None,
     )
 
+    job_overhead = float(metadata.get("job_overhead_minutes", 0))
+    if job_overhead < 0:
+        raise ConfigError(
+            f"metadata.job_overhead_minutes must be >= 0, got {job_overhead}"
+        )
+
+    coalesce = None
+    coalesce_meta = metadata.get("coalescing")
+    if coalesce_meta is not None:
+        coalesce = CoalesceSettings(
+            max_run_minutes=float(coalesce_meta.get(
+                "max_run_minutes", CoalesceSettings.max_run_minutes
+            )),
+            max_job_minutes=float(coalesce_meta.get(
+                "max_job_minutes", CoalesceSettings.max_job_minutes
+            )),
+        )
+        if coalesce.max_run_minutes <= 0 or coalesce.max_job_minutes <= 0:
+            raise ConfigError(
+                "metadata.coalescing limits must be positive"
+            )
+
+    deadlines = None
+    deadlines_meta = metadata.get("deadlines")
+    if deadlines_meta is not None:
+        deadlines = DeadlineSettings(
+            quantile=float(deadlines_meta.get(
+                "quantile", DeadlineSettings.quantile
+            )),
+            slack=float(deadlines_meta.get("slack", DeadlineSettings.slack)),
+            min_minutes=int(deadlines_meta.get(
+                "min_minutes", DeadlineSettings.min_minutes
+            )),
+        )
+        if not 0 < deadlines.quantile < 1:
+            raise ConfigError(
+                "metadata.deadlines.quantile must be between 0 and 1"
+            )
+        if deadlines.slack < 0 or deadlines.min_minutes < 1:
+            raise ConfigError(
+                "metadata.deadlines.slack must be >= 0 and min_minutes >= 1"
+            )
+
     pods: Dict[str, Pod] = {}
     raw_pods = _require(data, "pods", "config root")
     for pod_data in raw_pods:
@@ -113,6 +217,31 @@ def load_config(path: str) -> ScheduleConfig:
                 raise ConfigError(
                     f"scenario '{name}' has non-positive timeout {timeout}"
                 )
+        fallback_pods = sc_data.get("fallback_pods", [])
+        if len(fallback_pods) != len(set(fallback_pods)):
+            raise ConfigError(
+                f"scenario '{name}' lists duplicate fallback_pods"
+            )
+        priority = int(sc_data.get("priority", 0))
+        if priority < 0:
+            raise ConfigError(
+                f"scenario '{name}' has negative priority {priority}"
+            )
+        every_n = int(sc_data.get("every_n_cycles", 1))
+        if every_n < 1:
+            raise ConfigError(
+                f"scenario '{name}' has every_n_cycles {every_n}; must be >= 1"
+            )
+        filler = bool(sc_data.get("filler", False))
+        if filler and every_n != 1:
+            raise ConfigError(
+                f"filler scenario '{name}' cannot set every_n_cycles"
+            )
+        stddev = float(sc_data.get("runtime_stddev", 0))
+        if stddev < 0:
+            raise ConfigError(
+                f"scenario '{name}' has negative runtime_stddev {stddev}"
+            )
         scenarios.append(Scenario(
             name=name,
             template=_require(sc_data, "template", f"scenario '{name}'"),
@@ -120,7 +249,34 @@ def load_config(path: str) -> ScheduleConfig:
             pods=list(scenario_pods),
             estimated_runtime=float(runtime_raw) if runtime_raw else 0.0,
             timeout=timeout,
+            fallback_pods=list(fallback_pods),
+            priority=priority,
+            every_n_cycles=every_n,
+            runtime_stddev=stddev,
+            after=list(sc_data.get("after", [])),
+            reuses={
+                str(k): float(v)
+                for k, v in sc_data.get("reuses", {}).items()
+            },
+            filler=filler,
         ))
+    _validate_sequencing(scenarios)
+
+    health = None
+    health_meta = metadata.get("pod_health")
+    if health_meta is not None:
+        health = HealthSettings(
+            sentinels=list(health_meta.get("sentinels", []))
+        )
+        if not health.sentinels:
+            raise ConfigError("metadata.pod_health.sentinels must not be empty")
+        known = {sc.name for sc in scenarios}
+        unknown = sorted(set(health.sentinels) - known)
+        if unknown:
+            raise ConfigError(
+                f"metadata.pod_health.sentinels names unknown scenarios: "
+                f"{unknown}"
+            )
 
     return ScheduleConfig(
         name=metadata.get("name", ""),
@@ -131,4 +287,9 @@ def load_config(path: str) -> ScheduleConfig:
         pods=pods,
         scenarios=scenarios,
         pipeline=pipeline,
+        job_overhead_minutes=job_overhead,
+        coalesce=coalesce,
+        backfill=bool(metadata.get("backfill", False)),
+        deadlines=deadlines,
+        health=health,
     )
@@ -0,0 +1,223 @@
+"""
+Schedule-derived job deadlines (hang containment).
+
+Without them a job may run for up to 240 minutes (see
+``generator._job_timeout``). With stage barriers, one hung crank job holds
+back every later group until it times out, so a single hang can push the
+whole cycle past the next trigger. With ``metadata.deadlines`` set (or
+``--hang-deadlines``), each job's ``timeoutInMinutes`` is derived from its
+own runtime distribution instead: the configured quantile (see
+``risk.Sampler``) plus a slack fraction, never above the default timeout
+and never below ``min_minutes``.
+
+Scenario templates already bound each crank task with its own
+``timeoutInMinutes``. Where a template is a single loop over its
+``scenarios`` parameter, :func:`template_budgets` reads that per-task
+timeout and the number of entries; their product caps the job too, since a
+job cannot usefully run longer than all of its tasks timing out in turn.
+
+Each group of the pipeline IR records its ``deadline``, the longest it can
+last when one of its jobs hangs. :func:`hang_report` turns these into the
+worst-case length of each pipeline under a single hang.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from freshness import cron_headroom
+from generator import _job_timeout, schedule_to_template_data
+from models import (
+    ChainedRun,
+    CoalescedRun,
+    DeadlineSettings,
+    Run,
+    Schedule,
+    ScheduleConfig,
+)
+from risk import Sampler, quantile
+
+
+_EACH_RE = re.compile(r"\$\{\{\s*each\s+\w+\s+in\s+parameters\.(\w+)\s*\}\}")
+_TASK_TIMEOUT_RE = re.compile(r"^\s*timeoutInMinutes:\s*(\d+)\s*$", re.M)
+
+
+def _count_entries(text: str, parameter: str) -> Optional[int]:
+    """Number of list entries in the default of template ``parameter``."""
+    lines = text.splitlines()
+    header = re.compile(rf"^- name:\s*{parameter}\s*$")
+    start = next(
+        (i for i, line in enumerate(lines) if header.match(line)), None
+    )
+    if start is None:
+        return None
+    items = []
+    for line in lines[start + 1:]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if not line[0].isspace():
+            break
+        if "${{" in line:
+            # Conditional entries; the count depends on the pipeline.
+            return None
+        if stripped.startswith("- "):
+            items.append(len(line) - len(line.lstrip()))
+    if not items:
+        return None
+    return items.count(min(items))
+
+
+def template_budget(path: str) -> Optional[int]:
+    """Minutes a template's tasks may take in total, or None if unknown.
+
+    Only templates with a single ``each`` loop, over their ``scenarios``
+    parameter, and a single task timeout are understood; nested loops
+    multiply the task count by parameters this does not evaluate.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    loops = _EACH_RE.findall(text)
+    timeouts = _TASK_TIMEOUT_RE.findall(text)
+    if loops != ["scenarios"] or len(timeouts) != 1:
+        return None
+    count = _count_entries(text, "scenarios")
+    if count is None:
+        return None
+    return count * int(timeouts[0])
+
+
+def template_budgets(
+    config: ScheduleConfig, directory: str
+) -> Dict[str, int]:
+    """:func:`template_budget` of each template of ``config``, by name.
+
+    Templates are looked up in ``directory``; those that are missing or not
+    understood are left out.
+    """
+    budgets: Dict[str, int] = {}
+    for name in sorted({sc.template for sc in config.scenarios}):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        budget = template_budget(path)
+        if budget is not None:
+            budgets[name] = budget
+    return budgets
+
+
+def _budget(job: Run, budgets: Dict[str, int]) -> Optional[int]:
+    """Task budget of ``job``; a coalesced job runs all of its parts."""
+    parts = job.parts if isinstance(job, CoalescedRun) else [job]
+    if any(p.scenario.template not in budgets for p in parts):
+        return None
+    return sum(budgets[p.scenario.template] for p in parts)
+
+
+def job_deadlines(
+    schedules: List[Schedule],
+    settings: DeadlineSettings,
+    sampler: Optional[Sampler] = None,
+    budgets: Optional[Dict[str, int]] = None,
+) -> Dict[str, int]:
+    """``timeoutInMinutes`` for every job of ``schedules``, by job id.
+
+    ``budgets`` (see :func:`template_budgets`) further caps the jobs whose
+    template it covers.
+    """
+    sampler = sampler or Sampler()
+    budgets = budgets or {}
+    timeouts: Dict[str, int] = {}
+    for sched in schedules:
+        for stage in sched.stages:
+            for run in stage.runs:
+                jobs: List[Run] = (
+                    run.parts if isinstance(run, ChainedRun) else [run]
+                )
+                for job in jobs:
+                    allowed = quantile(sampler.draws(job), settings.quantile)
+                    minutes = math.ceil(allowed * (1 + settings.slack))
+                    timeout = min(
+                        _job_timeout(job),
+                        max(settings.min_minutes, minutes),
+                    )
+                    budget = _budget(job, budgets)
+                    if budget is not None:
+                        timeout = min(timeout, budget)
+                    timeouts[job.job_name] = timeout
+    return timeouts
+
+
+@dataclass
+class HangCase:
+    """Worst case of one pipeline when a single job hangs."""
+    label: str
+    # Expected length, and the worst length when any one job hangs, with
+    # the default timeouts and with the timeouts in use.
+    expected: float
+    default_worst: float
+    worst: float
+    # Minutes until the next trigger of any pipeline.
+    window: float
+    # Group (1-based) where a hang costs most with the timeouts in use;
+    # 0 when no hang can lengthen the pipeline.
+    group: int
+
+
+def _worst_hang(data: Dict[str, Any]) -> Tuple[float, int]:
+    """Longest pipeline length under one hang, and the group it hits."""
+    worst, group_num = data["makespan"], 0
+    for num, group in enumerate(data["groups"], start=1):
+        if not group["jobs"]:
+            continue
+        duration = (max(job["end"] for job in group["jobs"])
+                    - min(job["start"] for job in group["jobs"]))
+        total = data["makespan"] + group["deadline"] - duration
+        if total > worst:
+            worst, group_num = total, num
+    return worst, group_num
+
+
+def hang_report(
+    config: ScheduleConfig,
+    schedules: List[Schedule],
+    timeouts: Optional[Dict[str, int]] = None,
+    label: str = "",
+) -> List[HangCase]:
+    """One :class:`HangCase` per split YAML of ``schedules``."""
+    headroom = cron_headroom(
+        [(config, schedules, label)], config.schedule_offset_hours
+    )
+    cases = []
+    for i, sched in enumerate(schedules):
+        name = f"{label} YAML {i + 1}"
+        default_worst, _ = _worst_hang(
+            schedule_to_template_data(sched, config)
+        )
+        worst, group = _worst_hang(
+            schedule_to_template_data(sched, config, timeouts=timeouts)
+        )
+        cases.append(HangCase(
+            label=name,
+            expected=sched.total_duration,
+            default_worst=default_worst,
+            worst=worst,
+            window=headroom[name] + sched.total_duration,
+            group=group,
+        ))
+    return cases
+
+
+def print_hang_report(cases: List[HangCase]) -> None:
+    """Print :func:`hang_report` cases."""
+    width = max([len("Pipeline")] + [len(c.label) for c in cases])
+    print("HANG CONTAINMENT (one job hangs until its timeout):")
+    print(f"  {'Pipeline':<{width}} {'Expected':>8} {'Default':>8} "
+          f"{'Deadlines':>9} {'Window':>7}  Worst group")
+    for c in cases:
+        print(f"  {c.label:<{width}} {c.expected:>7.0f}m "
+              f"{c.default_worst:>7.0f}m {c.worst:>8.0f}m {c.window:>6.0f}m  "
+              f"{c.group or '-'}")
+    print()
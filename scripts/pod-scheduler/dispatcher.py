@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Online dispatcher: dynamic list scheduling of runs onto queues.
+
+The generated YAML is a static plan built from estimates; when a run
+finishes early its machines idle until the stage barrier. The dispatcher
+instead holds the expanded runs, tracks machine leases in memory, and
+publishes the next eligible run to a service-bus queue as soon as its
+machines and a queue are free.
+
+A run sends the messages its job's template would send through
+``PublishToAzureServiceBus@2``, one per expanded step and in step order (see
+``templates.py``); each is published once the previous one completes, as
+the template's steps wait for completion. Message ids are the job id and
+the message's position, like ``Build_gold_lin#1``. Only a local in-process
+broker ships here; it runs on virtual minutes, so with the fake crank
+agents a full cycle is simulated instantly and deterministically:
+
+    python dispatcher.py --config build/benchmarks_ci_pods.json --noise 0.3
+
+A production broker implements the abstract methods of :class:`Broker` on
+top of Service Bus.
+
+With ``metadata.pod_health``, a failed sentinel run (see ``health.py``)
+prunes the pending runs of its pod, so their machines go to other runs.
+"""
+
+import abc
+import argparse
+import asyncio
+import heapq
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from config_loader import ConfigError, load_config
+from generator import GeneratorError
+from health import is_sentinel
+from models import HealthSettings, Run, ScheduleConfig
+from scheduler import (
+    SchedulerError,
+    create_schedule,
+    expand_runs,
+    sequence_links,
+    sequence_order,
+)
+from templates import Template, TemplateError, load_templates, run_messages
+from timeline import layout, load_durations
+
+
+def message_id(job_id: str, index: int) -> str:
+    """Broker message id of the ``index``-th (from 0) message of a job."""
+    return f"{job_id}#{index + 1}"
+
+
+class Broker(abc.ABC):
+    """What the dispatcher needs from a message broker.
+
+    ``now`` is in minutes since the dispatcher started. ``publish`` sends a
+    message to a queue; ``next_completion`` waits for any published message
+    to finish and returns ``(message_id, status)``.
+    """
+
+    @property
+    @abc.abstractmethod
+    def now(self) -> float:
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, queue: str, message_id: str, body: Dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def next_completion(self) -> Tuple[str, str]:
+        ...
+
+
+class LocalBroker(Broker):
+    """In-process stand-in broker running on virtual minutes.
+
+    Agents :meth:`receive` messages and report how long they took with
+    :meth:`complete_after`. Completions are released in virtual-time order,
+    and only once every published message has been picked up, so the result
+    does not depend on how asyncio interleaves the agents.
+    """
+
+    def __init__(self, queues: List[str]):
+        self._queues: Dict[str, asyncio.Queue] = {
+            q: asyncio.Queue() for q in queues
+        }
+        self._now = 0.0
+        self._seq = 0
+        self._published = 0
+        self._accepted = 0
+        self._done: List[Tuple[float, int, str, str]] = []
+        self._changed = asyncio.Condition()
+        # (queue, message_id, body) in publish order, for inspection.
+        self.log: List[Tuple[str, str, Dict]] = []
+
+    @property
+    def now(self) -> float:
+        return self._now
+
+    async def publish(self, queue: str, message_id: str, body: Dict) -> None:
+        self._published += 1
+        self.log.append((queue, message_id, body))
+        await self._queues[queue].put((message_id, body))
+
+    async def receive(self, queue: str) -> Tuple[str, Dict]:
+        return await self._queues[queue].get()
+
+    async def complete_after(
+        self,
+        message_id: str,
+        minutes: float,
+        status: str = "succeeded",
+    ) -> None:
+        async with self._changed:
+            self._accepted += 1
+            self._seq += 1
+            heapq.heappush(
+                self._done, (self._now + minutes, self._seq, message_id, status)
+            )
+            self._changed.notify_all()
+
+    async def next_completion(self) -> Tuple[str, str]:
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self._done and self._accepted == self._published
+            )
+            when, _, message_id, status = heapq.heappop(self._done)
+        self._now = when
+        return message_id, status
+
+
+class FakeAgent:
+    """A crank agent bound to one queue that simulates run durations."""
+
+    def __init__(
+        self,
+        broker: LocalBroker,
+        queue: str,
+        durations: Dict[str, float],
+        failures: Optional[Set[str]] = None,
+    ):
+        self.broker = broker
+        self.queue = queue
+        self.durations = durations
+        self.failures = failures or set()
+
+    async def serve(self) -> None:
+        while True:
+            message_id, _ = await self.broker.receive(self.queue)
+            status = "failed" if message_id in self.failures else "succeeded"
+            await self.broker.complete_after(
+                message_id, self.durations[message_id], status
+            )
+
+
+@dataclass
+class Dispatch:
+    """One run as the dispatcher executed it."""
+    run: Run
+    queue: str
+    start: float
+    end: float = 0.0
+    status: str = ""
+    # Messages published so far.
+    sent: int = 0
+
+
+@dataclass
+class DispatchReport:
+    """Outcome of a dispatcher session."""
+    dispatches: List[Dispatch] = field(default_factory=list)
+
+    @property
+    def makespan(self) -> float:
+        return max((d.end for d in self.dispatches), default=0.0)
+
+
+def dispatch_order(
+    runs: List[Run], sentinels: Optional[Set[str]] = None
+) -> List[Run]:
+    """Priority first, then longest-first, then by name, as the packer does.
+
+    Runs of the ``sentinels`` scenarios go before all others, so that a
+    failed one can still prune its pod's work (see ``health.py``).
+    """
+    sentinels = sentinels or set()
+    return sorted(
+        runs,
+        key=lambda r: (not is_sentinel(r, sentinels), -r.scenario.priority,
+                       -r.estimated_runtime, r.name),
+    )
+
+
+class Dispatcher:
+    """Publishes runs as soon as their machines and a queue are free.
+
+    ``messages`` holds the crank messages of each run, by job id (see
+    :func:`templates.run_messages`); a run holds its machines and queue
+    until the last one completes, and fails if any of them failed. When a
+    run of one of the ``sentinels`` scenarios fails, the pending runs of its
+    pod are skipped.
+    """
+
+    def __init__(
+        self,
+        runs: List[Run],
+        queues: List[str],
+        broker: Broker,
+        messages: Dict[str, List[Dict]],
+        sentinels: Optional[Set[str]] = None,
+    ):
+        if not queues:
+            raise SchedulerError(
+                "Cannot dispatch with zero queues. Configure metadata.queues."
+            )
+        self.sentinels = sentinels or set()
+        self.links = sequence_links(runs)
+        self.pending = sequence_order(
+            dispatch_order(runs, self.sentinels), self.links
+        )
+        self.queues = list(queues)
+        self.broker = broker
+        self.messages = messages
+        # machine -> job id holding it
+        self.leases: Dict[str, str] = {}
+        self.free_queues = list(queues)
+        self.running: Dict[str, Dispatch] = {}
+        self.finished: Set[str] = set()
+
+    def _eligible(self, run: Run) -> bool:
+        # Runs wait for their ``after`` predecessors, not for reuse ones.
+        return bool(self.free_queues) and not any(
+            m in self.leases for m in run.machines_used
+        ) and all(
+            link.before.job_name in self.finished
+            for link in self.links.get(run.job_name, ()) if link.hard
+        )
+
+    async def _start_eligible(self, report: DispatchReport) -> None:
+        for run in list(self.pending):
+            if not self.free_queues:
+                break
+            if not self._eligible(run):
+                continue
+            queue = self.free_queues.pop(0)
+            for m in run.machines_used:
+                self.leases[m] = run.job_name
+            entry = Dispatch(run=run, queue=queue, start=self.broker.now)
+            self.running[run.job_name] = entry
+            report.dispatches.append(entry)
+            self.pending.remove(run)
+            if self.messages[run.job_name]:
+                await self._send_next(entry)
+                continue
+            # Every step of the template is disabled: nothing to run.
+            del self.running[run.job_name]
+            entry.end, entry.status = entry.start, "succeeded"
+            self.finished.add(run.job_name)
+            self._release(entry)
+            # Its release may make earlier-skipped runs eligible.
+            await self._start_eligible(report)
+            return
+
+    async def _send_next(self, entry: Dispatch) -> None:
+        job_id = entry.run.job_name
+        body = self.messages[job_id][entry.sent]
+        await self.broker.publish(
+            entry.queue, message_id(job_id, entry.sent), body
+        )
+        entry.sent += 1
+
+    def _release(self, entry: Dispatch) -> None:
+        for m in entry.run.machines_used:
+            if self.leases.get(m) == entry.run.job_name:
+                del self.leases[m]
+        # Keep queues in config order so lane choice stays deterministic.
+        self.free_queues.append(entry.queue)
+        self.free_queues.sort(key=self.queues.index)
+
+    def _prune(self, pod: str, report: DispatchReport) -> None:
+        """Skip the pending runs of ``pod`` after its sentinel failed."""
+        for run in [r for r in self.pending if r.pod.name == pod]:
+            self.pending.remove(run)
+            now = self.broker.now
+            report.dispatches.append(Dispatch(
+                run=run, queue="", start=now, end=now, status="skipped",
+            ))
+            self.finished.add(run.job_name)
+
+    async def run(self) -> DispatchReport:
+        """Dispatch every run; returns when the last one completes."""
+        report = DispatchReport()
+        while self.pending or self.running:
+            await self._start_eligible(report)
+            if not self.running:
+                raise SchedulerError(
+                    f"{len(self.pending)} run(s) can never be dispatched"
+                )
+            completed, status = await self.broker.next_completion()
+            job_id = completed.rsplit("#", 1)[0]
+            entry = self.running[job_id]
+            if status == "failed" or not entry.status:
+                entry.status = status
+            if entry.sent < len(self.messages[job_id]):
+                await self._send_next(entry)
+                continue
+            del self.running[job_id]
+            entry.end = self.broker.now
+            self.finished.add(job_id)
+            self._release(entry)
+            if status == "failed" and is_sentinel(entry.run, self.sentinels):
+                self._prune(entry.run.pod.name, report)
+        return report
+
+
+async def simulate(
+    config: ScheduleConfig,
+    durations: Dict[str, float],
+    templates: Dict[str, Template],
+    strict: bool = True,
+    failures: Optional[Set[str]] = None,
+) -> DispatchReport:
+    """Dispatch ``config``'s runs against a local broker and fake agents.
+
+    ``durations`` maps job ids to the minutes the fake agents take, split
+    evenly over the job's messages; runs it does not name take their
+    estimate. Every message of the job ids in ``failures`` fails.
+    """
+    runs = expand_runs(config, strict=strict)
+    messages = {r.job_name: run_messages(r, templates) for r in runs}
+    actual: Dict[str, float] = {}
+    failed: Set[str] = set()
+    for r in runs:
+        sent = messages[r.job_name]
+        minutes = durations.get(r.job_name, r.estimated_runtime)
+        for i in range(len(sent)):
+            actual[message_id(r.job_name, i)] = minutes / len(sent)
+            if r.job_name in (failures or ()):
+                failed.add(message_id(r.job_name, i))
+    broker = LocalBroker(config.queues)
+    agents = [
+        asyncio.ensure_future(FakeAgent(broker, q, actual, failed).serve())
+        for q in config.queues
+    ]
+    try:
+        sentinels = set(config.health.sentinels) if config.health else None
+        return await Dispatcher(
+            runs, config.queues, broker, messages, sentinels
+        ).run()
+    finally:
+        for agent in agents:
+            agent.cancel()
+        await asyncio.gather(*agents, return_exceptions=True)
+
+
+def static_makespan(
+    config: ScheduleConfig,
+    durations: Dict[str, float],
+    strict: bool = True,
+) -> float:
+    """Makespan of the stage-barrier plan when runs take ``durations``."""
+    schedule = create_schedule(config, strict=strict)
+    return layout(schedule, config.queues, durations).makespan
+
+
+def noisy_durations(
+    config: ScheduleConfig,
+    noise: float,
+    seed: int = 0,
+    strict: bool = True,
+) -> Dict[str, float]:
+    """Estimates scaled by a seeded uniform factor in ``[1-noise, 1+noise]``."""
+    rng = random.Random(seed)
+    return {
+        r.job_name: r.estimated_runtime * rng.uniform(1 - noise, 1 + noise)
+        for r in sorted(expand_runs(config, strict=strict),
+                        key=lambda r: r.name)
+    }
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Simulate the online dispatcher against a local broker "
+                    "and compare it with the static stage plan"
+    )
+    parser.add_argument(
+        "--config", required=True,
+        help="Path to JSON configuration file"
+    )
+    parser.add_argument(
+        "--timings", metavar="PATH",
+        help="JSON {job_id: minutes} the fake agents take (default: the "
+             "estimates)"
+    )
+    parser.add_argument(
+        "--noise", type=float, default=0.0,
+        help="Scale each duration by a random factor in [1-NOISE, 1+NOISE]"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Random seed for --noise (default: 0)"
+    )
+    parser.add_argument(
+        "--fail", nargs="+", default=[], metavar="JOB_ID",
+        help="Job ids the fake agents report as failed, e.g. a sentinel "
+             "(see metadata.pod_health)"
+    )
+    parser.add_argument(
+        "--pod-health", nargs="+", metavar="SCENARIO",
+        help="Sentinel scenarios; a failed sentinel skips the pending runs "
+             "of its pod (same as metadata.pod_health)"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    strict = not args.lenient
+    try:
+        config = load_config(args.config)
+        if args.pod_health:
+            config.health = HealthSettings(sentinels=list(args.pod_health))
+        if args.timings:
+            durations = load_durations(args.timings)
+        else:
+            durations = noisy_durations(config, args.noise, args.seed, strict)
+        templates = load_templates(config, os.path.dirname(args.config))
+        report = asyncio.run(
+            simulate(config, durations, templates, strict, set(args.fail))
+        )
+        static = static_makespan(config, durations, strict)
+        print(f"{'Job':<40} {'Queue':<10} {'Start':>7} {'End':>7}  Status")
+        for d in sorted(report.dispatches, key=lambda d: (d.start, d.queue)):
+            print(f"{d.run.name:<40} {d.queue:<10} "
+                  f"{d.start:>6.0f}m {d.end:>6.0f}m  {d.status}")
+        print()
+        print(f"Static stage plan: {static:.0f} min")
+        print(f"Dispatcher:        {report.makespan:.0f} min "
+              f"({report.makespan - static:+.0f})")
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError, TemplateError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
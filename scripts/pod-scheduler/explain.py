@@ -0,0 +1,101 @@
+"""
+Bottleneck analysis for the greedy packer.
+
+:func:`scheduler.pack_runs` can record every stage it passed over for a run
+and why: a machine already in use there, or one run per queue already
+placed. This module turns those records into a ranked list of the
+resources that push runs into later stages, and checks each one by
+re-scheduling with it relaxed (a machine duplicated so the pods sharing it
+each get their own, or one more queue), which gives the makespan that
+adding the resource would actually save.
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List
+
+from models import ScheduleConfig
+from scheduler import Rejection, create_schedule
+
+
+QUEUE_RESOURCE = "queues"
+
+
+@dataclass
+class Bottleneck:
+    """One machine, or the queue count, and what it costs."""
+    resource: str
+    # "machine" or "queue"
+    kind: str
+    # Stage placements rejected because of this resource.
+    blocked: int = 0
+    # Runs pushed past at least one stage by it.
+    runs: List[str] = field(default_factory=list)
+    # Minutes of makespan saved by duplicating the machine or adding a queue.
+    gain: float = 0.0
+
+
+def duplicate_machine(config: ScheduleConfig, machine: str) -> ScheduleConfig:
+    """Copy of ``config`` where every pod gets its own copy of ``machine``."""
+    pods = {}
+    for name, pod in config.pods.items():
+        changes = {
+            role: f"{machine}@{name}"
+            for role in ("sut", "load", "db")
+            if getattr(pod, role) == machine
+        }
+        pods[name] = replace(pod, **changes) if changes else pod
+    return replace(config, pods=pods)
+
+
+def add_queue(config: ScheduleConfig) -> ScheduleConfig:
+    """Copy of ``config`` with one more queue."""
+    extra = f"extra{len(config.queues) + 1}"
+    return replace(config, queues=list(config.queues) + [extra])
+
+
+def bottlenecks(
+    config: ScheduleConfig,
+    rejections: List[Rejection],
+    strict: bool = True,
+) -> List[Bottleneck]:
+    """Rank the resources behind ``rejections`` by makespan gain.
+
+    ``rejections`` comes from a :func:`create_schedule` call on ``config``.
+    Ties on gain are ranked by how many placements the resource blocked.
+    """
+    found: Dict[str, Bottleneck] = {}
+    for rejection in rejections:
+        resources = [(m, "machine") for m in sorted(rejection.machines)]
+        if rejection.queue_full:
+            resources.append((QUEUE_RESOURCE, "queue"))
+        for resource, kind in resources:
+            entry = found.setdefault(resource, Bottleneck(resource, kind))
+            entry.blocked += 1
+            if rejection.run.name not in entry.runs:
+                entry.runs.append(rejection.run.name)
+
+    base = create_schedule(config, strict=strict).total_duration
+    for entry in found.values():
+        if entry.kind == "queue":
+            relaxed = add_queue(config)
+        else:
+            relaxed = duplicate_machine(config, entry.resource)
+        relaxed_span = create_schedule(relaxed, strict=strict).total_duration
+        entry.gain = base - relaxed_span
+    return sorted(
+        found.values(), key=lambda b: (-b.gain, -b.blocked, b.resource)
+    )
+
+
+def rejections_for(rejections: List[Rejection], name: str) -> List[Rejection]:
+    """Rejections of the run whose name or job id is ``name``.
+
+    Every stage before the one the run was packed into has an entry, also
+    for runs with ``after``/``reuses`` links, so that stage is
+    ``len(result)``.
+    """
+    return [
+        r for r in rejections
+        if name in (r.run.name, r.run.job_name)
+    ]
+
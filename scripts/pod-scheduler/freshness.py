@@ -0,0 +1,309 @@
+"""
+Freshness of result series across split and phased YAMLs.
+
+A result series is one (scenario, pod) pair. Its data points arrive when the
+run finishes, i.e. at the YAML's cron fire time plus the run's completion
+offset within that YAML. When a series is fed by several YAMLs (multi-rate
+phases, see multirate.py), the gaps between consecutive points over a day can
+become uneven, which delays regression detection. This module measures the
+maximum gap per series and offers a splitter that minimises it.
+"""
+
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+from generator import GeneratorError, _offset_cron
+from models import ChainedRun, CoalescedRun, Schedule, ScheduleConfig, Stage
+from scheduler import (
+    _stage_links,
+    _stage_weight,
+    completion_times,
+    split_schedule,
+)
+
+
+DAY_MINUTES = 24 * 60
+
+# Most YAMLs per phase for which every slot order is tried (5! = 120).
+EXHAUSTIVE_MAX_YAMLS = 5
+
+SeriesKey = Tuple[str, str]
+
+# (config, split schedules, name) per pipeline family, as in main.py.
+Outputs = List[Tuple[ScheduleConfig, List[Schedule], str]]
+
+
+def cron_fire_minutes(cron: str) -> List[int]:
+    """Minutes after midnight at which an ``H`` / ``H/N`` cron fires daily."""
+    parts = cron.split()
+    if len(parts) != 5:
+        raise GeneratorError(f"Cron {cron!r} is not a 5-field expression")
+    minute = int(parts[0]) if parts[0].isdigit() else 0
+    hour, _, step = parts[1].partition("/")
+    if not hour.isdigit() or (step and not step.isdigit()):
+        raise GeneratorError(
+            f"Cron {cron!r} uses an unsupported hour field {parts[1]!r}"
+        )
+    step_hours = int(step) if step else 24
+    return [
+        h * 60 + minute for h in range(int(hour), 24, step_hours)
+    ]
+
+
+def execution_times(
+    pipelines: List[Tuple[str, Schedule]],
+) -> Dict[SeriesKey, List[float]]:
+    """Daily finish times (minutes after midnight) of every series.
+
+    ``pipelines`` holds one ``(cron, schedule)`` pair per generated YAML.
+    """
+    times: Dict[SeriesKey, List[float]] = {}
+    for cron, sched in pipelines:
+        fires = cron_fire_minutes(cron)
+        for run, finish in completion_times(sched):
+            parts = run.parts if isinstance(run, CoalescedRun) else [run]
+            for part in parts:
+                key = (part.scenario.name, part.pod.name)
+                for fire in fires:
+                    times.setdefault(key, []).append(
+                        (fire + finish) % DAY_MINUTES
+                    )
+    for values in times.values():
+        values.sort()
+    return times
+
+
+def max_gaps(
+    pipelines: List[Tuple[str, Schedule]],
+) -> Dict[SeriesKey, Tuple[float, float]]:
+    """``(max gap, ideal gap)`` of each series over 24h.
+
+    The ideal gap is what perfectly even spacing of the same number of data
+    points would give, so ``max - ideal`` is the unevenness to minimise.
+    """
+    gaps: Dict[SeriesKey, Tuple[float, float]] = {}
+    for key, values in execution_times(pipelines).items():
+        wrapped = values + [values[0] + DAY_MINUTES]
+        worst = max(b - a for a, b in zip(wrapped, wrapped[1:]))
+        gaps[key] = (worst, DAY_MINUTES / len(values))
+    return gaps
+
+
+def pipelines_for(
+    cron: str,
+    schedules: List[Schedule],
+    offset_hours: int,
+) -> List[Tuple[str, Schedule]]:
+    """Pair split schedules with the crons :func:`generate_yamls` gives them."""
+    return [
+        (_offset_cron(cron, offset_hours * i), sched)
+        for i, sched in enumerate(schedules)
+    ]
+
+
+def cron_headroom(
+    outputs: Outputs,
+    offset_hours: int,
+) -> Dict[str, float]:
+    """Minutes each YAML has left before the next trigger of any YAML.
+
+    All generated pipelines share the same machines, so a YAML still running
+    when the next one fires delays it. Negative values are overruns.
+    """
+    fires: List[Tuple[int, str]] = []
+    spans: Dict[str, float] = {}
+    for out_config, schedules, name in outputs:
+        for i, (cron, sched) in enumerate(pipelines_for(
+            out_config.schedule, schedules, offset_hours
+        )):
+            label = f"{name} YAML {i + 1}"
+            spans[label] = sched.total_duration
+            fires.extend((minute, label) for minute in cron_fire_minutes(cron))
+    fires.sort()
+    headroom: Dict[str, float] = {}
+    for i, (minute, label) in enumerate(fires):
+        if len(fires) == 1:
+            window = DAY_MINUTES
+        else:
+            # Triggers at the same minute leave no window at all.
+            window = (fires[(i + 1) % len(fires)][0] - minute) % DAY_MINUTES
+        left = window - spans[label]
+        headroom[label] = min(headroom.get(label, left), left)
+    return headroom
+
+
+def _score(pipelines: List[Tuple[str, Schedule]]) -> Tuple[float, float]:
+    excess = [worst - ideal for worst, ideal in max_gaps(pipelines).values()]
+    if not excess:
+        return (0.0, 0.0)
+    return (max(excess), sum(e * e for e in excess))
+
+
+def _pipelines(
+    phase_bins: List[List[List[Stage]]],
+    phase_crons: List[str],
+    offset_hours: int,
+) -> List[Tuple[str, Schedule]]:
+    result = []
+    for phase, bins in enumerate(phase_bins):
+        # Empty bins produce no YAML, so later files shift down a slot.
+        for slot, stages in enumerate([b for b in bins if b]):
+            cron = _offset_cron(phase_crons[phase], offset_hours * slot)
+            result.append((cron, Schedule(stages=list(stages))))
+    return result
+
+
+class _Order:
+    """Stage order a phase's split must keep.
+
+    Stages linked by ``after`` or ``reuses`` (see
+    ``scheduler.sequence_links``) stay in one YAML, in order, as
+    :func:`scheduler.split_schedule` leaves them. A pinned stage, one with
+    prioritised runs or leading with a sentinel, is not overtaken by a
+    stage that came after it, so priority order and sentinel-first
+    placement survive.
+    """
+
+    def __init__(self, schedule: Schedule, sentinels: Set[str]):
+        self.index = {id(st): i for i, st in enumerate(schedule.stages)}
+        self.links = _stage_links(schedule.stages)
+        self.pinned = [
+            i for i, stage in enumerate(schedule.stages)
+            if _stage_weight(stage) or any(
+                (lane.parts[0] if isinstance(lane, ChainedRun)
+                 else lane).scenario.name in sentinels
+                for lane in stage.runs
+            )
+        ]
+
+    def allows(self, bins: List[List[Stage]]) -> bool:
+        where: Dict[int, Tuple[int, int]] = {}
+        for b, stages in enumerate(bins):
+            for position, stage in enumerate(stages):
+                where[self.index[id(stage)]] = (b, position)
+        for before, after in self.links:
+            if (where[before][0] != where[after][0]
+                    or where[before][1] > where[after][1]):
+                return False
+        for pin in self.pinned:
+            b, position = where[pin]
+            for later, (other, other_pos) in where.items():
+                if later > pin and other == b and other_pos < position:
+                    return False
+        return True
+
+
+def freshness_split(
+    phase_schedules: List[Schedule],
+    phase_crons: List[str],
+    target_count: int,
+    offset_hours: int,
+    max_passes: int = 4,
+    sentinels: Optional[Set[str]] = None,
+) -> List[List[Schedule]]:
+    """Split every phase's schedule, minimising the worst series unevenness.
+
+    Unevenness is a series' max gap minus its ideal gap (see
+    :func:`max_gaps`); ties are broken on the sum of squares.
+
+    1. Each phase starts from the balanced :func:`split_schedule` result.
+    2. Phase by phase, the bins are permuted across YAML slots (and so cron
+       offsets) to line series up with where they ran in earlier phases.
+       Every order is tried for up to :data:`EXHAUSTIVE_MAX_YAMLS` YAMLs;
+       above that, pairs of slots are swapped while that lowers the score.
+    3. Local search then relocates single stages, within their YAML or to
+       another YAML of the same phase, while that lowers the score and no
+       YAML grows beyond the phase's balanced maximum. Per-YAML makespan
+       therefore never gets worse; stage order within a YAML may change,
+       except that linked stages stay together and in order, and stages
+       with prioritised runs or ``sentinels`` leading (see ``health.py``)
+       are not overtaken by later ones.
+
+    Step 2 moves whole YAMLs, so it never breaks stage order.
+
+    Returns one list of split schedules per phase, indexed by YAML slot;
+    empty slots are dropped as in :func:`split_schedule`.
+    """
+    orders = [_Order(sched, sentinels or set()) for sched in phase_schedules]
+    phase_bins: List[List[List[Stage]]] = []
+    limits: List[float] = []
+    for sched in phase_schedules:
+        bins = [list(s.stages) for s in split_schedule(sched, target_count)]
+        bins += [[] for _ in range(max(0, target_count - len(bins)))]
+        phase_bins.append(bins)
+        limits.append(max(sum(st.duration for st in b) for b in bins))
+
+    def score(upto: Optional[int] = None) -> Tuple[float, float]:
+        count = len(phase_bins) if upto is None else upto
+        return _score(_pipelines(
+            phase_bins[:count], phase_crons[:count], offset_hours
+        ))
+
+    for phase in range(1, len(phase_bins)):
+        original = phase_bins[phase]
+        if len(original) <= EXHAUSTIVE_MAX_YAMLS:
+            best_perm, best_key = None, None
+            for perm in itertools.permutations(range(len(original))):
+                phase_bins[phase] = [original[i] for i in perm]
+                key = score(phase + 1)
+                if best_key is None or key < best_key:
+                    best_perm, best_key = perm, key
+            phase_bins[phase] = [original[i] for i in best_perm]
+            continue
+        # Too many YAMLs to try every order: swap pairs of slots while a
+        # swap lowers the score.
+        bins = phase_bins[phase]
+        best_key = score(phase + 1)
+        improved = True
+        while improved:
+            improved = False
+            for i, j in itertools.combinations(range(len(bins)), 2):
+                bins[i], bins[j] = bins[j], bins[i]
+                key = score(phase + 1)
+                if key < best_key:
+                    best_key, improved = key, True
+                else:
+                    bins[i], bins[j] = bins[j], bins[i]
+
+    current = score()
+    for _ in range(max_passes):
+        improved = False
+        for phase, bins in enumerate(phase_bins):
+            for src in range(len(bins)):
+                for stage in list(bins[src]):
+                    before_src = bins[src]
+                    remaining = [st for st in before_src if st is not stage]
+                    best = None
+                    for dst in range(len(bins)):
+                        base = remaining if dst == src else bins[dst]
+                        load = sum(st.duration for st in base)
+                        if load + stage.duration > limits[phase]:
+                            continue
+                        before_dst = bins[dst]
+                        for pos in range(len(base) + 1):
+                            bins[src] = remaining
+                            bins[dst] = base[:pos] + [stage] + base[pos:]
+                            if not orders[phase].allows(bins):
+                                bins[dst] = before_dst
+                                bins[src] = before_src
+                                continue
+                            candidate = score()
+                            if candidate < current and (
+                                best is None or candidate < best[0]
+                            ):
+                                best = (candidate, dst, pos)
+                            bins[dst] = before_dst
+                            bins[src] = before_src
+                    if best is not None:
+                        current, dst, pos = best
+                        bins[src] = remaining
+                        base = remaining if dst == src else bins[dst]
+                        bins[dst] = base[:pos] + [stage] + base[pos:]
+                        improved = True
+        if not improved:
+            break
+
+    return [
+        [Schedule(stages=b) for b in bins if b]
+        for bins in phase_bins
+    ]
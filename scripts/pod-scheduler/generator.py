@@ -6,22 +6,35 @@ matches the structure previously produced by the Liquid-template based
 crank-scheduler so existing pipeline consumers continue to work.
 """
 
+import abc
+import io
+import json
+import math
 import os
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
 
 from models import (
+    ChainedRun,
+    CoalescedRun,
     PipelineSettings,
     Run,
     Schedule,
     ScheduleConfig,
-    sanitize_job_id,
 )
+from templates import job_arguments
 
 
 _CRON_HOUR_RE = re.compile(r"^(\d+)(/\d+)?$")
 
 
+# Job ids of the agentless barrier jobs emitted with pipeline.join_jobs.
+JOIN_JOB_PREFIX = "join_group_"
+
+# Bumped whenever the IR of schedule_to_template_data changes shape.
+IR_SCHEMA_VERSION = 1
+
+
 class GeneratorError(ValueError):
     """Raised when YAML generation cannot proceed safely."""
 
@@ -62,138 +75,459 @@ def _job_timeout(run: Run) -> int:
     one from estimated_runtime (capped at [120, 240] minutes) so jobs that
     historically took longer than the old flat 120-minute default still get
     enough headroom.
+
+    A coalesced job gets the sum of its parts' timeouts, capped at 240
+    minutes but never below the largest single part.
     """
+    if isinstance(run, CoalescedRun):
+        timeouts = [_job_timeout(part) for part in run.parts]
+        return max(max(timeouts), min(240, sum(timeouts)))
     if run.scenario.timeout is not None:
         return run.scenario.timeout
     return max(120, min(240, int(run.estimated_runtime * 2)))
 
 
+def _job_entry(
+    run: Run,
+    lane: int,
+    after: Optional[str],
+    queue: str,
+    start: float,
+    timeout: Optional[int] = None,
+    gate: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Describe one AzDO job.
+
+    ``lane`` is the stage slot that picks the job's ``queue``; ``after`` is
+    the job it is chained behind within the stage, if any. ``start`` is its
+    estimated offset in minutes from the pipeline start. ``timeout``
+    overrides :func:`_job_timeout`. ``gate`` is the sentinel job the job is
+    skipped after, if that one failed (see ``health.py``).
+    """
+    parts = run.parts if isinstance(run, CoalescedRun) else [run]
+    return {
+        "name": run.name,
+        "job_id": run.job_name,
+        "template": run.scenario.template,
+        "profiles": list(run.profiles),
+        "machines": sorted(run.machines_used),
+        "timeout": timeout if timeout is not None else _job_timeout(run),
+        "lane": lane,
+        "queue": queue,
+        "after": after,
+        "gate": gate,
+        "depends_on": [],
+        "start": start,
+        "end": start + run.estimated_runtime,
+        "steps": [
+            {"template": p.scenario.template, "profiles": list(p.profiles)}
+            for p in parts
+        ],
+    }
+
+
+def _group_deadline(
+    jobs: List[Dict[str, Any]], start: float, duration: float
+) -> float:
+    """Longest a group can last when one of its jobs hangs.
+
+    A hung job holds its lane until its timeout, and the jobs chained behind
+    it then still take their estimates.
+    """
+    lane_end: Dict[int, float] = {}
+    for job in jobs:
+        lane_end[job["lane"]] = max(lane_end.get(job["lane"], start),
+                                    job["end"])
+    return max([duration] + [
+        job["start"] + job["timeout"] + lane_end[job["lane"]] - job["end"]
+        - start
+        for job in jobs
+    ])
+
+
+def _barrier(
+    group_num: int,
+    prev_jobs: List[Dict[str, Any]],
+    jobs: List[Dict[str, Any]],
+    seen_job_ids: set,
+) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """Resolve the barrier after group ``group_num``.
+
+    Returns the ``dependsOn`` of the next group's first jobs, and the join
+    job closing group ``group_num``, if one is needed. Only the last job of
+    each previous lane is depended on, since chained jobs already wait for
+    the ones before them. When the lanes entering and leaving the barrier
+    are many enough that ``n * m`` edges exceed ``n + m``, an agentless join
+    job is inserted and the next group depends on it alone, keeping the
+    graph linear in the number of jobs.
+    """
+    chained = {job["after"] for job in prev_jobs if job["after"]}
+    tails = [job["job_id"] for job in prev_jobs if job["job_id"] not in chained]
+    heads = sum(1 for job in jobs if not job["after"])
+    if len(tails) * heads <= len(tails) + heads:
+        return tails, None
+
+    join_id = f"{JOIN_JOB_PREFIX}{group_num}"
+    if join_id in seen_job_ids:
+        raise GeneratorError(f"Job id {join_id!r} collides with a join job")
+    seen_job_ids.add(join_id)
+    return [join_id], {"job_id": join_id, "depends_on": tails}
+
+
 def schedule_to_template_data(
     schedule: Schedule,
     config: ScheduleConfig,
     cron_override: Optional[str] = None,
+    timeouts: Optional[Dict[str, int]] = None,
+    gates: Optional[Dict[str, str]] = None,
 ) -> Dict[str, Any]:
-    """Project a Schedule into a JSON-serialisable shape useful for tests."""
-    groups = []
+    """Project a Schedule into the serialisable pipeline IR.
+
+    The IR holds everything any renderer needs: the cron, the queues, and
+    per group its jobs (queue, timeout, steps, machines, estimated start and
+    end offsets, resolved ``depends_on``) plus the join job closing it, if
+    any (see ``pipeline.join_jobs``). Downstream tools should read this (or
+    a ``--emit lock`` file) rather than parse the YAML.
+
+    ``timeouts`` maps job ids to ``timeoutInMinutes`` and overrides the
+    default of the jobs it names (see ``deadlines.py``). Each group records
+    its ``deadline``: how long it can last, in minutes, when any one of its
+    jobs runs into its timeout and the others take their estimate. Filler
+    jobs (see ``scheduler.fill_idle``) time out at the end of the idle slot
+    they were placed in.
+
+    ``gates`` maps job ids to the id of their pod's sentinel job (see
+    ``health.py``); a gated job also depends on its sentinel so that its
+    condition can read the sentinel's result.
+
+    Job ids are sanitized once, when each run is built; here they are
+    checked to be unique, raising GeneratorError instead of producing
+    AzDO-invalid output.
+    """
+    queues = config.queues
+    timeouts = timeouts or {}
+    gates = gates or {}
+    groups: List[Dict[str, Any]] = []
+    seen_job_ids: set = set()
+    barrier = 0.0
     for stage in schedule.stages:
         jobs = []
-        for run in stage.runs:
-            jobs.append({
-                "name": run.name,
-                "job_id": run.job_name,
-                "template": run.scenario.template,
-                "profiles": run.profiles,
-                "timeout": _job_timeout(run),
-            })
-        groups.append({"jobs": jobs})
+        for lane, run in enumerate(stage.runs):
+            after = None
+            start = barrier
+            members = run.parts if isinstance(run, ChainedRun) else [run]
+            for member in members:
+                timeout = timeouts.get(member.job_name)
+                if member.scenario.filler:
+                    # A filler may not hold the stage past its idle slot.
+                    slot = max(1, math.ceil(barrier + stage.duration - start))
+                    timeout = min(timeout or _job_timeout(member), slot)
+                job = _job_entry(
+                    member, lane, after, queues[lane % len(queues)], start,
+                    timeout, gates.get(member.job_name),
+                )
+                if job["job_id"] in seen_job_ids:
+                    raise GeneratorError(
+                        f"Duplicate job id {job['job_id']!r} produced for "
+                        f"jobs named {job['name']!r}. Rename the offending "
+                        f"pod or scenario."
+                    )
+                seen_job_ids.add(job["job_id"])
+                if after:
+                    job["depends_on"] = [after]
+                jobs.append(job)
+                after = job["job_id"]
+                start = job["end"]
+        groups.append({
+            "jobs": jobs,
+            "join": None,
+            "deadline": _group_deadline(jobs, barrier, stage.duration),
+        })
+        barrier += stage.duration
+
+    for index, group in enumerate(groups):
+        if index == 0:
+            incoming: List[str] = []
+        elif config.pipeline.join_jobs:
+            incoming, groups[index - 1]["join"] = _barrier(
+                index, groups[index - 1]["jobs"], group["jobs"],
+                seen_job_ids,
+            )
+        else:
+            incoming = [job["job_id"] for job in groups[index - 1]["jobs"]]
+        for job in group["jobs"]:
+            if not job["after"]:
+                job["depends_on"] = list(incoming)
+            if job["gate"] and job["gate"] not in seen_job_ids:
+                raise GeneratorError(
+                    f"Job {job['job_id']!r} is gated on {job['gate']!r}, "
+                    f"which is not in this pipeline"
+                )
+            if job["gate"] and job["gate"] not in job["depends_on"]:
+                job["depends_on"].append(job["gate"])
 
     return {
+        "schema_version": IR_SCHEMA_VERSION,
         "schedule": cron_override or config.schedule,
-        "queues": config.queues,
+        "queues": queues,
+        "makespan": barrier,
         "groups": groups,
     }
 
 
-def _render_yaml(
-    data: Dict[str, Any],
-    pipeline: PipelineSettings,
-    source_config: Optional[str] = None,
-    base_name: str = "benchmarks-ci",
-) -> str:
-    """Render the template data into Azure DevOps pipeline YAML."""
-    lines: List[str] = []
-    lines.append("# Do not change this file, it is generated by the pod-scheduler.")
-    lines.append("# Source of truth: see ../scripts/pod-scheduler/README.md")
-    lines.append("# To regenerate, run from the repo root:")
-    if source_config:
-        lines.append(
-            f"#   python ./scripts/pod-scheduler/main.py "
-            f"--config {source_config} --base-name {base_name} "
-            f"--yaml-output ./build"
-        )
-    else:
-        lines.append(
-            "#   python ./scripts/pod-scheduler/main.py "
-            "--config ./build/<config>.json "
-            "--yaml-output ./build"
-        )
-    lines.append("")
-    lines.append("trigger: none")
-    lines.append("pr: none")
-    lines.append("")
-    lines.append("schedules:")
-    lines.append(f'- cron: "{data["schedule"]}"')
-    lines.append("  always: true")
-    lines.append("  branches:")
-    lines.append("    include:")
-    lines.append("    - main")
-    lines.append("")
-    lines.append("variables:")
-    lines.append("  - template: job-variables.yml")
-    lines.append("  - name: session")
-    lines.append("    value: $(Build.BuildNumber)")
-    lines.append("  - name: buildId")
-    lines.append("    value: $(Build.BuildId)")
-    lines.append("  - name: buildNumber")
-    lines.append("    value: $(Build.BuildNumber)")
-    lines.append("  - name: am")
-    lines.append("    value: $[lt(format('{0:HH}', pipeline.startTime), 12)]")
-    lines.append("  - name: pm")
-    lines.append("    value: $[ge(format('{0:HH}', pipeline.startTime), 12)]")
-    lines.append("")
-    lines.append("jobs:")
-    lines.append("")
-
-    queues = data["queues"]
-    prev_group_jobs: List[str] = []
-    seen_job_ids = set()
-
-    for group_idx, group in enumerate(data["groups"]):
-        group_num = group_idx + 1
-        lines.append(f"# GROUP {group_num}")
-        lines.append("")
-
-        current_jobs: List[str] = []
-        for job_idx, job in enumerate(group["jobs"]):
-            job_id = job["job_id"]
-            if job_id in seen_job_ids:
-                raise GeneratorError(
-                    f"Duplicate job id {job_id!r} produced for jobs named "
-                    f"{job['name']!r}. Rename the offending pod or scenario."
-                )
-            seen_job_ids.add(job_id)
-            current_jobs.append(job_id)
+class Renderer(abc.ABC):
+    """Writes one pipeline's IR (see :func:`schedule_to_template_data`).
 
-            queue = queues[job_idx % len(queues)]
-            depends = ", ".join(prev_group_jobs) if prev_group_jobs else ""
-            profiles_args = " ".join(
-                f"--profile {p}" for p in job["profiles"]
-            )
+    Renderers write to a text stream as they go rather than building the
+    output as one string; the IR itself is held in memory. ``extension`` is
+    appended to the output file's base name.
+    """
+    extension = ""
+
+    @abc.abstractmethod
+    def write(self, data: Dict[str, Any], out: TextIO) -> None:
+        """Write ``data`` to ``out``."""
+
+
+# System variables InvokeRESTAPI@1 must forward for the lease service to
+# complete the task in callback mode (see leases.py).
+_LEASE_CALLBACK_HEADERS = (
+    '{"Content-Type": "application/json", '
+    '"PlanUrl": "$(System.CollectionUri)", '
+    '"ProjectId": "$(System.TeamProjectId)", '
+    '"HubName": "$(System.HostType)", '
+    '"PlanId": "$(System.PlanId)", '
+    '"JobId": "$(System.JobId)", '
+    '"TaskInstanceId": "$(System.TaskInstanceId)", '
+    '"AuthToken": "$(System.AccessToken)"}'
+)
+
+
+def _lease_step(
+    emit: Callable[[str], None],
+    job: Dict[str, Any],
+    connection: str,
+    acquire: bool,
+) -> None:
+    """Emit the InvokeRESTAPI@1 step acquiring or releasing ``job``'s leases.
 
-            lines.append(f"- job: {job_id}")
-            lines.append(f"  displayName: {group_num}- {job['name']}")
-            lines.append(f"  pool: {pipeline.pool}")
-            lines.append(f"  timeoutInMinutes: {job['timeout']}")
-            lines.append(f"  dependsOn: [{depends}]")
-            lines.append("  condition: succeededOrFailed()")
-            lines.append("  steps:")
-            lines.append(f"  - template: {job['template']}")
-            lines.append("    parameters:")
-            lines.append(
-                f"      connection: {pipeline.service_bus_connection}"
+    Acquiring waits in callback mode until every machine is free; the lease
+    lasts at most the job's timeout. Releasing always runs, so failed and
+    cancelled jobs hand their machines back too.
+    """
+    holder = f"$(Build.BuildId)-{job['job_id']}"
+    emit("  - task: InvokeRESTAPI@1")
+    if acquire:
+        body = json.dumps({
+            "holder": holder,
+            "machines": job["machines"],
+            "ttl": job["timeout"],
+        })
+        emit("    displayName: Acquire machine leases")
+    else:
+        body = json.dumps({"holder": holder})
+        emit("    displayName: Release machine leases")
+        emit("    condition: always()")
+    emit("    inputs:")
+    emit("      connectionType: connectedServiceName")
+    emit(f"      serviceConnection: {connection}")
+    emit("      method: POST")
+    if acquire:
+        emit(f"      headers: '{_LEASE_CALLBACK_HEADERS}'")
+    else:
+        emit("      headers: '{\"Content-Type\": \"application/json\"}'")
+    emit(f"      urlSuffix: {'acquire' if acquire else 'release'}")
+    emit(f"      body: '{body}'")
+    emit(f"      waitForCompletion: '{str(acquire).lower()}'")
+
+
+class AzdoYamlRenderer(Renderer):
+    """Azure DevOps pipeline YAML, the format committed under ``build/``."""
+    extension = ".yml"
+
+    def __init__(
+        self,
+        pipeline: PipelineSettings,
+        source_config: Optional[str] = None,
+        base_name: str = "benchmarks-ci",
+        regen_args: str = "",
+    ):
+        self.pipeline = pipeline
+        self.source_config = source_config
+        self.base_name = base_name
+        self.regen_args = regen_args
+
+    def _header(self, data: Dict[str, Any], emit: Callable[[str], None]):
+        emit("# Do not change this file, it is generated by the "
+             "pod-scheduler.")
+        emit("# Source of truth: see ../scripts/pod-scheduler/README.md")
+        emit("# To regenerate, run from the repo root:")
+        if self.source_config:
+            emit(
+                f"#   python ./scripts/pod-scheduler/main.py "
+                f"--config {self.source_config} --base-name {self.base_name} "
+                f"--yaml-output ./build{self.regen_args}"
+            )
+        else:
+            emit(
+                "#   python ./scripts/pod-scheduler/main.py "
+                "--config ./build/<config>.json "
+                "--yaml-output ./build"
             )
-            lines.append(f"      serviceBusQueueName: {queue}")
-            lines.append(
-                f"      serviceBusNamespace: {pipeline.service_bus_namespace}"
+        emit("")
+        emit("trigger: none")
+        emit("pr: none")
+        emit("")
+        if data["schedule"] is not None:
+            emit("schedules:")
+            emit(f'- cron: "{data["schedule"]}"')
+            emit("  always: true")
+            emit("  branches:")
+            emit("    include:")
+            emit("    - main")
+            emit("")
+        emit("variables:")
+        emit("  - template: job-variables.yml")
+        emit("  - name: session")
+        emit("    value: $(Build.BuildNumber)")
+        emit("  - name: buildId")
+        emit("    value: $(Build.BuildId)")
+        emit("  - name: buildNumber")
+        emit("    value: $(Build.BuildNumber)")
+        emit("  - name: am")
+        emit("    value: $[lt(format('{0:HH}', pipeline.startTime), 12)]")
+        emit("  - name: pm")
+        emit("    value: $[ge(format('{0:HH}', pipeline.startTime), 12)]")
+        emit("")
+        emit("jobs:")
+        emit("")
+
+    def _job(
+        self,
+        group_num: int,
+        job: Dict[str, Any],
+        emit: Callable[[str], None],
+        condition: str,
+    ) -> None:
+        pipeline = self.pipeline
+        emit(f"- job: {job['job_id']}")
+        emit(f"  displayName: {group_num}- {job['name']}")
+        emit(f"  pool: {pipeline.pool}")
+        emit(f"  timeoutInMinutes: {job['timeout']}")
+        emit(f"  dependsOn: [{', '.join(job['depends_on'])}]")
+        if job.get("gate"):
+            condition = (
+                f"and({condition}, "
+                f"ne(dependencies.{job['gate']}.result, 'Failed'))"
             )
-            lines.append(
-                f'      arguments: "$(ciProfile) {profiles_args} "'
+        emit(f"  condition: {condition}")
+        emit("  steps:")
+        if pipeline.lease_connection:
+            _lease_step(emit, job, pipeline.lease_connection, True)
+        for step in job["steps"]:
+            emit(f"  - template: {step['template']}")
+            emit("    parameters:")
+            emit(f"      connection: {pipeline.service_bus_connection}")
+            emit(f"      serviceBusQueueName: {job['queue']}")
+            emit(
+                f"      serviceBusNamespace: "
+                f"{pipeline.service_bus_namespace}"
             )
-            lines.append("")
+            emit(f'      arguments: "{job_arguments(step["profiles"])}"')
+        if pipeline.lease_connection:
+            _lease_step(emit, job, pipeline.lease_connection, False)
+        emit("")
+
+    @staticmethod
+    def _join(
+        group_num: int,
+        join: Dict[str, Any],
+        emit: Callable[[str], None],
+        condition: str,
+    ) -> None:
+        emit(f"- job: {join['job_id']}")
+        emit(f"  displayName: {group_num}- join")
+        emit("  pool: server")
+        emit(f"  dependsOn: [{', '.join(join['depends_on'])}]")
+        emit(f"  condition: {condition}")
+        emit("  steps:")
+        emit("  - task: Delay@1")
+        emit("    inputs:")
+        emit("      delayForMinutes: '0'")
+        emit("")
+
+    def write(self, data: Dict[str, Any], out: TextIO) -> None:
+        def emit(line: str) -> None:
+            out.write(line)
+            out.write("\n")
+
+        # succeededOrFailed() is false when a dependency was skipped, so
+        # once gated jobs can be skipped every job only stops on cancel.
+        gated = any(
+            job.get("gate")
+            for group in data["groups"] for job in group["jobs"]
+        )
+        condition = "not(canceled())" if gated else "succeededOrFailed()"
+
+        self._header(data, emit)
+        for group_num, group in enumerate(data["groups"], start=1):
+            emit(f"# GROUP {group_num}")
+            emit("")
+            for job in group["jobs"]:
+                self._job(group_num, job, emit, condition)
+            if group.get("join"):
+                self._join(group_num, group["join"], emit, condition)
+
+
+class LockFileRenderer(Renderer):
+    """The IR itself as JSON, one job per line, for downstream tools."""
+    extension = ".lock.json"
+
+    def write(self, data: Dict[str, Any], out: TextIO) -> None:
+        out.write("{\n")
+        for key in ("schema_version", "schedule", "queues", "makespan"):
+            out.write(f"  {json.dumps(key)}: {json.dumps(data.get(key))},\n")
+        out.write('  "groups": [')
+        for g, group in enumerate(data["groups"]):
+            out.write("," if g else "")
+            out.write('\n    {"deadline": ')
+            out.write(json.dumps(group.get("deadline")))
+            out.write(', "join": ')
+            out.write(json.dumps(group.get("join"), sort_keys=True))
+            out.write(', "jobs": [')
+            for j, job in enumerate(group["jobs"]):
+                out.write("," if j else "")
+                out.write("\n      ")
+                out.write(json.dumps(job, sort_keys=True))
+            out.write("\n    ]}")
+        out.write("\n  ]\n}\n")
+
+
+def load_lock_file(path: str) -> Dict[str, Any]:
+    """Read an IR written by :class:`LockFileRenderer`."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("schema_version") != IR_SCHEMA_VERSION:
+        raise GeneratorError(
+            f"{path}: unsupported lock file schema "
+            f"{data.get('schema_version')!r}, expected {IR_SCHEMA_VERSION}"
+        )
+    return data
 
-        prev_group_jobs = current_jobs
 
-    return "\n".join(lines) + "\n"
+def _render_yaml(
+    data: Dict[str, Any],
+    pipeline: PipelineSettings,
+    source_config: Optional[str] = None,
+    base_name: str = "benchmarks-ci",
+    regen_args: str = "",
+) -> str:
+    """Render the IR into Azure DevOps pipeline YAML, as a string."""
+    out = io.StringIO()
+    AzdoYamlRenderer(pipeline, source_config, base_name, regen_args).write(
+        data, out
+    )
+    return out.getvalue()
 
 
 def generate_yamls(
@@ -202,45 +536,60 @@ def generate_yamls(
     output_dir: str,
     base_name: str = "benchmarks-ci",
     source_config: Optional[str] = None,
+    regen_args: str = "",
+    scheduled: bool = True,
+    regen_base_name: Optional[str] = None,
+    renderers: Optional[List[Renderer]] = None,
+    timeouts: Optional[Dict[str, int]] = None,
+    gates: Optional[Dict[str, str]] = None,
 ) -> List[str]:
     """Generate YAML pipeline files for each sub-schedule.
 
-    All job ids are sanitized via :func:`sanitize_job_id` and verified to be
-    unique within the produced YAML; collisions raise GeneratorError instead
-    of producing AzDO-invalid output.
-
     ``source_config`` is the path to the JSON config that produced the
     schedule. When provided, it's embedded in the generated YAML header so
     each file documents the exact command needed to regenerate it.
+    ``regen_args`` holds any extra CLI flags (with a leading space) that the
+    regen command needs, e.g. `` --offline gold-db``.
+
+    With ``scheduled=False`` the ``schedules:`` block is omitted, producing a
+    manually-triggered one-off pipeline. ``regen_base_name`` overrides the
+    ``--base-name`` shown in the regen command when the file names carry a
+    mode-specific suffix (``-recovery``, ``-phase1``...).
+
+    ``renderers`` replaces the default single :class:`AzdoYamlRenderer`;
+    every renderer writes one file per sub-schedule, named after the YAML
+    with its own extension. ``timeouts`` and ``gates`` are passed on to
+    :func:`schedule_to_template_data`.
     """
     os.makedirs(output_dir, exist_ok=True)
+    if renderers is None:
+        renderers = [AzdoYamlRenderer(
+            config.pipeline,
+            source_config=source_config,
+            base_name=regen_base_name or base_name,
+            regen_args=regen_args,
+        )]
     output_files = []
 
     for i, sched in enumerate(schedules):
-        # Pre-flight: ensure every run already has a sanitized id.
-        for stage in sched.stages:
-            for run in stage.runs:
-                _ = sanitize_job_id(run.name)
-
         suffix = f"-{i + 1:02d}" if len(schedules) > 1 else ""
-        filename = f"{base_name}{suffix}.yml"
-        filepath = os.path.join(output_dir, filename)
-
         cron = _offset_cron(
             config.schedule, config.schedule_offset_hours * i
         )
-        data = schedule_to_template_data(sched, config, cron_override=cron)
-        yaml_content = _render_yaml(
-            data,
-            config.pipeline,
-            source_config=source_config,
-            base_name=base_name,
+        data = schedule_to_template_data(
+            sched, config, cron_override=cron, timeouts=timeouts,
+            gates=gates,
         )
+        if not scheduled:
+            data["schedule"] = None
 
-        with open(filepath, "w", newline="\n", encoding="utf-8") as f:
-            f.write(yaml_content)
-
-        output_files.append(filepath)
-        print(f"  Generated: {filepath}")
+        for renderer in renderers:
+            filepath = os.path.join(
+                output_dir, f"{base_name}{suffix}{renderer.extension}"
+            )
+            with open(filepath, "w", newline="\n", encoding="utf-8") as f:
+                renderer.write(data, f)
+            output_files.append(filepath)
+            print(f"  Generated: {filepath}")
 
     return output_files
@@ -0,0 +1,135 @@
+"""
+Pod-health gating.
+
+Jobs run with ``condition: succeededOrFailed()``, so when a pod's machines
+are broken every later job on that pod still holds them until it fails or
+times out. With ``metadata.pod_health`` (or ``--pod-health``), the first job
+of each pod that runs one of the listed sentinel scenarios (e.g. ``Build``)
+gates the pod's later jobs in the same pipeline: they depend on it and are
+skipped when it failed. A skipped job ends at once, so jobs chained behind
+it and the next stage barrier are not held back, and with machine leases
+the machines go back to the other jobs right away.
+
+The online dispatcher (see ``dispatcher.py``) prunes the same runs and
+hands their machines to other pods' runs. :func:`health_report` shows what
+gating saves in each pipeline when a sentinel fails.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set
+
+from generator import _job_timeout
+from models import (
+    ChainedRun,
+    CoalescedRun,
+    HealthSettings,
+    Run,
+    Schedule,
+    ScheduleConfig,
+)
+from timeline import layout
+
+
+def _jobs(schedule: Schedule) -> Iterator[Run]:
+    """AzDO jobs of ``schedule`` in pipeline order."""
+    for stage in schedule.stages:
+        for run in stage.runs:
+            yield from (run.parts if isinstance(run, ChainedRun) else [run])
+
+
+def is_sentinel(job: Run, sentinels: Set[str]) -> bool:
+    """True if ``job`` runs one of the ``sentinels`` scenarios."""
+    parts = job.parts if isinstance(job, CoalescedRun) else [job]
+    return any(p.scenario.name in sentinels for p in parts)
+
+
+def pod_gates(
+    schedules: List[Schedule], settings: HealthSettings
+) -> Dict[str, str]:
+    """Sentinel job id of every gated job, by job id.
+
+    Each split YAML is gated on its own: a pod whose sentinel runs in
+    another pipeline is not gated, as AzDO jobs cannot depend on jobs of
+    other pipelines. :func:`scheduler.lead_sentinels_per_split` gives each
+    YAML its own sentinels first.
+    """
+    sentinels = set(settings.sentinels)
+    gates: Dict[str, str] = {}
+    for sched in schedules:
+        sentinel_of: Dict[str, str] = {}
+        for job in _jobs(sched):
+            pod = job.pod.name
+            if pod in sentinel_of:
+                gates[job.job_name] = sentinel_of[pod]
+            elif is_sentinel(job, sentinels):
+                sentinel_of[pod] = job.job_name
+    return gates
+
+
+@dataclass
+class HealthCase:
+    """One pipeline when one pod's sentinel fails."""
+    label: str
+    pod: str
+    sentinel: str
+    # Jobs gated on the sentinel.
+    jobs: int
+    # Pipeline length when the gated jobs hold their machines until their
+    # timeout, and when they are skipped.
+    timing_out: float
+    skipped: float
+    # Job minutes the gated jobs would have spent timing out.
+    reclaimed: float
+
+
+def health_report(
+    config: ScheduleConfig,
+    schedules: List[Schedule],
+    gates: Dict[str, str],
+    timeouts: Optional[Dict[str, int]] = None,
+    label: str = "",
+) -> List[HealthCase]:
+    """One :class:`HealthCase` per pod with a sentinel in ``schedules``."""
+    timeouts = timeouts or {}
+    cases = []
+    for i, sched in enumerate(schedules):
+        jobs = {job.job_name: job for job in _jobs(sched)}
+        gated: Dict[str, List[Run]] = {}
+        for job_id, job in jobs.items():
+            if job_id in gates:
+                gated.setdefault(gates[job_id], []).append(job)
+        for sentinel, members in gated.items():
+            hung = {
+                job.job_name: float(
+                    timeouts.get(job.job_name, _job_timeout(job))
+                )
+                for job in members
+            }
+            cases.append(HealthCase(
+                label=f"{label} YAML {i + 1}",
+                pod=jobs[sentinel].pod.name,
+                sentinel=sentinel,
+                jobs=len(members),
+                timing_out=layout(sched, config.queues, hung).makespan,
+                skipped=layout(
+                    sched, config.queues, dict.fromkeys(hung, 0.0)
+                ).makespan,
+                reclaimed=sum(hung.values()),
+            ))
+    return cases
+
+
+def print_health_report(cases: List[HealthCase]) -> None:
+    """Print :func:`health_report` cases."""
+    width = max([len("Pipeline")] + [len(c.label) for c in cases])
+    pod_width = max([len("Pod")] + [len(c.pod) for c in cases])
+    print("POD HEALTH (a sentinel fails; its pod's later jobs):")
+    print(f"  {'Pipeline':<{width}} {'Pod':<{pod_width}} {'Jobs':>4} "
+          f"{'Timing out':>10} {'Skipped':>8} {'Reclaimed':>9}  Sentinel")
+    for c in cases:
+        print(f"  {c.label:<{width}} {c.pod:<{pod_width}} {c.jobs:>4} "
+              f"{c.timing_out:>9.0f}m {c.skipped:>7.0f}m {c.reclaimed:>8.0f}m"
+              f"  {c.sentinel}")
+    if not cases:
+        print("  (no pod runs jobs after a sentinel)")
+    print()
@@ -0,0 +1,408 @@
+"""
+Incremental rescheduling against a previously committed schedule.
+
+A fresh longest-job-first pass can reshuffle every group when a single
+scenario is added, which makes PR diffs unreadable and breaks per-slot runtime
+history. Incremental mode instead takes the committed layout as a baseline,
+keeps every run that still fits where it was, and only places new or
+displaced runs, choosing the slot that grows the makespan the least.
+
+The baseline is either the generated YAML files themselves (parsed for their
+``# GROUP N`` / ``- job:`` lines, skipping join jobs) or a sidecar JSON written by
+:func:`write_baseline`::
+
+    {"files": [{"groups": [["Proxies_gold_lin", "Grpc_gold_win"], ...]}]}
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from generator import JOIN_JOB_PREFIX
+from models import ChainedRun, Run, Schedule, ScheduleConfig, Stage
+from scheduler import (
+    Link,
+    SchedulerError,
+    _chain,
+    _parts,
+    backfill_schedule,
+    create_schedule,
+    expand_runs,
+    fill_idle,
+    plan_runs,
+    sequence_links,
+    sequence_order,
+    split_schedule,
+)
+
+
+_GROUP_RE = re.compile(r"^# GROUP (\d+)\s*$")
+_JOB_RE = re.compile(r"^- job: (\S+)\s*$")
+
+# Baseline layout: files -> groups -> job ids.
+Baseline = List[List[List[str]]]
+
+
+@dataclass
+class IncrementalReport:
+    """What incremental mode changed relative to the baseline."""
+    kept: List[str] = field(default_factory=list)
+    moved: List[str] = field(default_factory=list)
+    inserted: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    makespan: float = 0.0
+    fresh_makespan: float = 0.0
+
+    @property
+    def stability_cost(self) -> float:
+        """Extra minutes paid for keeping existing runs in place."""
+        return self.makespan - self.fresh_makespan
+
+
+def parse_baseline_yaml(paths: List[str]) -> Baseline:
+    """Read the group layout out of previously generated pipeline YAMLs."""
+    baseline: Baseline = []
+    for path in paths:
+        groups: List[List[str]] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if _GROUP_RE.match(line):
+                    groups.append([])
+                    continue
+                match = _JOB_RE.match(line)
+                if match and match.group(1).startswith(JOIN_JOB_PREFIX):
+                    continue
+                if match:
+                    if not groups:
+                        raise SchedulerError(
+                            f"{path}: job {match.group(1)!r} appears before "
+                            f"any '# GROUP' marker"
+                        )
+                    groups[-1].append(match.group(1))
+        baseline.append(groups)
+    return baseline
+
+
+def load_baseline(paths: List[str]) -> Baseline:
+    """Load a baseline from a sidecar JSON or from generated YAML files."""
+    if len(paths) == 1 and paths[0].endswith(".json"):
+        with open(paths[0], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        try:
+            return [list(map(list, entry["groups"])) for entry in data["files"]]
+        except (KeyError, TypeError) as exc:
+            raise SchedulerError(
+                f"{paths[0]} is not a pod-scheduler baseline: {exc}"
+            ) from exc
+    return parse_baseline_yaml(paths)
+
+
+def _lane(run: Run) -> List[Run]:
+    """The AzDO jobs of a stage lane; chained parts are jobs of their own."""
+    return list(run.parts) if isinstance(run, ChainedRun) else [run]
+
+
+def schedules_to_baseline(schedules: List[Schedule]) -> Baseline:
+    """Project split schedules onto the baseline layout, one id per job."""
+    return [
+        [
+            [part.job_name for run in stage.runs for part in _lane(run)]
+            for stage in sched.stages
+        ]
+        for sched in schedules
+    ]
+
+
+def write_baseline(schedules: List[Schedule], path: str) -> None:
+    """Write a sidecar JSON baseline for the next incremental run."""
+    payload = {
+        "files": [
+            {"groups": groups} for groups in schedules_to_baseline(schedules)
+        ]
+    }
+    with open(path, "w", newline="\n", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+
+
+def _makespan(schedules: List[Schedule]) -> float:
+    return max((s.total_duration for s in schedules), default=0.0)
+
+
+def _add(stage: Stage, run: Run, queue_count: int) -> bool:
+    """Put ``run`` in ``stage``, chained behind its pod's lane if it was.
+
+    A baseline lists chained parts (see ``scheduler.backfill_schedule``) as
+    consecutive jobs of one group; a run whose only collision is a lane of
+    its own pod is chained behind that lane again.
+    """
+    if stage.can_add(run, queue_count):
+        stage.runs.append(run)
+        return True
+    colliding = [
+        i for i, lane in enumerate(stage.runs)
+        if not lane.machines_used.isdisjoint(run.machines_used)
+    ]
+    if len(colliding) != 1:
+        return False
+    lane = stage.runs[colliding[0]]
+    if lane.pod.name != run.pod.name:
+        return False
+    stage.runs[colliding[0]] = _chain(_lane(lane) + [run])
+    return True
+
+
+def _remove(stage: Stage, run: Run) -> None:
+    """Take ``run`` out of ``stage``, unchaining it if it is a part."""
+    for i, lane in enumerate(stage.runs):
+        parts = _lane(lane)
+        if run in parts:
+            rest = [p for p in parts if p is not run]
+            if rest:
+                stage.runs[i] = _chain(rest)
+            else:
+                del stage.runs[i]
+            return
+
+
+# Job id -> (file, stage) index of a placed run.
+_Positions = Dict[str, Tuple[int, int]]
+
+
+def _hard_groups(
+    runs: List[Run], links: Dict[str, List[Link]]
+) -> Dict[str, str]:
+    """Job ids joined by ``after`` links, mapped to one id per group.
+
+    :func:`scheduler.split_schedule` keeps such runs in one YAML, in order.
+    """
+    root = {run.job_name: run.job_name for run in runs}
+
+    def find(job_id: str) -> str:
+        while root[job_id] != job_id:
+            job_id = root[job_id]
+        return job_id
+
+    for job_id, incoming in links.items():
+        for link in incoming:
+            if link.hard and link.before.job_name in root:
+                root[find(job_id)] = find(link.before.job_name)
+    return {job_id: find(job_id) for job_id in root}
+
+
+def _earliest(
+    run: Run,
+    links: Dict[str, List[Link]],
+    groups: Dict[str, str],
+    positions: _Positions,
+) -> Tuple[Optional[int], int]:
+    """File ``run`` must go to (None: any) and its first allowed stage.
+
+    A run goes to the YAML of the runs it is linked to by ``after``, and
+    after the stages of its ``after`` predecessors there.
+    """
+    group = groups[run.job_name]
+    files = {pos[0] for job_id, pos in positions.items()
+             if groups.get(job_id) == group}
+    if not files:
+        return None, 0
+    file_idx = min(files)
+    first = 1 + max(
+        (positions[link.before.job_name][1]
+         for link in links.get(run.job_name, ())
+         if link.hard and positions.get(link.before.job_name, (-1,))[0]
+         == file_idx),
+        default=-1,
+    )
+    return file_idx, first
+
+
+def _in_order(
+    run: Run,
+    links: Dict[str, List[Link]],
+    positions: _Positions,
+) -> bool:
+    """True if ``run`` is kept after its ``after`` predecessors' stages."""
+    file_idx, stage_idx = positions[run.job_name]
+    for link in links.get(run.job_name, ()):
+        if not link.hard:
+            continue
+        before = positions.get(link.before.job_name)
+        if before is None or before[0] != file_idx or before[1] >= stage_idx:
+            return False
+    return True
+
+
+def _best_slot(
+    run: Run,
+    schedules: List[Schedule],
+    queue_count: int,
+    file_only: Optional[int] = None,
+    first_stage: int = 0,
+) -> Optional[Tuple[int, int]]:
+    """Pick the (file, stage) that absorbs ``run`` with the least growth.
+
+    Only ``file_only`` is considered when given, and only stages from
+    ``first_stage`` on. Ties go to the lighter file, then to the earliest
+    position so output is deterministic.
+    """
+    best: Optional[Tuple[float, float, int, int]] = None
+    for file_idx, sched in enumerate(schedules):
+        if file_only is not None and file_idx != file_only:
+            continue
+        for stage_idx, stage in enumerate(sched.stages):
+            if stage_idx < first_stage:
+                continue
+            if not stage.can_add(run, queue_count):
+                continue
+            growth = max(0.0, run.estimated_runtime - stage.duration)
+            key = (growth, sched.total_duration + growth, file_idx, stage_idx)
+            if best is None or key < best:
+                best = key
+    if best is None:
+        return None
+    return best[2], best[3]
+
+
+def reschedule_incremental(
+    config: ScheduleConfig,
+    baseline: Baseline,
+    strict: bool = True,
+) -> Tuple[List[Schedule], IncrementalReport]:
+    """Re-plan ``config`` with as few moves relative to ``baseline`` as possible.
+
+    1. Runs still present in the config stay in their baseline group, unless
+       a changed machine set now collides with a neighbour or the run is no
+       longer after its ``after`` predecessors in the same file.
+    2. Remaining runs (new or displaced) are placed longest-first, after
+       their ``after`` predecessors, into the existing group that grows the
+       makespan the least. Runs linked by ``after`` share a file, as in
+       :func:`scheduler.split_schedule`.
+    3. Runs that fit nowhere get a new group at the end of the lightest file
+       (or of their linked runs' file).
+    4. With ``config.backfill``, each file is backfilled again (see
+       :func:`scheduler.backfill_schedule`). Runs the baseline chained
+       behind a lane of their pod are kept chained there.
+    5. ``filler`` scenarios go into the idle time left, file by file (see
+       :func:`scheduler.fill_idle`); baseline filler jobs are not kept.
+
+    Groups left empty by removed runs are dropped. The report compares the
+    resulting makespan with a fresh :func:`create_schedule` + split.
+    """
+    queue_count = len(config.queues)
+    if queue_count == 0:
+        raise SchedulerError(
+            "Cannot schedule with zero queues. Configure metadata.queues."
+        )
+    if not baseline:
+        raise SchedulerError("Baseline schedule contains no files")
+
+    runs = plan_runs(config, strict=strict)
+    by_job: Dict[str, Run] = {run.job_name: run for run in runs}
+    fillers = expand_runs(config, strict=strict, filler=True)
+    # Fillers are placed afresh into the idle time left, not kept.
+    filler_ids = {run.job_name for run in fillers}
+    report = IncrementalReport()
+
+    links = sequence_links(runs)
+    groups = _hard_groups(runs, links)
+    schedules: List[Schedule] = []
+    positions: _Positions = {}
+    for file_idx, groups_in_file in enumerate(baseline):
+        sched = Schedule()
+        for job_ids in groups_in_file:
+            stage = Stage()
+            for job_id in job_ids:
+                if job_id in filler_ids:
+                    continue
+                run = by_job.get(job_id)
+                if run is None:
+                    report.removed.append(job_id)
+                    continue
+                if job_id in positions:
+                    continue
+                if _add(stage, run, queue_count):
+                    positions[job_id] = (file_idx, len(sched.stages))
+                else:
+                    report.moved.append(run.name)
+            if stage.runs:
+                sched.stages.append(stage)
+        schedules.append(sched)
+
+    # A kept run whose ``after`` predecessors are not kept before it in
+    # the same YAML moves, and so do the runs that follow it in turn. Runs
+    # linked by ``after`` stay in the first YAML any of them is kept in.
+    out_of_order = True
+    while out_of_order:
+        out_of_order = False
+        home: Dict[str, int] = {}
+        for job_id, (file_idx, _) in positions.items():
+            group = groups[job_id]
+            home[group] = min(home.get(group, file_idx), file_idx)
+        for job_id in list(positions):
+            run = by_job[job_id]
+            if positions[job_id][0] != home[groups[job_id]] or not _in_order(
+                run, links, positions
+            ):
+                file_idx, stage_idx = positions.pop(job_id)
+                _remove(schedules[file_idx].stages[stage_idx], run)
+                report.moved.append(run.name)
+                out_of_order = True
+    report.kept = [by_job[job_id].name for job_id in positions]
+
+    pending = [run for run in runs if run.job_name not in positions]
+    pending.sort(key=lambda r: (-r.estimated_runtime, r.name))
+    pending = sequence_order(pending, links)
+    moved = set(report.moved)
+    for run in pending:
+        file_only, first_stage = _earliest(run, links, groups, positions)
+        slot = _best_slot(
+            run, schedules, queue_count, file_only, first_stage
+        )
+        if slot is None:
+            target = file_only if file_only is not None else min(
+                range(len(schedules)),
+                key=lambda i: (schedules[i].total_duration, i),
+            )
+            schedules[target].stages.append(Stage(runs=[run]))
+            slot = (target, len(schedules[target].stages) - 1)
+        else:
+            schedules[slot[0]].stages[slot[1]].runs.append(run)
+        positions[run.job_name] = slot
+        if run.name not in moved:
+            report.inserted.append(run.name)
+
+    for sched in schedules:
+        sched.stages = [stage for stage in sched.stages if stage.runs]
+    schedules = [s for s in schedules if s.stages]
+    if config.backfill:
+        # Runs backfill chains into an earlier group have moved.
+        chained = {
+            part.job_name for sched in schedules for stage in sched.stages
+            for run in stage.runs for part in _lane(run)[1:]
+        }
+        schedules = [backfill_schedule(sched) for sched in schedules]
+        for sched in schedules:
+            for stage in sched.stages:
+                for run in stage.runs:
+                    for part in _lane(run)[1:]:
+                        if (part.job_name not in chained
+                                and part.name in report.kept):
+                            report.kept.remove(part.name)
+                            report.moved.append(part.name)
+    for i, sched in enumerate(schedules):
+        if not fillers:
+            break
+        schedules[i] = fill_idle(sched, fillers, queue_count)
+        # Each filler runs at most once per cycle, in the first file with room.
+        used = {part.job_name for stage in schedules[i].stages
+                for run in stage.runs for part in _parts(run)}
+        fillers = [run for run in fillers if run.job_name not in used]
+    report.makespan = _makespan(schedules)
+    fresh = split_schedule(
+        create_schedule(config, strict=strict), len(baseline)
+    )
+    report.fresh_makespan = _makespan(fresh)
+    return schedules, report
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Timeline (job-shop) scheduling engine.
+
+:func:`scheduler.create_schedule` packs runs into stages and minimises the
+sum of stage maxima, which is the right objective only while every stage
+waits at a barrier. Once a run can start as soon as its own machines are
+free (see ``dispatcher.py``), each physical machine and each queue is simply
+a resource with an availability time. This engine places runs at their
+earliest feasible start:
+
+1. Order the runs by a priority rule (see :data:`PRIORITY_RULES`).
+2. Place each run in that order at the earliest time all of its machines
+   and one queue are free for its whole runtime, idle gaps included. Among
+   free queues it takes the one whose last job ended latest, so queues that
+   freed up early stay open for other runs.
+3. Optionally refine the order by local search: swap two runs, keep the
+   swap when the makespan shrinks.
+
+Every placement records the jobs it waits for, namely the previous holder of
+each of its machines and of its queue. Both makespans are computed from the
+same runs and estimates, so they can be compared directly:
+
+    python jobshop.py --config build/benchmarks_ci_pods.json --iterations 2000
+"""
+
+import argparse
+import json
+import random
+import sys
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config_loader import ConfigError, load_config
+from generator import GeneratorError
+from models import Run, ScheduleConfig
+from scheduler import (
+    SchedulerError,
+    create_schedule,
+    makespan_lower_bound,
+    plan_runs,
+    reuse_discount,
+    run_priority,
+    sequence_links,
+    sequence_order,
+)
+
+
+@dataclass
+class Slot:
+    """One run placed on the time axis."""
+    run: Run
+    queue: str
+    start: float
+    end: float
+    # Job ids that must finish first: the previous holder of each machine
+    # and of the queue.
+    after: List[str] = field(default_factory=list)
+
+
+@dataclass
+class JobShopSchedule:
+    """Runs with start offsets, in placement order."""
+    slots: List[Slot] = field(default_factory=list)
+
+    @property
+    def makespan(self) -> float:
+        return max((s.end for s in self.slots), default=0.0)
+
+    def to_json(self) -> Dict:
+        return {
+            "makespan": self.makespan,
+            "runs": [
+                {
+                    "job": s.run.job_name,
+                    "queue": s.queue,
+                    "start": s.start,
+                    "end": s.end,
+                    "after": s.after,
+                }
+                for s in self.slots
+            ],
+        }
+
+
+def _machine_load(runs: List[Run]) -> Dict[str, float]:
+    load: Dict[str, float] = {}
+    for run in runs:
+        for m in run.machines_used:
+            load[m] = load.get(m, 0.0) + run.estimated_runtime
+    return load
+
+
+def _ljf(runs: List[Run]) -> List[Run]:
+    return sorted(runs, key=lambda r: (-r.estimated_runtime, r.name))
+
+
+def _busiest_machine(runs: List[Run]) -> List[Run]:
+    # Runs on the most loaded machines first: they form the critical path.
+    load = _machine_load(runs)
+    return sorted(runs, key=lambda r: (
+        -max((load[m] for m in r.machines_used), default=0.0),
+        -r.estimated_runtime,
+        r.name,
+    ))
+
+
+def _priority(runs: List[Run]) -> List[Run]:
+    return sorted(runs, key=lambda r: (
+        -run_priority(r), -r.estimated_runtime, r.name
+    ))
+
+
+# name -> function ordering the runs for placement
+PRIORITY_RULES: Dict[str, Callable[[List[Run]], List[Run]]] = {
+    "ljf": _ljf,
+    "busiest-machine": _busiest_machine,
+    "priority": _priority,
+}
+
+
+# (start, end, job id) spans a machine or queue is held for
+_Busy = List[Tuple[float, float, str]]
+
+
+def _fits(busy: _Busy, start: float, end: float) -> bool:
+    return all(e <= start or s >= end for s, e, _ in busy)
+
+
+def _previous_holders(resources: List[_Busy]) -> Dict[str, List[str]]:
+    """Job ids each job waits for: the previous holder of each resource.
+
+    Derived from the final spans, so a run placed into a gap ahead of an
+    earlier placement becomes that placement's predecessor in turn.
+    """
+    after: Dict[str, Set[str]] = {}
+    for busy in resources:
+        spans = sorted(busy)
+        for (_, _, job), (_, _, nxt) in zip(spans, spans[1:]):
+            after.setdefault(nxt, set()).add(job)
+    return {job: sorted(jobs) for job, jobs in after.items()}
+
+
+def place(ordered: List[Run], queues: List[str]) -> JobShopSchedule:
+    """Place runs in ``ordered`` order at their earliest feasible start.
+
+    A run may go into an idle gap left between earlier placements, as long as
+    all of its machines and one queue are free for its whole runtime. Runs
+    with :func:`scheduler.sequence_links` are placed after their
+    predecessors and start wherever they finish first, reuse discount
+    included.
+    """
+    if not queues:
+        raise SchedulerError(
+            "Cannot schedule with zero queues. Configure metadata.queues."
+        )
+    links = sequence_links(ordered)
+    ordered = sequence_order(ordered, links)
+    machine_busy: Dict[str, _Busy] = {}
+    queue_busy: List[_Busy] = [[] for _ in queues]
+    # Job id -> end, for runs other runs are linked to.
+    ends: Dict[str, float] = {}
+    result = JobShopSchedule()
+    for run in ordered:
+        machines = [machine_busy.setdefault(m, []) for m in
+                    sorted(run.machines_used)]
+        incoming = links.get(run.job_name, [])
+        earliest = max(
+            (ends[link.before.job_name] for link in incoming
+             if link.hard and link.before.job_name in ends),
+            default=0.0,
+        )
+        # The earliest start is 0 or the moment some resource frees up.
+        candidates = sorted({earliest} | {
+            e for busy in machines + queue_busy for _, e, _ in busy
+            if e >= earliest
+        })
+        best: Optional[Tuple[float, float, float, List[int]]] = None
+        for start in candidates:
+            minutes = run.estimated_runtime - reuse_discount(
+                incoming,
+                lambda r: ends.get(r.job_name, float("inf")) <= start,
+            )
+            end = start + minutes
+            if best is not None and end >= best[1]:
+                continue
+            if not all(_fits(busy, start, end) for busy in machines):
+                continue
+            free = [i for i, busy in enumerate(queue_busy)
+                    if _fits(busy, start, end)]
+            if free:
+                best = (start, end, minutes, free)
+                # Without reuse discounts the earliest start ends first.
+                if not incoming:
+                    break
+        start, end, minutes, free = best
+        if minutes != run.estimated_runtime:
+            run = replace(run, estimated_runtime=minutes)
+        if links:
+            ends[run.job_name] = end
+        # Among free queues, the one whose last job ended latest; ties in
+        # config order.
+        lane = max(free, key=lambda i: (
+            max((e for _, e, _ in queue_busy[i] if e <= start), default=0.0),
+            -i,
+        ))
+        for busy in machines + [queue_busy[lane]]:
+            busy.append((start, end, run.job_name))
+        result.slots.append(Slot(run, queues[lane], start, end))
+    after = _previous_holders(list(machine_busy.values()) + queue_busy)
+    for slot in result.slots:
+        slot.after = after.get(slot.run.job_name, [])
+    return result
+
+
+def refine(
+    ordered: List[Run],
+    queues: List[str],
+    iterations: int,
+    seed: int = 0,
+    bound: float = 0.0,
+) -> List[Run]:
+    """Improve a placement order by random pairwise swaps.
+
+    A swap is kept when it shortens the makespan; the search is seeded so
+    the result is reproducible, and stops early once the makespan reaches
+    ``bound``.
+    """
+    rng = random.Random(seed)
+    best = list(ordered)
+    best_span = place(best, queues).makespan
+    if len(best) < 2:
+        return best
+    for _ in range(iterations):
+        if best_span <= bound:
+            break
+        i, j = rng.sample(range(len(best)), 2)
+        best[i], best[j] = best[j], best[i]
+        span = place(best, queues).makespan
+        if span < best_span:
+            best_span = span
+        else:
+            best[i], best[j] = best[j], best[i]
+    return best
+
+
+def timeline_schedule(
+    config: ScheduleConfig,
+    strict: bool = True,
+    rule: Optional[str] = None,
+    iterations: int = 0,
+    seed: int = 0,
+) -> JobShopSchedule:
+    """Schedule ``config``'s runs on a timeline instead of in stages.
+
+    Uses the same jobs as :func:`scheduler.create_schedule` (see
+    :func:`scheduler.plan_runs`). With no ``rule``, every rule is tried and
+    the shortest is kept (ties go to the first rule in
+    :data:`PRIORITY_RULES`); ``iterations`` then refines that order.
+    """
+    if rule is not None and rule not in PRIORITY_RULES:
+        raise SchedulerError(
+            f"Unknown priority rule {rule!r}; expected one of "
+            f"{', '.join(PRIORITY_RULES)}"
+        )
+    runs = plan_runs(config, strict=strict)
+    rules = [rule] if rule else list(PRIORITY_RULES)
+    orders = [PRIORITY_RULES[r](runs) for r in rules]
+    ordered = min(
+        orders, key=lambda o: place(o, config.queues).makespan
+    )
+    if iterations:
+        bound = makespan_lower_bound(runs, len(config.queues))
+        ordered = refine(ordered, config.queues, iterations, seed, bound)
+    return place(ordered, config.queues)
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Schedule runs on a timeline and compare the makespan "
+                    "with the stage engine"
+    )
+    parser.add_argument(
+        "--config", required=True,
+        help="Path to JSON configuration file"
+    )
+    parser.add_argument(
+        "--rule", choices=list(PRIORITY_RULES),
+        help="Priority rule (default: the best of all rules)"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=0,
+        help="Local-search swaps to try after list scheduling (default: 0)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Random seed for the local search (default: 0)"
+    )
+    parser.add_argument(
+        "--json", metavar="PATH",
+        help="Write start offsets and dependencies as JSON to PATH"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    strict = not args.lenient
+    try:
+        config = load_config(args.config)
+        plan = timeline_schedule(
+            config, strict, args.rule, args.iterations, args.seed
+        )
+        stages = create_schedule(config, strict=strict)
+        bound = makespan_lower_bound(
+            plan_runs(config, strict=strict), len(config.queues)
+        )
+        print(f"{'Job':<40} {'Queue':<10} {'Start':>7} {'End':>7}  After")
+        for s in sorted(plan.slots, key=lambda s: (s.start, s.queue)):
+            print(f"{s.run.name:<40} {s.queue:<10} {s.start:>6.0f}m "
+                  f"{s.end:>6.0f}m  {', '.join(s.after)}")
+        print()
+        print(f"Stage engine:    {stages.total_duration:.0f} min")
+        print(f"Timeline engine: {plan.makespan:.0f} min "
+              f"({plan.makespan - stages.total_duration:+.0f})")
+        print(f"Lower bound:     {bound:.0f} min")
+        if args.json:
+            with open(args.json, "w", newline="\n", encoding="utf-8") as f:
+                json.dump(plan.to_json(), f, indent=2)
+                f.write("\n")
+            print(f"\n  Wrote {args.json}")
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Machine lease registry.
+
+A static schedule only avoids collisions while the estimates hold. When a
+stage overruns, or split YAMLs overlap, two crank jobs can hit the same
+machine and corrupt each other's measurements. With
+``metadata.pipeline.lease_connection`` set, the generator wraps every job
+in an acquire/release pair of ``InvokeRESTAPI@1`` steps against this
+service, so a collision becomes a wait.
+
+Generated jobs are agentless, so acquiring uses the task's callback mode.
+The service answers at once and, when every machine of the job is free,
+posts ``TaskCompleted`` back to the pipeline plan. Plain clients (tests,
+scripts) get ``200`` when the leases are granted and ``409`` when they are
+not. Every lease has a TTL in minutes, so a job that never releases (e.g.
+a cancelled run) cannot block a machine forever.
+
+    LEASE_SECRET=... python leases.py serve --port 8080 \
+        --azdo-url https://dev.azure.com/dnceng/
+
+Every request must carry the shared secret as the password of a basic
+``Authorization`` header, which is what a generic service connection with
+that password sends. Callback-mode requests are only honoured for a
+``PlanUrl`` under ``--azdo-url``, so the job's access token is never sent
+anywhere else.
+
+Endpoints (JSON bodies):
+
+    POST /acquire  {"holder": ID, "machines": [...], "ttl": MINUTES}
+    POST /release  {"holder": ID}
+    GET  /leases
+"""
+
+import argparse
+import base64
+import binascii
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Headers an InvokeRESTAPI@1 step passes in callback mode (see the generator).
+CALLBACK_HEADERS = (
+    "PlanUrl", "ProjectId", "HubName", "PlanId", "JobId", "TaskInstanceId",
+    "AuthToken",
+)
+
+# Environment variable holding the shared secret for ``serve``.
+SECRET_ENV = "LEASE_SECRET"
+
+
+class LeaseError(ValueError):
+    """Raised for malformed lease requests."""
+
+
+@dataclass
+class Lease:
+    holder: str
+    # Clock time, in seconds, after which the lease lapses.
+    expires: float
+
+
+@dataclass
+class _Waiter:
+    holder: str
+    machines: List[str]
+    ttl: float
+    on_granted: Callable[[], None]
+
+
+class LeaseRegistry:
+    """Thread-safe all-or-nothing leases on machines.
+
+    A holder gets every machine it asks for or none of them, so two jobs can
+    never each hold half of what the other needs. ``clock`` returns seconds
+    and is injectable for tests.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Lease] = {}
+        self._waiters: List[_Waiter] = []
+
+    def _free(self, holder: str, machines: List[str], now: float) -> bool:
+        return all(
+            m not in self._leases
+            or self._leases[m].holder == holder
+            or self._leases[m].expires <= now
+            for m in machines
+        )
+
+    def _grant(self, holder: str, machines: List[str], ttl: float,
+               now: float) -> None:
+        for m in machines:
+            self._leases[m] = Lease(holder, now + ttl * 60)
+
+    def _wake(self, now: float) -> List[Callable[[], None]]:
+        """Grant waiters that now fit, in arrival order; return callbacks."""
+        granted = []
+        # Machines wanted by an earlier waiter that is still blocked.
+        claimed: set = set()
+        for waiter in list(self._waiters):
+            if claimed.isdisjoint(waiter.machines) and self._free(
+                waiter.holder, waiter.machines, now
+            ):
+                self._grant(waiter.holder, waiter.machines, waiter.ttl, now)
+                self._waiters.remove(waiter)
+                granted.append(waiter.on_granted)
+            else:
+                claimed.update(waiter.machines)
+        return granted
+
+    def acquire(
+        self,
+        holder: str,
+        machines: List[str],
+        ttl: float,
+        on_granted: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """Lease every machine to ``holder`` for ``ttl`` minutes.
+
+        Returns whether the leases were granted now. Otherwise, with
+        ``on_granted``, the request waits and the callback runs once it is
+        granted; without it, nothing is held.
+        """
+        if not holder or not machines or ttl <= 0:
+            raise LeaseError(
+                "acquire needs a holder, at least one machine and a TTL > 0"
+            )
+        with self._lock:
+            now = self._clock()
+            # Earlier waiters go first, so a steady stream of short jobs
+            # cannot starve a job waiting on the same machines.
+            blocked = any(
+                set(w.machines) & set(machines) for w in self._waiters
+            )
+            if not blocked and self._free(holder, machines, now):
+                self._grant(holder, machines, ttl, now)
+                return True
+            if on_granted is not None:
+                self._waiters.append(
+                    _Waiter(holder, list(machines), ttl, on_granted)
+                )
+            return False
+
+    def release(self, holder: str) -> List[str]:
+        """Release every lease of ``holder`` and drop its pending request."""
+        with self._lock:
+            released = sorted(
+                m for m, lease in self._leases.items()
+                if lease.holder == holder
+            )
+            for m in released:
+                del self._leases[m]
+            self._waiters = [w for w in self._waiters if w.holder != holder]
+            callbacks = self._wake(self._clock())
+        for callback in callbacks:
+            callback()
+        return released
+
+    def expire(self) -> List[str]:
+        """Drop lapsed leases and grant the waiters they were blocking."""
+        with self._lock:
+            now = self._clock()
+            lapsed = sorted(
+                m for m, lease in self._leases.items() if lease.expires <= now
+            )
+            for m in lapsed:
+                del self._leases[m]
+            callbacks = self._wake(now)
+        for callback in callbacks:
+            callback()
+        return lapsed
+
+    def snapshot(self) -> Dict[str, object]:
+        """Current holders and waiting requests, for ``GET /leases``."""
+        with self._lock:
+            now = self._clock()
+            return {
+                "leases": {
+                    m: {"holder": lease.holder,
+                        "expires_in": round(lease.expires - now, 1)}
+                    for m, lease in sorted(self._leases.items())
+                    if lease.expires > now
+                },
+                "waiting": [
+                    {"holder": w.holder, "machines": w.machines}
+                    for w in self._waiters
+                ],
+            }
+
+
+def _basic_password(header: str) -> Optional[str]:
+    """Password of a basic ``Authorization`` header, if it is one."""
+    scheme, _, encoded = header.partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        decoded = base64.b64decode(encoded.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return decoded.decode("utf-8", "replace").partition(":")[2]
+
+
+def is_under(url: str, base: str) -> bool:
+    """True if ``url`` is ``base`` or below it (same scheme and host)."""
+    target = urllib.parse.urlsplit(url)
+    root = urllib.parse.urlsplit(base)
+    prefix = root.path.rstrip("/") + "/"
+    return (
+        target.scheme.lower() == root.scheme.lower()
+        and target.netloc.lower() == root.netloc.lower()
+        and (target.path.rstrip("/") + "/").startswith(prefix)
+        and not target.query
+        and not target.fragment
+    )
+
+
+def azdo_task_completed(headers: Dict[str, str]) -> Callable[[], None]:
+    """Callback posting ``TaskCompleted`` for an InvokeRESTAPI@1 step."""
+    def complete() -> None:
+        # Ids are quoted so they cannot steer the URL off the plan.
+        ids = {h: urllib.parse.quote(headers[h], safe="")
+               for h in ("ProjectId", "HubName", "PlanId")}
+        url = (
+            f"{headers['PlanUrl'].rstrip('/')}/{ids['ProjectId']}"
+            f"/_apis/distributedtask/hubs/{ids['HubName']}"
+            f"/plans/{ids['PlanId']}/events?api-version=2.0-preview.1"
+        )
+        body = json.dumps({
+            "name": "TaskCompleted",
+            "taskId": headers["TaskInstanceId"],
+            "jobId": headers["JobId"],
+            "result": "succeeded",
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            url, data=body, method="POST", headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {headers['AuthToken']}",
+            },
+        )
+        try:
+            urllib.request.urlopen(request, timeout=30).close()
+        except (urllib.error.URLError, OSError) as exc:
+            print(f"WARNING: callback for {headers['JobId']} failed: {exc}",
+                  file=sys.stderr)
+    return complete
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "LeaseServer"
+
+    def _reply(self, status: int, payload: Dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as exc:
+            raise LeaseError(f"Request body is not valid JSON: {exc}")
+        if not isinstance(body, dict):
+            raise LeaseError("Request body must be a JSON object")
+        return body
+
+    def _authorized(self) -> bool:
+        """Check the shared secret; reply 401 when it is missing or wrong."""
+        password = _basic_password(self.headers.get("Authorization", ""))
+        if password is not None and hmac.compare_digest(
+            password.encode("utf-8"), self.server.secret.encode("utf-8")
+        ):
+            return True
+        data = json.dumps({"error": "unauthorized"}).encode("utf-8")
+        self.send_response(401)
+        self.send_header("WWW-Authenticate", 'Basic realm="leases"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return False
+
+    @property
+    def _route(self) -> str:
+        # Service connection URLs may or may not end in "/".
+        return "/" + self.path.split("?", 1)[0].strip("/")
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self._route != "/leases":
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        self._reply(200, self.server.registry.snapshot())
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        registry = self.server.registry
+        try:
+            body = self._body()
+            if self._route == "/acquire":
+                holder = str(body.get("holder") or "")
+                machines = body.get("machines") or []
+                ttl = float(body.get("ttl") or 0)
+                if not all(h in self.headers for h in CALLBACK_HEADERS):
+                    granted = registry.acquire(holder, machines, ttl)
+                    self._reply(200 if granted else 409, {"granted": granted})
+                    return
+                if not is_under(self.headers["PlanUrl"],
+                                self.server.azdo_url):
+                    self._reply(403, {
+                        "error": "PlanUrl is not under the configured "
+                                 "AzDO URL",
+                    })
+                    return
+                callback = self.server.callback(
+                    {h: self.headers[h] for h in CALLBACK_HEADERS}
+                )
+                # Answer before calling back, as the task expects.
+                granted = registry.acquire(holder, machines, ttl, callback)
+                self._reply(200, {"granted": granted})
+                if granted:
+                    callback()
+            elif self._route == "/release":
+                holder = str(body.get("holder") or "")
+                self._reply(200, {"released": registry.release(holder)})
+            else:
+                self._reply(404, {"error": f"unknown path {self.path}"})
+        except (LeaseError, TypeError, ValueError) as exc:
+            self._reply(400, {"error": str(exc)})
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class LeaseServer(ThreadingHTTPServer):
+    """HTTP front end of a :class:`LeaseRegistry`.
+
+    Every request must carry ``secret`` (see :func:`_basic_password`), and
+    callback-mode requests must name a plan under ``azdo_url``.
+    ``callback`` builds the function run when a waiting callback-mode
+    request is granted; tests replace it to observe grants.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        secret: str,
+        azdo_url: str,
+        registry: Optional[LeaseRegistry] = None,
+        verbose: bool = False,
+    ):
+        if not secret:
+            raise LeaseError("The lease server needs a shared secret")
+        if urllib.parse.urlsplit(azdo_url).scheme not in ("http", "https"):
+            raise LeaseError(f"Invalid AzDO URL {azdo_url!r}")
+        super().__init__(address, _Handler)
+        self.secret = secret
+        self.azdo_url = azdo_url
+        self.registry = registry or LeaseRegistry()
+        self.callback = azdo_task_completed
+        self.verbose = verbose
+
+    def expire_every(self, seconds: float) -> threading.Thread:
+        """Start a daemon thread running :meth:`LeaseRegistry.expire`."""
+        def loop() -> None:
+            while True:
+                time.sleep(seconds)
+                self.registry.expire()
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serve machine leases for pod-scheduler pipelines"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the lease HTTP service")
+    serve.add_argument(
+        "--host", default="127.0.0.1",
+        help="Address to listen on (default: 127.0.0.1)"
+    )
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument(
+        "--azdo-url", required=True,
+        help="Collection URL callbacks may go to, e.g. "
+             "https://dev.azure.com/dnceng/"
+    )
+    serve.add_argument(
+        "--verbose", action="store_true", help="Log every request"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    secret = os.environ.get(SECRET_ENV, "")
+    if not secret:
+        print(f"ERROR: Set {SECRET_ENV} to the password of the lease "
+              f"service connection", file=sys.stderr)
+        return 1
+    try:
+        server = LeaseServer(
+            (args.host, args.port), secret, args.azdo_url,
+            verbose=args.verbose,
+        )
+    except LeaseError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    server.expire_every(30)
+    print(f"Serving leases on {args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
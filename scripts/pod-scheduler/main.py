@@ -16,17 +16,59 @@ import argparse
 import json
 import os
 import sys
-from typing import List
+from typing import Dict, List, Tuple
 
 from config_loader import ConfigError, load_config
-from generator import GeneratorError, generate_yamls, schedule_to_template_data
-from models import Schedule, ScheduleConfig
+from deadlines import (
+    hang_report,
+    job_deadlines,
+    print_hang_report,
+    template_budgets,
+)
+from explain import bottlenecks, rejections_for
+from freshness import freshness_split, max_gaps, pipelines_for
+from generator import (
+    AzdoYamlRenderer,
+    GeneratorError,
+    LockFileRenderer,
+    generate_yamls,
+    schedule_to_template_data,
+)
+from health import health_report, pod_gates, print_health_report
+from incremental import (
+    IncrementalReport,
+    load_baseline,
+    reschedule_incremental,
+    schedules_to_baseline,
+    write_baseline,
+)
+from metrics import build_metrics, write_metrics
+from models import (
+    ChainedRun,
+    DeadlineSettings,
+    HealthSettings,
+    Schedule,
+    ScheduleConfig,
+)
+from multirate import cycle_period, phase_configs
+from outage import OutageReport, apply_outage, parse_offline, repack_affected
+from recovery import create_recovery_schedule, load_results
+from risk import (
+    Sampler,
+    load_history,
+    print_risk_report,
+    risk_report,
+    risk_schedule,
+)
 from scheduler import (
     SchedulerError,
+    completion_times,
     create_schedule,
     expand_runs,
+    lead_sentinels_per_split,
     split_schedule,
 )
+from timeline import TraceRenderer, load_durations, write_timeline
 
 
 def print_summary(config: ScheduleConfig, schedule: Schedule) -> None:
@@ -41,6 +83,16 @@ def print_summary(config: ScheduleConfig, schedule: Schedule) -> None:
     print(f"  Queues: {len(config.queues)} ({', '.join(config.queues)})")
     print(f"  Est. total time: {schedule.total_duration:.0f} min "
           f"({schedule.total_duration / 60:.1f} hrs)")
+    fillers = [
+        part
+        for stage in schedule.stages for run in stage.runs
+        for part in (run.parts if isinstance(run, ChainedRun) else [run])
+        if part.scenario.filler
+    ]
+    if fillers:
+        print(f"  Filler runs: {len(fillers)} "
+              f"({sum(r.estimated_runtime for r in fillers):.0f} min "
+              f"of idle time used)")
     print()
 
     machine_time = {}
@@ -52,9 +104,10 @@ def print_summary(config: ScheduleConfig, schedule: Schedule) -> None:
                 stage_machines.add(m)
                 machine_time.setdefault(m, 0)
                 machine_time[m] += run.estimated_runtime
+        duration = stage.duration
         for m in stage_machines:
             machine_total.setdefault(m, 0)
-            machine_total[m] += stage.duration
+            machine_total[m] += duration
 
     if machine_total:
         print("MACHINE UTILIZATION:")
@@ -94,6 +147,142 @@ def print_split_summary(schedules: List[Schedule], config: ScheduleConfig) -> No
     print()
 
 
+def print_priority_report(schedules: List[Schedule]) -> None:
+    """Show when each priority class's results are expected to land.
+
+    Times are minutes after the start of the YAML holding the run. Nothing
+    is printed when no scenario sets a priority.
+    """
+    classes = {}
+    for sched in schedules:
+        for run, finish in completion_times(sched):
+            classes.setdefault(run.scenario.priority, []).append(finish)
+    if set(classes) <= {0}:
+        return
+    print("PRIORITY COMPLETION (min after YAML start):")
+    print(f"  {'Priority':>8} {'Runs':>5} {'Mean':>7} {'Last':>7}")
+    for priority in sorted(classes, reverse=True):
+        finishes = classes[priority]
+        print(f"  {priority:>8} {len(finishes):>5} "
+              f"{sum(finishes) / len(finishes):>7.0f} {max(finishes):>7.0f}")
+    print()
+
+
+def print_multirate_report(
+    config: ScheduleConfig,
+    outputs: List[Tuple[ScheduleConfig, List[Schedule], str]],
+    strict: bool = True,
+) -> None:
+    """Compare per-phase makespans with running everything every cycle."""
+    yaml_count = len(outputs[0][1])
+    single = split_schedule(create_schedule(config, strict=strict), yaml_count)
+    single_span = max(s.total_duration for s in single)
+    print(f"MULTI-RATE ({len(outputs)}-cycle pattern):")
+    for phase_config, schedules, name in outputs:
+        span = max(s.total_duration for s in schedules)
+        runs = sum(s.total_runs for s in schedules)
+        print(f"  {name:<30} {phase_config.schedule:<14} {runs:>3} runs  "
+              f"{span:>5.0f} min")
+    print(f"  Every scenario every cycle: {single_span:.0f} min")
+    print()
+
+
+def print_freshness_report(
+    pipelines: List[Tuple[str, Schedule]],
+    limit: int = 5,
+) -> None:
+    """Show the result series whose data points are least evenly spaced."""
+    gaps = max_gaps(pipelines)
+    if not gaps:
+        return
+    worst = sorted(
+        gaps.items(), key=lambda kv: (kv[1][1] - kv[1][0], kv[0])
+    )
+    print("FRESHNESS (max gap between results over 24h):")
+    print(f"  {'Series':<40} {'Max gap':>8} {'Ideal':>8}")
+    for (scenario, pod), (gap, ideal) in worst[:limit]:
+        print(f"  {scenario + ' ' + pod:<40} {gap / 60:>6.1f}h "
+              f"{ideal / 60:>6.1f}h")
+    print()
+
+
+def print_incremental_report(report: IncrementalReport) -> None:
+    """Summarise what incremental mode changed relative to the baseline."""
+    print("INCREMENTAL RESCHEDULE:")
+    print(f"  Kept in place: {len(report.kept)}")
+    for label, names in (
+        ("Inserted", report.inserted),
+        ("Moved", report.moved),
+        ("Removed", report.removed),
+    ):
+        print(f"  {label}: {len(names)}")
+        for name in names:
+            print(f"    {name}")
+    print(f"  Makespan: {report.makespan:.0f} min "
+          f"(fresh schedule: {report.fresh_makespan:.0f} min, "
+          f"stability cost: {report.stability_cost:+.0f} min)")
+    print()
+
+
+def print_outage_report(report: OutageReport) -> None:
+    """List runs rerouted or lost because of offline machines."""
+    print(f"OUTAGE ({', '.join(report.offline)} offline):")
+    print(f"  Rerouted: {len(report.rerouted)}")
+    for scenario, src, dst in report.rerouted:
+        print(f"    {scenario}: {src} -> {dst}")
+    print(f"  Lost: {len(report.lost)}")
+    for name in report.lost:
+        print(f"    {name}")
+    if report.makespan:
+        repacked = ", ".join(str(i + 1) for i in report.repacked) or "none"
+        print(f"  Repacked YAMLs: {repacked} "
+              f"(makespan: {report.makespan:.0f} min)")
+    else:
+        print("  Use --repack to schedule the changed YAMLs afresh.")
+    print()
+
+
+def print_bottleneck_report(
+    config: ScheduleConfig,
+    strict: bool = True,
+    run_name: str = "",
+    limit: int = 10,
+) -> None:
+    """Rank what pushes runs into later stages; optionally explain one run."""
+    rejections = []
+    create_schedule(config, strict=strict, rejections=rejections)
+    if run_name:
+        mine = rejections_for(rejections, run_name)
+        print(f"WHY {run_name} IS IN STAGE {len(mine)} (packing order):")
+        for r in mine:
+            reasons = []
+            if r.machines:
+                reasons.append(
+                    "machine conflict on " + ", ".join(sorted(r.machines))
+                )
+            if r.queue_full:
+                reasons.append("queue cap reached")
+            if r.held_behind:
+                reasons.append("held behind " + ", ".join(r.held_behind))
+            if not reasons:
+                reasons.append("a later stage fit it with less growth")
+            print(f"  Stage {r.stage}: {'; '.join(reasons)}")
+        if not mine:
+            print("  Placed in the first stage it was tried in.")
+        print()
+
+    ranked = bottlenecks(config, rejections, strict=strict)
+    if not ranked:
+        return
+    print("BOTTLENECKS (stage placements rejected, makespan saved if "
+          "duplicated):")
+    for b in ranked[:limit]:
+        what = "queue cap" if b.kind == "queue" else b.resource
+        print(f"  {what:<25} blocked {b.blocked:>3} placements of "
+              f"{len(b.runs):>2} runs, ~{b.gain:.0f} min")
+    print()
+
+
 def print_pod_conflicts(config: ScheduleConfig) -> None:
     """Show which pods share physical machines (potential conflicts)."""
     machine_pods = {}
@@ -114,6 +303,14 @@ def print_pod_conflicts(config: ScheduleConfig) -> None:
         print()
 
 
+# --emit name -> renderer class; azdo takes its settings in main().
+EMIT_FORMATS = {
+    "azdo": AzdoYamlRenderer,
+    "lock": LockFileRenderer,
+    "trace": TraceRenderer,
+}
+
+
 def _format_source_path(path: str) -> str:
     """Render a config path for embedding in generated YAML headers.
 
@@ -159,6 +356,12 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         "--template-data", action="store_true",
         help="Print template data as JSON (for debugging)"
     )
+    parser.add_argument(
+        "--emit", nargs="+", choices=list(EMIT_FORMATS), default=["azdo"],
+        metavar="FORMAT",
+        help="Files written per pipeline with --yaml-output: azdo (YAML, "
+             "default), lock (JSON schedule IR), trace (Chrome trace JSON)"
+    )
     parser.add_argument(
         "--list-runs", action="store_true",
         help="List all expanded runs without scheduling"
@@ -167,6 +370,101 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         "--show-conflicts", action="store_true",
         help="Show pods that share physical machines"
     )
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="Chain short runs behind shorter lanes of a stage to fill "
+             "idle time (same as metadata.backfill)"
+    )
+    parser.add_argument(
+        "--join-jobs", action="store_true",
+        help="Route each group barrier through one agentless join job so "
+             "dependsOn edges grow linearly with the job count (same as "
+             "metadata.pipeline.join_jobs)"
+    )
+    parser.add_argument(
+        "--lease-connection", metavar="NAME",
+        help="Wrap every job in acquire/release steps against the lease "
+             "service behind this generic service connection (same as "
+             "metadata.pipeline.lease_connection; see leases.py)"
+    )
+    parser.add_argument(
+        "--risk-quantile", type=float, metavar="Q",
+        help="Pack stages to minimise the Q quantile (e.g. 0.9) of the "
+             "makespan over each run's runtime distribution instead of the "
+             "estimated makespan (see risk.py)"
+    )
+    parser.add_argument(
+        "--runtime-history", metavar="PATH",
+        help="JSON {job_id: [minutes, ...]} of measured durations for "
+             "--risk-quantile and --hang-deadlines; other runs use their "
+             "scenario's runtime_stddev"
+    )
+    parser.add_argument(
+        "--hang-deadlines", action="store_true",
+        help="Derive each job's timeoutInMinutes from its runtime "
+             "distribution so one hung job cannot stall the cycle for "
+             "hours, and report the worst case under a single hang "
+             "(same as metadata.deadlines with its defaults)"
+    )
+    parser.add_argument(
+        "--pod-health", nargs="+", metavar="SCENARIO",
+        help="Sentinel scenarios (e.g. Build): later jobs on a pod are "
+             "skipped when its sentinel failed, and the report shows the "
+             "time this saves (same as metadata.pod_health; see health.py)"
+    )
+    parser.add_argument(
+        "--baseline", nargs="+", metavar="PATH",
+        help="Incremental mode: keep runs where they are in a previously "
+             "generated schedule (the committed YAML files, in order, or a "
+             "sidecar JSON from --write-baseline) and only place new or "
+             "changed runs"
+    )
+    parser.add_argument(
+        "--offline", metavar="MACHINES",
+        help="Comma-separated physical machines that are down. Runs needing "
+             "them are rerouted to the scenario's fallback_pods or dropped, "
+             "and the rest are repacked around the current schedule "
+             "(or --baseline)"
+    )
+    parser.add_argument(
+        "--repack", action="store_true",
+        help="With --offline, schedule the YAMLs the outage changed afresh "
+             "instead of fitting rerouted runs into their free slots; the "
+             "other YAMLs stay as they are"
+    )
+    parser.add_argument(
+        "--rerun-failed", metavar="RESULTS",
+        help="Build a one-off recovery pipeline (<base-name>-recovery.yml, "
+             "no cron) holding only the runs a pipeline result export marks "
+             "failed, canceled or timed out"
+    )
+    parser.add_argument(
+        "--timeline", metavar="PATH",
+        help="Write a machine x time view of the schedule: Chrome "
+             "trace-event JSON (chrome://tracing, Perfetto), or a "
+             "self-contained HTML Gantt chart if PATH ends in .html"
+    )
+    parser.add_argument(
+        "--timings", metavar="PATH",
+        help="JSON {job_id: minutes} of measured or simulated durations "
+             "to lay out in --timeline instead of the estimates"
+    )
+    parser.add_argument(
+        "--explain", nargs="?", const="", metavar="RUN",
+        help="Rank the machines and queue cap that push runs into later "
+             "stages by the makespan duplicating them would save. With a "
+             "run name or job id, also list why each earlier stage "
+             "rejected it"
+    )
+    parser.add_argument(
+        "--metrics-json", metavar="PATH",
+        help="Write machine utilization, stage slack, queue minutes, split "
+             "balance and lower-bound gap as JSON for dashboards"
+    )
+    parser.add_argument(
+        "--write-baseline", metavar="PATH",
+        help="Write the resulting layout as a sidecar JSON baseline"
+    )
     parser.add_argument(
         "--lenient", action="store_true",
         help="Warn instead of fail on unknown or invalid pod references. "
@@ -200,27 +498,282 @@ def main(argv: List[str] = None) -> int:
                       f"machines=[{machines}]")
             return 0
 
-        schedule = create_schedule(config, strict=strict)
-        print_summary(config, schedule)
-        print_pod_conflicts(config)
+        regen_args = ""
+        if args.backfill:
+            config.backfill = True
+            regen_args += " --backfill"
+        if args.join_jobs:
+            config.pipeline.join_jobs = True
+            regen_args += " --join-jobs"
+        if args.lease_connection:
+            config.pipeline.lease_connection = args.lease_connection
+            regen_args += f' --lease-connection "{args.lease_connection}"'
+        if args.hang_deadlines:
+            if config.deadlines is None:
+                config.deadlines = DeadlineSettings()
+            regen_args += " --hang-deadlines"
+        if args.pod_health:
+            known = {sc.name for sc in config.scenarios}
+            unknown = sorted(set(args.pod_health) - known)
+            if unknown:
+                raise ConfigError(
+                    f"--pod-health names unknown scenarios: {unknown}"
+                )
+            config.health = HealthSettings(sentinels=list(args.pod_health))
+            regen_args += " --pod-health " + " ".join(
+                f'"{name}"' for name in args.pod_health
+            )
+        if args.repack and not args.offline:
+            raise ConfigError("--repack only applies together with --offline")
+        if args.risk_quantile is not None:
+            repack = [flag for flag, value in (
+                ("--rerun-failed", args.rerun_failed),
+                ("--baseline", args.baseline),
+                ("--offline", args.offline),
+            ) if value]
+            if repack:
+                raise ConfigError(
+                    f"--risk-quantile cannot be combined with "
+                    f"{', '.join(repack)}; only a fresh packing is "
+                    f"risk-aware"
+                )
+            regen_args += f" --risk-quantile {args.risk_quantile:g}"
+        history = None
+        if args.runtime_history:
+            history = load_history(args.runtime_history)
+            regen_args += (
+                f" --runtime-history "
+                f"{_format_source_path(args.runtime_history)}"
+            )
 
-        yaml_count = args.target_yamls or config.target_yaml_count
-        schedules = split_schedule(schedule, yaml_count)
-        print_split_summary(schedules, config)
+        def build_schedule(cfg: ScheduleConfig) -> Schedule:
+            if args.risk_quantile is None:
+                return create_schedule(cfg, strict=strict)
+            return risk_schedule(
+                cfg, strict, args.risk_quantile, history=history
+            )
+
+        base_name = args.base_name
+        scheduled = True
+        # (config, split schedules, base name) per pipeline family to emit.
+        outputs = None
+        if args.rerun_failed:
+            results = load_results(args.rerun_failed)
+            schedule, unknown = create_recovery_schedule(
+                config, results, strict=strict
+            )
+            print_summary(config, schedule)
+            full = create_schedule(config, strict=strict)
+            print("RECOVERY:")
+            print(f"  Failed runs rescheduled: {schedule.total_runs}")
+            for job_id in unknown:
+                print(f"  WARNING: failed job {job_id!r} is not in the "
+                      f"config, skipping")
+            print(f"  Recovery time: {schedule.total_duration:.0f} min "
+                  f"(full cycle: {full.total_duration:.0f} min)")
+            print()
+            schedules = [schedule]
+            regen_args += (
+                f" --rerun-failed {_format_source_path(args.rerun_failed)}"
+            )
+            base_name += "-recovery"
+            scheduled = False
+        elif args.baseline or args.offline:
+            yaml_count = args.target_yamls or config.target_yaml_count
+            if args.baseline:
+                baseline = load_baseline(args.baseline)
+                regen_args += " --baseline " + " ".join(
+                    _format_source_path(p) for p in args.baseline
+                )
+            else:
+                baseline = schedules_to_baseline(split_schedule(
+                    create_schedule(config, strict=strict), yaml_count
+                ))
+            outage_report = None
+            if args.offline:
+                offline = parse_offline(args.offline)
+                regen_args += f" --offline {','.join(offline)}"
+                config, outage_report = apply_outage(config, offline)
+            schedules, report = reschedule_incremental(
+                config, baseline, strict=strict
+            )
+            if args.repack:
+                regen_args += " --repack"
+                schedules, outage_report.repacked = repack_affected(
+                    config, baseline, schedules, strict=strict
+                )
+                outage_report.makespan = max(
+                    (s.total_duration for s in schedules), default=0.0
+                )
+            schedule = Schedule(
+                stages=[st for sched in schedules for st in sched.stages]
+            )
+            print_summary(config, schedule)
+            print_pod_conflicts(config)
+            print_split_summary(schedules, config)
+            print_incremental_report(report)
+            if outage_report is not None:
+                print_outage_report(outage_report)
+        elif cycle_period(config) > 1:
+            yaml_count = args.target_yamls or config.target_yaml_count
+            phases = phase_configs(config, strict=strict)
+            phase_schedules = [
+                build_schedule(phase_config) for phase_config in phases
+            ]
+            splits = freshness_split(
+                phase_schedules,
+                [phase_config.schedule for phase_config in phases],
+                yaml_count,
+                config.schedule_offset_hours,
+                sentinels=(set(config.health.sentinels)
+                           if config.health else None),
+            )
+            outputs = []
+            for phase, phase_config in enumerate(phases):
+                print(f"\n### PHASE {phase + 1} ({phase_config.schedule})")
+                print_summary(phase_config, phase_schedules[phase])
+                print_split_summary(splits[phase], phase_config)
+                print_priority_report(splits[phase])
+                outputs.append((
+                    phase_config,
+                    splits[phase],
+                    f"{base_name}-phase{phase + 1}",
+                ))
+            print_pod_conflicts(config)
+            print_multirate_report(config, outputs, strict)
+        else:
+            schedule = build_schedule(config)
+            print_summary(config, schedule)
+            print_pod_conflicts(config)
+
+            yaml_count = args.target_yamls or config.target_yaml_count
+            schedules = split_schedule(schedule, yaml_count)
+            print_split_summary(schedules, config)
+            if args.risk_quantile is not None:
+                print_risk_report(
+                    "RUNTIME RISK",
+                    risk_report(
+                        config, schedules, Sampler(history=history),
+                        args.risk_quantile, base_name,
+                    ),
+                    args.risk_quantile,
+                )
+
+        if outputs is None:
+            print_priority_report(schedules)
+            outputs = [(config, schedules, base_name)]
+        if config.health is not None:
+            # A sentinel only gates the YAML it runs in.
+            outputs = [
+                (out_config, lead_sentinels_per_split(
+                    out_schedules, set(config.health.sentinels)
+                ), out_name)
+                for out_config, out_schedules, out_name in outputs
+            ]
+        if scheduled:
+            print_freshness_report([
+                pipeline
+                for out_config, out_schedules, _ in outputs
+                for pipeline in pipelines_for(
+                    out_config.schedule, out_schedules,
+                    config.schedule_offset_hours,
+                )
+            ])
+
+        timeouts = None
+        if config.deadlines is not None:
+            timeouts = job_deadlines(
+                [sched for _, out_schedules, _ in outputs
+                 for sched in out_schedules],
+                config.deadlines,
+                Sampler(history=history),
+                template_budgets(config, os.path.dirname(args.config)),
+            )
+            print_hang_report([
+                case
+                for out_config, out_schedules, out_name in outputs
+                for case in hang_report(
+                    out_config, out_schedules, timeouts, out_name
+                )
+            ])
+
+        # Gates per output: every_n_cycles phases reuse the same job ids.
+        gates: Dict[str, Dict[str, str]] = {}
+        if config.health is not None:
+            gates = {
+                out_name: pod_gates(out_schedules, config.health)
+                for _, out_schedules, out_name in outputs
+            }
+            print_health_report([
+                case
+                for out_config, out_schedules, out_name in outputs
+                for case in health_report(
+                    out_config, out_schedules, gates[out_name], timeouts,
+                    out_name,
+                )
+            ])
+
+        if args.explain is not None:
+            print_bottleneck_report(config, strict, args.explain)
+
+        if args.timeline:
+            durations = load_durations(args.timings) if args.timings else None
+            labels, flat = [], []
+            for _, out_schedules, out_name in outputs:
+                for i, sched in enumerate(out_schedules):
+                    labels.append(f"{out_name} YAML {i + 1}")
+                    flat.append(sched)
+            write_timeline(args.timeline, flat, config, durations, labels)
+            print(f"  Wrote timeline: {args.timeline}")
+
+        if args.metrics_json:
+            write_metrics(
+                args.metrics_json, build_metrics(args.config, config, outputs)
+            )
+            print(f"  Wrote metrics: {args.metrics_json}")
+
+        if args.write_baseline:
+            if len(outputs) > 1:
+                raise SchedulerError(
+                    "--write-baseline does not support every_n_cycles phases"
+                )
+            write_baseline(outputs[0][1], args.write_baseline)
+            print(f"  Wrote baseline: {args.write_baseline}")
 
         if args.template_data:
-            for i, sched in enumerate(schedules):
-                data = schedule_to_template_data(sched, config)
-                print(f"\n--- Template data for YAML {i + 1} ---")
-                print(json.dumps(data, indent=2))
+            for out_config, out_schedules, out_name in outputs:
+                for i, sched in enumerate(out_schedules):
+                    data = schedule_to_template_data(
+                        sched, out_config, timeouts=timeouts,
+                        gates=gates.get(out_name),
+                    )
+                    print(f"\n--- Template data for {out_name} "
+                          f"YAML {i + 1} ---")
+                    print(json.dumps(data, indent=2))
 
         if args.yaml_output:
-            print(f"Generating {len(schedules)} YAML file(s)...")
-            generate_yamls(
-                schedules, config, args.yaml_output,
-                base_name=args.base_name,
-                source_config=_format_source_path(args.config),
-            )
+            emit = list(dict.fromkeys(args.emit))
+            if emit != ["azdo"]:
+                regen_args += f" --emit {' '.join(emit)}"
+            for out_config, out_schedules, out_name in outputs:
+                renderers = [
+                    AzdoYamlRenderer(
+                        out_config.pipeline,
+                        source_config=_format_source_path(args.config),
+                        base_name=args.base_name,
+                        regen_args=regen_args,
+                    ) if name == "azdo" else EMIT_FORMATS[name]()
+                    for name in emit
+                ]
+                print(f"Generating {len(out_schedules)} YAML file(s)...")
+                generate_yamls(
+                    out_schedules, out_config, args.yaml_output,
+                    base_name=out_name,
+                    scheduled=scheduled,
+                    renderers=renderers,
+                    timeouts=timeouts,
+                    gates=gates.get(out_name),
+                )
             print("Done!")
         return 0
     except (ConfigError, SchedulerError, GeneratorError) as exc:
@@ -0,0 +1,138 @@
+"""
+Machine-readable schedule metrics.
+
+``--metrics-json`` writes the numbers :func:`main.print_summary` and
+:func:`main.print_split_summary` show as text, in a stable schema meant for
+charting schedule efficiency across config changes. Fields are only ever
+added; a breaking change bumps ``schema_version``.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from models import Schedule, ScheduleConfig
+from scheduler import _parts, makespan_lower_bound
+
+
+SCHEMA_VERSION = 1
+
+
+def config_hash(path: str) -> str:
+    """SHA-256 of the config's canonical JSON, ignoring formatting."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _round(value: float) -> float:
+    return round(value, 3)
+
+
+def schedule_metrics(
+    config: ScheduleConfig,
+    schedules: List[Schedule],
+) -> Dict:
+    """Metrics of one pipeline family, i.e. the split YAMLs of one config.
+
+    Machine utilization follows ``print_summary``: busy minutes over the
+    duration of the stages the machine takes part in. Stage slack is the
+    stage duration minus each run's runtime, i.e. how long its lane idles.
+    The lower-bound gap compares the total stage time with
+    :func:`scheduler.makespan_lower_bound`. ``run_count`` counts scenario
+    runs, so chaining or coalescing them does not change it; ``lane_count``
+    counts the lanes they occupy.
+    """
+    queues = config.queues
+    machines: Dict[str, Dict[str, float]] = {}
+    queue_minutes = {q: 0.0 for q in queues}
+    stages = []
+    runs = []
+    for file_index, sched in enumerate(schedules):
+        for stage_index, stage in enumerate(sched.stages):
+            used = set()
+            lanes = []
+            for lane, run in enumerate(stage.runs):
+                runs.append(run)
+                queue = queues[lane % len(queues)]
+                queue_minutes[queue] += run.estimated_runtime
+                used |= run.machines_used
+                for m in run.machines_used:
+                    entry = machines.setdefault(m, {"busy": 0.0, "total": 0.0})
+                    entry["busy"] += run.estimated_runtime
+                lanes.append({
+                    "job": run.job_name,
+                    "queue": queue,
+                    "runtime": _round(run.estimated_runtime),
+                    "slack": _round(stage.duration - run.estimated_runtime),
+                })
+            for m in used:
+                machines[m]["total"] += stage.duration
+            stages.append({
+                "yaml": file_index + 1,
+                "stage": stage_index + 1,
+                "duration": _round(stage.duration),
+                "slack": _round(sum(lane["slack"] for lane in lanes)),
+                "runs": lanes,
+            })
+
+    total = sum(s.total_duration for s in schedules)
+    durations = [s.total_duration for s in schedules]
+    mean = total / len(durations) if durations else 0.0
+    bound = makespan_lower_bound(runs, len(queues))
+    return {
+        "stage_count": len(stages),
+        "run_count": sum(len(_parts(r)) for r in runs),
+        "lane_count": len(runs),
+        "total_minutes": _round(total),
+        "lower_bound_minutes": _round(bound),
+        "lower_bound_gap": _round((total - bound) / bound) if bound else 0.0,
+        "machines": {
+            m: {
+                "busy_minutes": _round(v["busy"]),
+                "total_minutes": _round(v["total"]),
+                "utilization": (
+                    _round(v["busy"] / v["total"]) if v["total"] else 0.0
+                ),
+            }
+            for m, v in sorted(machines.items())
+        },
+        "queues": {q: _round(queue_minutes[q]) for q in queues},
+        "split": {
+            "yaml_minutes": [_round(d) for d in durations],
+            "makespan": _round(max(durations, default=0.0)),
+            "imbalance": _round(max(durations) / mean) if mean else 0.0,
+        },
+        "stages": stages,
+    }
+
+
+def build_metrics(
+    config_path: str,
+    config: ScheduleConfig,
+    outputs: List[Tuple[ScheduleConfig, List[Schedule], str]],
+) -> Dict:
+    """Full ``--metrics-json`` document, one entry per pipeline family."""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "config": {
+            "name": config.name,
+            "hash": config_hash(config_path),
+        },
+        "pipelines": [
+            {
+                "name": name,
+                "cron": out_config.schedule,
+                **schedule_metrics(out_config, schedules),
+            }
+            for out_config, schedules, name in outputs
+        ],
+    }
+
+
+def write_metrics(path: str, document: Dict) -> None:
+    """Write a :func:`build_metrics` document as indented JSON."""
+    with open(path, "w", newline="\n", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
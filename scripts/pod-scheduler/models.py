@@ -7,9 +7,10 @@ which the scheduler enforces automatically.
 """
 
 import re
+import sys
 from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 
 # Default per-type runtime estimates (minutes) used when a scenario provides
@@ -109,31 +110,130 @@ class Scenario:
     # Optional explicit timeout (minutes) for the generated AzDO job. When
     # None, the generator derives one from estimated_runtime.
     timeout: Optional[int] = None
-
-
-@dataclass
+    # Pods this scenario may be rerouted to when one of its own pods has an
+    # offline machine (see outage.py). Not scheduled otherwise.
+    fallback_pods: List[str] = field(default_factory=list)
+    # Higher means results are wanted sooner in the cycle. 0 = no preference.
+    priority: int = 0
+    # Run on every N-th trigger of the cron only (see multirate.py).
+    every_n_cycles: int = 1
+    # Standard deviation of the runtime in minutes, for risk-aware packing
+    # when there is no measured history (see risk.py). 0 = deterministic.
+    runtime_stddev: float = 0.0
+    # Scenarios that must run earlier in the cycle on the same pod, e.g. a
+    # run that reuses what ``Build`` left on the machines.
+    after: List[str] = field(default_factory=list)
+    # Scenario name -> minutes saved when that scenario ran earlier in the
+    # cycle on the same SUT machine (see scheduler.sequence_links).
+    reuses: Dict[str, float] = field(default_factory=dict)
+    # Optional work placed only into stage idle time, never lengthening the
+    # cycle (see scheduler.fill_idle).
+    filler: bool = False
+
+
+@dataclass(frozen=True)
 class Run:
-    """A single execution: one scenario on one pod."""
+    """A single execution: one scenario on one pod.
+
+    Runs are frozen, so the derived name, job id, machine set and profiles
+    are computed once in ``__post_init__`` rather than on every access; the
+    scheduler reads them in its inner loops and a config can expand to
+    thousands of runs. Use ``dataclasses.replace`` to change a field. Plain
+    runs use ``__slots__``.
+    """
+    __slots__ = (
+        "scenario", "pod", "estimated_runtime",
+        "_name", "_job_name", "_machines", "_profiles",
+    )
     scenario: Scenario
     pod: Pod
     estimated_runtime: float
 
+    def __post_init__(self) -> None:
+        name = self._derive_name()
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(
+            self, "_job_name", sys.intern(sanitize_job_id(name))
+        )
+        object.__setattr__(
+            self, "_machines", frozenset(self._derive_machines())
+        )
+        object.__setattr__(
+            self, "_profiles", tuple(self._derive_profiles())
+        )
+
+    def _derive_name(self) -> str:
+        return f"{self.scenario.name} {self.pod.name}"
+
+    def _derive_machines(self) -> Set[str]:
+        return self.pod.machines_for_type(self.scenario.type)
+
+    def _derive_profiles(self) -> List[str]:
+        return self.pod.profiles_for_type(self.scenario.type)
+
     @property
     def name(self) -> str:
-        return f"{self.scenario.name} {self.pod.name}"
+        return self._name
 
     @property
     def job_name(self) -> str:
         """Sanitized identifier suitable for AzDO ``- job:`` use."""
-        return sanitize_job_id(self.name)
+        return self._job_name
 
     @property
-    def machines_used(self) -> Set[str]:
-        return self.pod.machines_for_type(self.scenario.type)
+    def machines_used(self) -> FrozenSet[str]:
+        return self._machines
 
     @property
-    def profiles(self) -> List[str]:
-        return self.pod.profiles_for_type(self.scenario.type)
+    def profiles(self) -> Tuple[str, ...]:
+        return self._profiles
+
+
+def _union_machines(parts: List[Run]) -> Set[str]:
+    result: Set[str] = set()
+    for part in parts:
+        result |= part.machines_used
+    return result
+
+
+@dataclass(frozen=True)
+class CoalescedRun(Run):
+    """Several short runs on one pod executed back-to-back as one AzDO job.
+
+    ``estimated_runtime`` is the sum of the parts' own runtimes plus a single
+    per-job overhead, which is what coalescing saves.
+    """
+    parts: List[Run] = field(default_factory=list)
+
+    def _derive_name(self) -> str:
+        scenarios = " + ".join(p.scenario.name for p in self.parts)
+        return f"{scenarios} {self.pod.name}"
+
+    def _derive_machines(self) -> Set[str]:
+        return _union_machines(self.parts)
+
+    def _derive_profiles(self) -> List[str]:
+        return list(max((p.profiles for p in self.parts), key=len, default=()))
+
+
+@dataclass(frozen=True)
+class ChainedRun(Run):
+    """Runs executed one after another on one pod within a single stage.
+
+    Unlike :class:`CoalescedRun`, each part stays its own AzDO job; the
+    generator links them with ``dependsOn`` so they share one queue lane.
+    ``estimated_runtime`` is the sum of the parts.
+    """
+    parts: List[Run] = field(default_factory=list)
+
+    def _derive_name(self) -> str:
+        return " -> ".join(p.name for p in self.parts)
+
+    def _derive_machines(self) -> Set[str]:
+        return _union_machines(self.parts)
+
+    def _derive_profiles(self) -> List[str]:
+        return list(max((p.profiles for p in self.parts), key=len, default=()))
 
 
 @dataclass
@@ -179,6 +279,39 @@ class PipelineSettings:
     pool: str = DEFAULT_PIPELINE_POOL
     service_bus_connection: str = DEFAULT_PIPELINE_CONNECTION
     service_bus_namespace: str = DEFAULT_PIPELINE_NAMESPACE
+    # Route each stage barrier through one agentless join job instead of
+    # making every job depend on every job of the previous group.
+    join_jobs: bool = False
+    # Generic service connection pointing at a lease service (leases.py);
+    # when set, every job leases its machines for its duration.
+    lease_connection: Optional[str] = None
+
+
+@dataclass
+class CoalesceSettings:
+    """Limits for folding short runs on one pod into a single AzDO job."""
+    # Runs at most this long (excluding job overhead) are merge candidates.
+    max_run_minutes: float = 10.0
+    # A merged job's parts may add up to at most this many minutes.
+    max_job_minutes: float = 30.0
+
+
+@dataclass
+class DeadlineSettings:
+    """Schedule-derived job timeouts that bound the cost of a hung job."""
+    # Quantile of each job's runtime distribution to allow for (risk.py).
+    quantile: float = 0.95
+    # Headroom on top of that quantile, as a fraction of it.
+    slack: float = 0.25
+    # No job is given less than this many minutes.
+    min_minutes: int = 15
+
+
+@dataclass
+class HealthSettings:
+    """Pod-health gating: skip a pod's later jobs once its sentinel failed."""
+    # Scenarios whose failure means the pod itself is broken, e.g. "Build".
+    sentinels: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -192,3 +325,14 @@ class ScheduleConfig:
     pods: Dict[str, Pod]
     scenarios: List[Scenario]
     pipeline: PipelineSettings = field(default_factory=PipelineSettings)
+    # Fixed AzDO cost per job (agent acquisition, checkout, template
+    # expansion), added to every job's runtime estimate.
+    job_overhead_minutes: float = 0.0
+    # When set, short runs on the same pod may be merged into one job.
+    coalesce: Optional[CoalesceSettings] = None
+    # Chain short runs behind shorter lanes of a stage (see backfill_schedule).
+    backfill: bool = False
+    # When set, job timeouts come from the schedule (see deadlines.py).
+    deadlines: Optional[DeadlineSettings] = None
+    # When set, jobs after a pod's sentinel are gated on it (see health.py).
+    health: Optional[HealthSettings] = None
@@ -0,0 +1,136 @@
+"""
+Multi-rate scheduling across cron cycles.
+
+Scenarios with ``every_n_cycles: N`` only need to run on every N-th trigger
+of ``metadata.schedule``. The pattern repeats every ``lcm(N...)`` cycles (the
+*period*); each run is assigned a phase offset so that heavy runs spread
+evenly across the period, and every phase gets its own pipeline YAML with a
+cron that fires only on that phase's triggers. For ``0 3/12 * * *`` and a
+period of 2, phase 1 fires at 03:00 and phase 2 at 15:00.
+"""
+
+import re
+from dataclasses import replace
+from math import gcd
+from typing import Dict, List
+
+from generator import GeneratorError
+from models import ScheduleConfig
+from scheduler import expand_runs
+
+
+_CRON_HOUR_RE = re.compile(r"^(\d+)(/\d+)?$")
+
+
+def cycle_period(config: ScheduleConfig) -> int:
+    """Number of cron cycles after which the phase pattern repeats."""
+    period = 1
+    for scenario in config.scenarios:
+        n = scenario.every_n_cycles
+        period = period * n // gcd(period, n)
+    return period
+
+
+def assign_phases(
+    config: ScheduleConfig,
+    strict: bool = True,
+) -> Dict[str, int]:
+    """Pick a phase offset for every run, keyed by ``Run.job_name``.
+
+    A run with ``every_n_cycles = n`` and offset ``o`` executes in phases
+    ``p`` where ``p % n == o``. Runs that execute every cycle load every
+    phase; the others are placed longest-first on the offset whose phases
+    end up with the lowest busiest-machine load, so heavy scenarios are
+    balanced across the period.
+    """
+    period = cycle_period(config)
+    runs = expand_runs(config, strict=strict)
+    load: List[Dict[str, float]] = [{} for _ in range(period)]
+    offsets: Dict[str, int] = {}
+
+    def busiest(phase: int, extra: float, machines) -> float:
+        return max(
+            load[phase].get(m, 0.0) + (extra if m in machines else 0.0)
+            for m in set(load[phase]) | set(machines)
+        )
+
+    fixed = [r for r in runs if r.scenario.every_n_cycles == 1]
+    flexible = [r for r in runs if r.scenario.every_n_cycles > 1]
+    flexible.sort(key=lambda r: (-r.estimated_runtime, r.name))
+    for run in fixed + flexible:
+        n = run.scenario.every_n_cycles
+        machines = run.machines_used
+        best_offset, best_key = 0, None
+        for offset in range(n):
+            phases = range(offset, period, n)
+            key = (
+                max(busiest(p, run.estimated_runtime, machines)
+                    for p in phases),
+                sum(sum(load[p].values()) for p in phases),
+                offset,
+            )
+            if best_key is None or key < best_key:
+                best_offset, best_key = offset, key
+        offsets[run.job_name] = best_offset
+        for p in range(best_offset, period, n):
+            for m in machines:
+                load[p][m] = load[p].get(m, 0.0) + run.estimated_runtime
+    return offsets
+
+
+def phase_cron(cron: str, phase: int, period: int) -> str:
+    """Cron that fires only on ``phase`` of a ``period``-cycle pattern.
+
+    The base cron's hour field must be ``H/N`` with ``24`` divisible by
+    ``N * period``, so each phase maps onto fixed hours of every day.
+    """
+    if period == 1:
+        return cron
+    parts = cron.split()
+    match = _CRON_HOUR_RE.match(parts[1]) if len(parts) == 5 else None
+    if not match or not match.group(2):
+        raise GeneratorError(
+            f"Cron {cron!r} needs an 'H/N' hour field for a "
+            f"{period}-cycle every_n_cycles pattern"
+        )
+    step = int(match.group(2)[1:])
+    new_step = step * period
+    if new_step > 24 or 24 % new_step:
+        raise GeneratorError(
+            f"Cron {cron!r} fires every {step}h; a {period}-cycle pattern "
+            f"needs 24 to be divisible by {new_step}"
+        )
+    hour = (int(match.group(1)) + phase * step) % 24
+    parts[1] = str(hour) if new_step == 24 else f"{hour}/{new_step}"
+    return " ".join(parts)
+
+
+def phase_configs(
+    config: ScheduleConfig,
+    strict: bool = True,
+) -> List[ScheduleConfig]:
+    """One config per phase, holding only the runs due in that phase."""
+    period = cycle_period(config)
+    offsets = assign_phases(config, strict=strict)
+    runs = expand_runs(config, strict=strict)
+    result: List[ScheduleConfig] = []
+    for phase in range(period):
+        due = {
+            (r.scenario.name, r.pod.name) for r in runs
+            if phase % r.scenario.every_n_cycles == offsets[r.job_name]
+        }
+        scenarios = []
+        for scenario in config.scenarios:
+            if scenario.filler:
+                # Fillers soak up idle time in every phase.
+                scenarios.append(scenario)
+                continue
+            pods = [p for p in scenario.pods if (scenario.name, p) in due]
+            if pods:
+                scenarios.append(replace(scenario, pods=pods))
+        result.append(replace(
+            config,
+            scenarios=scenarios,
+            schedule=phase_cron(config.schedule, phase, period),
+        ))
+    return result
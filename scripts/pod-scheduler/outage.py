@@ -0,0 +1,136 @@
+"""
+Machine outage fast-path.
+
+When physical machines go offline, every run that needs one of them is either
+rerouted to one of the scenario's ``fallback_pods`` or dropped. The adjusted
+config is then repacked against the current schedule with the incremental
+scheduler so unaffected runs keep their groups. Fitting rerouted runs into
+free slots can grow the makespan well past a fresh plan, so
+:func:`repack_affected` can pack the YAMLs the outage changed afresh.
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Iterable, List, Set, Tuple
+
+from incremental import Baseline
+from models import Schedule, ScheduleConfig
+from scheduler import _parts, create_schedule, expand_runs, split_schedule
+
+
+@dataclass
+class OutageReport:
+    """Runs rerouted or lost because of offline machines."""
+    offline: List[str] = field(default_factory=list)
+    # (scenario, from_pod, to_pod)
+    rerouted: List[Tuple[str, str, str]] = field(default_factory=list)
+    lost: List[str] = field(default_factory=list)
+    # With --repack: indices of the YAMLs :func:`repack_affected` scheduled
+    # afresh, and the resulting makespan.
+    repacked: List[int] = field(default_factory=list)
+    makespan: float = 0.0
+
+
+def parse_offline(value: str) -> List[str]:
+    """Parse a comma-separated ``--offline`` value into machine names."""
+    return sorted({m.strip() for m in value.split(",") if m.strip()})
+
+
+def apply_outage(
+    config: ScheduleConfig,
+    offline: Iterable[str],
+) -> Tuple[ScheduleConfig, OutageReport]:
+    """Return a copy of ``config`` with runs on offline machines removed.
+
+    Only runs whose machine set (for their scenario type) touches an offline
+    machine are affected, so a dead DB leaves a pod's SINGLE/DUAL runs alone.
+    Affected runs move to the first ``fallback_pods`` entry that can host the
+    scenario type, has no offline machine for it, and doesn't already run the
+    scenario. Anything left over is reported as lost.
+    """
+    down: Set[str] = set(offline)
+    report = OutageReport(offline=sorted(down))
+
+    def healthy(pod_name: str, scenario) -> bool:
+        pod = config.pods.get(pod_name)
+        if pod is None or pod.validate(scenario.type):
+            return False
+        return pod.machines_for_type(scenario.type).isdisjoint(down)
+
+    scenarios = []
+    for scenario in config.scenarios:
+        pods: List[str] = []
+        affected: List[str] = []
+        for pod_name in scenario.pods:
+            pod = config.pods.get(pod_name)
+            if pod is not None and not pod.machines_for_type(
+                scenario.type
+            ).isdisjoint(down):
+                affected.append(pod_name)
+            else:
+                pods.append(pod_name)
+
+        spare = [
+            p for p in scenario.fallback_pods
+            if p not in scenario.pods and healthy(p, scenario)
+        ]
+        for pod_name in affected:
+            if spare:
+                target = spare.pop(0)
+                pods.append(target)
+                report.rerouted.append((scenario.name, pod_name, target))
+            else:
+                report.lost.append(f"{scenario.name} {pod_name}")
+
+        if pods:
+            scenarios.append(replace(scenario, pods=pods))
+
+    return replace(config, scenarios=scenarios), report
+
+
+def repack_affected(
+    config: ScheduleConfig,
+    baseline: Baseline,
+    schedules: List[Schedule],
+    strict: bool = True,
+) -> Tuple[List[Schedule], List[int]]:
+    """Schedule the YAMLs the outage changed afresh; keep the others.
+
+    ``schedules`` is the incremental result for ``config`` against
+    ``baseline``. A file is affected when its jobs differ from the
+    baseline file at the same index (filler jobs aside, as they are placed
+    anew anyway). The runs of all affected files are scheduled together by
+    :func:`create_schedule` and split back over as many files. Returns the
+    new schedules and the indices of the repacked files.
+    """
+    fillers = {r.job_name for r in expand_runs(config, strict, filler=True)}
+
+    def jobs(groups: List[List[str]]) -> Set[str]:
+        return {j for group in groups for j in group if j not in fillers}
+
+    affected = [
+        i for i, sched in enumerate(schedules)
+        if i >= len(baseline) or jobs([
+            [part.job_name for run in stage.runs for part in _parts(run)]
+            for stage in sched.stages
+        ]) != jobs(baseline[i])
+    ]
+    if not affected:
+        return schedules, []
+    keep = {
+        (part.scenario.name, part.pod.name)
+        for i in affected
+        for stage in schedules[i].stages
+        for run in stage.runs
+        for part in _parts(run)
+    }
+    scenarios = []
+    for scenario in config.scenarios:
+        pods = [p for p in scenario.pods if (scenario.name, p) in keep]
+        if pods:
+            scenarios.append(replace(scenario, pods=pods))
+    subset = replace(config, scenarios=scenarios)
+    packed = split_schedule(create_schedule(subset, strict), len(affected))
+    result = list(schedules)
+    for i, sched in zip(affected, packed):
+        result[i] = sched
+    return [s for s in result if s.stages], affected
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Pareto exploration of split count, cron cadence, offsets and queues.
+
+``target_yaml_count``, ``schedule_offset_hours``, the cron cadence and the
+queue list are normally tuned by hand. This command tries every combination,
+splits the schedule (per every_n_cycles phase) with
+:func:`scheduler.split_schedule`, checks cron fit with
+:func:`freshness.cron_headroom`, and prints the Pareto front of
+
+- per-YAML makespan (lower is better),
+- daily runs of the least-served (scenario, pod) series (higher is better),
+- collision risk: minutes the worst YAML is still running when the next
+  trigger fires (lower is better, 0 means every YAML fits).
+
+Usage:
+    python pareto.py --config build/benchmarks_ci_pods.json
+    python pareto.py --config build/benchmarks_ci_pods.json --apply 3
+
+``--apply N`` writes the N-th front entry back into the config file.
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from config_loader import ConfigError, load_config, parse_config
+from freshness import (
+    Outputs,
+    cron_fire_minutes,
+    cron_headroom,
+    execution_times,
+    pipelines_for,
+)
+from generator import GeneratorError
+from models import ScheduleConfig
+from multirate import cycle_period, phase_configs, phase_cron
+from scheduler import SchedulerError, create_schedule, split_schedule
+
+
+# Hour steps that fire at the same hours every day.
+CRON_STEPS = (1, 2, 3, 4, 6, 8, 12, 24)
+
+
+@dataclass
+class Candidate:
+    """One combination of settings and how it scores."""
+    yaml_count: int
+    offset_hours: int
+    schedule: str
+    queues: List[str]
+    makespan: float
+    daily_runs: int
+    overrun: float
+
+    def objectives(self) -> Tuple[float, int, float]:
+        """Minimised tuple: makespan, -daily runs, overrun."""
+        return (self.makespan, -self.daily_runs, self.overrun)
+
+    def dominates(self, other: "Candidate") -> bool:
+        mine, theirs = self.objectives(), other.objectives()
+        return all(a <= b for a, b in zip(mine, theirs)) and mine != theirs
+
+
+def step_cron(cron: str, step: int) -> str:
+    """``cron`` firing every ``step`` hours from the same first trigger."""
+    fires = cron_fire_minutes(cron)
+    parts = cron.split()
+    hour = fires[0] // 60 % step
+    parts[1] = str(hour) if step == 24 else f"{hour}/{step}"
+    return " ".join(parts)
+
+
+def _score(
+    config: ScheduleConfig,
+    outputs: Outputs,
+) -> Tuple[float, int, float]:
+    makespan = max(
+        (s.total_duration for _, scheds, _ in outputs for s in scheds),
+        default=0.0,
+    )
+    pipelines = [
+        pipeline
+        for out_config, scheds, _ in outputs
+        for pipeline in pipelines_for(
+            out_config.schedule, scheds, config.schedule_offset_hours
+        )
+    ]
+    times = execution_times(pipelines)
+    daily = min((len(v) for v in times.values()), default=0)
+    headroom = cron_headroom(outputs, config.schedule_offset_hours)
+    overrun = max(0.0, -min(headroom.values(), default=0.0))
+    return makespan, daily, overrun
+
+
+def _balanced_outputs(config: ScheduleConfig, strict: bool) -> Outputs:
+    """Per-phase balanced splits, without the freshness search.
+
+    None of the objectives depend on how evenly a series' results are
+    spaced, so exploration skips :func:`freshness.freshness_split`, which
+    would dominate the run time for multi-rate configs.
+    """
+    phases = phase_configs(config, strict=strict)
+    return [
+        (
+            phase_config,
+            split_schedule(
+                create_schedule(phase_config, strict=strict),
+                config.target_yaml_count,
+            ),
+            f"phase{i + 1}",
+        )
+        for i, phase_config in enumerate(phases)
+    ]
+
+
+def explore(
+    config: ScheduleConfig,
+    max_yamls: int = 6,
+    strict: bool = True,
+) -> List[Candidate]:
+    """Score every combination of settings.
+
+    Only the number of queues affects packing, so one subset per size is
+    tried: the first ``k`` queues in config order. Offsets are taken modulo
+    the cron step (larger ones fire at the same hours), and are irrelevant
+    for a single YAML. Cron steps incompatible with an ``every_n_cycles``
+    period are skipped.
+    """
+    period = cycle_period(config)
+    result: List[Candidate] = []
+    for k in range(1, len(config.queues) + 1):
+        queues = list(config.queues[:k])
+        for yaml_count in range(1, max_yamls + 1):
+            split = _balanced_outputs(
+                replace(config, queues=queues, target_yaml_count=yaml_count),
+                strict,
+            )
+            for step in CRON_STEPS:
+                schedule = step_cron(config.schedule, step)
+                try:
+                    crons = [
+                        phase_cron(schedule, phase, period)
+                        for phase in range(period)
+                    ]
+                except GeneratorError:
+                    continue
+                if yaml_count == 1:
+                    offsets = [config.schedule_offset_hours]
+                else:
+                    offsets = list(range(1, step)) or [0]
+                for offset in offsets:
+                    variant = replace(
+                        config,
+                        queues=queues,
+                        target_yaml_count=yaml_count,
+                        schedule_offset_hours=offset,
+                        schedule=schedule,
+                    )
+                    outputs = [
+                        (replace(phase_config, schedule=cron), scheds, name)
+                        for (phase_config, scheds, name), cron
+                        in zip(split, crons)
+                    ]
+                    makespan, daily, overrun = _score(variant, outputs)
+                    result.append(Candidate(
+                        yaml_count=yaml_count,
+                        offset_hours=offset,
+                        schedule=schedule,
+                        queues=queues,
+                        makespan=makespan,
+                        daily_runs=daily,
+                        overrun=overrun,
+                    ))
+    return result
+
+
+def pareto_front(candidates: List[Candidate]) -> List[Candidate]:
+    """Non-dominated candidates, one per distinct objective tuple.
+
+    Among equal scores the one using the fewest queues, then the fewest
+    YAMLs, then the smallest offset is kept. The front is ordered by daily
+    runs (descending), then makespan.
+    """
+    best: Dict[Tuple[float, int, float], Candidate] = {}
+    for c in sorted(candidates, key=lambda c: (
+        len(c.queues), c.yaml_count, c.offset_hours, c.schedule
+    )):
+        best.setdefault(c.objectives(), c)
+    unique = list(best.values())
+    front = [
+        c for c in unique
+        if not any(o.dominates(c) for o in unique)
+    ]
+    return sorted(front, key=lambda c: (-c.daily_runs, c.makespan, c.overrun))
+
+
+_SETTING_RES = {
+    "schedule": re.compile(r'("schedule"\s*:\s*)"[^"]*"'),
+    "target_yaml_count": re.compile(r'("target_yaml_count"\s*:\s*)\d+'),
+    "schedule_offset_hours": re.compile(
+        r'("schedule_offset_hours"\s*:\s*)\d+'
+    ),
+    "queues": re.compile(r'("queues"\s*:\s*)\[[^\]]*\]'),
+}
+
+
+def _same_layout(original: str, value: str) -> str:
+    """Render a JSON list one item per line if ``original`` was laid out so."""
+    match = re.search(r"\[\s*\n([ \t]*)", original)
+    if not value.startswith("[") or not match:
+        return value
+    indent = match.group(1)
+    closing = re.search(r"\n([ \t]*)\]$", original)
+    items = json.loads(value)
+    body = ",\n".join(indent + json.dumps(item) for item in items)
+    return f"[\n{body}\n{closing.group(1) if closing else ''}]"
+
+
+def write_settings(path: str, candidate: Candidate) -> None:
+    """Write ``candidate``'s settings into the config file at ``path``.
+
+    The file is edited in place, value by value, so the hand-maintained
+    formatting survives. Each setting must already appear exactly once.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    values = {
+        "schedule": json.dumps(candidate.schedule),
+        "target_yaml_count": str(candidate.yaml_count),
+        "schedule_offset_hours": str(candidate.offset_hours),
+        "queues": json.dumps(candidate.queues),
+    }
+    for key, pattern in _SETTING_RES.items():
+        text, count = pattern.subn(
+            lambda m, v=values[key]: m.group(1) + _same_layout(m.group(0), v),
+            text,
+        )
+        if count != 1:
+            raise ConfigError(
+                f"{path}: expected exactly one {key!r} setting to update, "
+                f"found {count}"
+            )
+    config = parse_config(json.loads(text))
+    if (config.schedule, config.target_yaml_count,
+            config.schedule_offset_hours, config.queues) != (
+            candidate.schedule, candidate.yaml_count,
+            candidate.offset_hours, candidate.queues):
+        raise ConfigError(f"{path}: settings did not round-trip")
+    with open(path, "w", newline="\n", encoding="utf-8") as f:
+        f.write(text)
+
+
+def print_front(front: List[Candidate], config: ScheduleConfig) -> None:
+    """Print the front, marking the config's current settings."""
+    print(f"{'#':>3} {'YAMLs':>5} {'Cron':<14} {'Offset':>6} {'Queues':>6} "
+          f"{'Makespan':>9} {'Runs/day':>8} {'Overrun':>8}")
+    print("-" * 70)
+    for i, c in enumerate(front, start=1):
+        current = (
+            c.schedule == config.schedule
+            and c.yaml_count == config.target_yaml_count
+            and (c.yaml_count == 1
+                 or c.offset_hours == config.schedule_offset_hours)
+            and c.queues == config.queues
+        )
+        print(f"{i:>3} {c.yaml_count:>5} {c.schedule:<14} "
+              f"{c.offset_hours:>5}h {len(c.queues):>6} "
+              f"{c.makespan:>7.0f}m {c.daily_runs:>8} {c.overrun:>7.0f}m"
+              f"{'  (current)' if current else ''}")
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Pareto front of split count, cron cadence, offset and "
+                    "queue count for a pod-scheduler config"
+    )
+    parser.add_argument(
+        "--config", required=True,
+        help="Path to JSON configuration file"
+    )
+    parser.add_argument(
+        "--max-yamls", type=int, default=6,
+        help="Largest split count to try (default: 6)"
+    )
+    parser.add_argument(
+        "--max-overrun", type=float, metavar="MINUTES",
+        help="Only consider settings whose worst YAML overruns the next "
+             "trigger by at most this many minutes (0 = must fit)"
+    )
+    parser.add_argument(
+        "--apply", type=int, metavar="N",
+        help="Write the N-th front entry's settings back to --config"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    try:
+        config = load_config(args.config)
+        candidates = explore(config, args.max_yamls, not args.lenient)
+        if args.max_overrun is not None:
+            candidates = [
+                c for c in candidates if c.overrun <= args.max_overrun
+            ]
+        front = pareto_front(candidates)
+        print_front(front, config)
+        if args.apply is not None:
+            if not 1 <= args.apply <= len(front):
+                raise ConfigError(
+                    f"--apply {args.apply} is not on the front "
+                    f"(1-{len(front)})"
+                )
+            write_settings(args.config, front[args.apply - 1])
+            print(f"\n  Wrote settings #{args.apply} to {args.config}")
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Recovery schedules for failed runs.
+
+Jobs use ``condition: succeededOrFailed()``, so a failed scenario simply
+leaves a hole in that cycle's data. Given a pipeline result export, this
+module selects only the runs that failed or timed out and packs them as
+tightly as possible under the usual collision rules, so a one-off recovery
+pipeline can backfill the missing results in a fraction of a full cycle.
+
+The export is a local JSON file in any of these shapes::
+
+    {"Proxies_gold_lin": "failed", "Grpc_gold_win": "succeeded"}
+    [{"job_id": "Proxies_gold_lin", "status": "failed"}, ...]
+    {"jobs": [{"identifier": "Proxies_gold_lin", "result": "canceled"}, ...]}
+
+Job ids are matched against :attr:`Run.job_name`.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+from generator import JOIN_JOB_PREFIX
+from models import Run, Schedule, ScheduleConfig
+from scheduler import (
+    SchedulerError,
+    expand_runs,
+    pack_runs_optimal,
+    plan_runs,
+)
+
+
+# AzDO reports a timeout as "failed" or "canceled" depending on where it hit;
+# the other spellings cover hand-written and third-party exports. Jobs gated
+# on a failed pod sentinel (see health.py) end "skipped".
+RERUN_STATUSES = frozenset({
+    "failed",
+    "canceled",
+    "cancelled",
+    "timedout",
+    "timed_out",
+    "abandoned",
+    "skipped",
+})
+
+_ID_KEYS = ("job_id", "identifier", "name")
+_STATUS_KEYS = ("status", "result")
+
+
+def _first(entry: Dict, keys: Tuple[str, ...], path: str) -> str:
+    for key in keys:
+        if key in entry:
+            return str(entry[key])
+    raise SchedulerError(
+        f"{path}: result entry {entry!r} has none of {list(keys)}"
+    )
+
+
+def load_results(path: str) -> Dict[str, str]:
+    """Read a pipeline result export into ``{job_id: lowercase status}``."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "jobs" in data:
+        data = data["jobs"]
+    if isinstance(data, dict):
+        return {str(k): str(v).lower() for k, v in data.items()}
+    if not isinstance(data, list):
+        raise SchedulerError(f"{path}: unsupported result export format")
+    results: Dict[str, str] = {}
+    for entry in data:
+        if not isinstance(entry, dict):
+            raise SchedulerError(
+                f"{path}: result entry {entry!r} is not an object"
+            )
+        job_id = _first(entry, _ID_KEYS, path)
+        results[job_id] = _first(entry, _STATUS_KEYS, path).lower()
+    return results
+
+
+def select_failed_runs(
+    config: ScheduleConfig,
+    results: Dict[str, str],
+    strict: bool = True,
+) -> Tuple[List[Run], List[str]]:
+    """Return the runs to retry and any failed job ids the config lacks.
+
+    Ids are matched against both the individual runs and any coalesced jobs,
+    so exports from coalesced and plain cycles both work. Join jobs are
+    ignored; they only fail when the pipeline is canceled.
+    """
+    failed = {
+        job_id for job_id, status in results.items()
+        if status.replace(" ", "") in RERUN_STATUSES
+        and not job_id.startswith(JOIN_JOB_PREFIX)
+    }
+    candidates = {r.job_name: r for r in expand_runs(config, strict=strict)}
+    for run in plan_runs(config, strict=strict):
+        candidates.setdefault(run.job_name, run)
+    runs = [run for job_id, run in candidates.items() if job_id in failed]
+    known = {r.job_name for r in runs}
+    return runs, sorted(failed - known)
+
+
+def create_recovery_schedule(
+    config: ScheduleConfig,
+    results: Dict[str, str],
+    strict: bool = True,
+) -> Tuple[Schedule, List[str]]:
+    """Pack only the failed runs, minimising the recovery pipeline's length.
+
+    Returns the schedule and the failed job ids that no longer exist in the
+    config (renamed or removed since the failing cycle).
+    """
+    runs, unknown = select_failed_runs(config, results, strict=strict)
+    return pack_runs_optimal(runs, len(config.queues)), unknown
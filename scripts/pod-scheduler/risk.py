@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Risk-aware stage packing.
+
+:func:`scheduler.create_schedule` packs point estimates, so it cannot tell a
+stage holding two high-variance runs from one holding a stable run, although
+the first is far more likely to overrun. Here each run carries a runtime
+distribution: the spread of its measured history when there is one, or a
+lognormal with the scenario's ``estimated_runtime`` as mean and its
+``runtime_stddev`` as standard deviation. The engine minimises a quantile
+(e.g. p90) of the total makespan rather than the sum of ``Stage.duration``:
+
+1. Draw ``samples`` runtimes per run. Every candidate schedule is scored on
+   the same draws (common random numbers), so comparisons are not noise.
+2. Pack by mean and by each run's own quantile; keep the better start.
+3. Refine by random moves and swaps of runs between stages, keeping a
+   change when the makespan quantile shrinks.
+
+Each run's draws are made once and cached. A candidate is then scored with
+a few passes over plain Python lists of per-sample totals, one element per
+draw, rather than by simulating each draw; numpy is not used:
+
+    python risk.py --config build/benchmarks_ci_pods.json --quantile 0.9
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from config_loader import ConfigError, load_config
+from freshness import cron_headroom
+from generator import GeneratorError
+from models import (
+    ChainedRun,
+    CoalescedRun,
+    Run,
+    Schedule,
+    ScheduleConfig,
+    Stage,
+)
+from scheduler import (
+    SchedulerError,
+    backfill_schedule,
+    create_schedule,
+    expand_runs,
+    fill_idle,
+    lead_sentinels,
+    order_stages_by_priority,
+    pack_runs,
+    plan_runs,
+    run_priority,
+    sequence_links,
+    split_schedule,
+)
+
+
+def load_history(path: str) -> Dict[str, List[float]]:
+    """Read measured ``{job_id: [minutes, ...]}`` from JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        str(k): [float(x) for x in v] for k, v in data.items() if v
+    }
+
+
+def quantile(values: List[float], q: float) -> float:
+    """Nearest-rank ``q`` quantile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Sampler:
+    """Runtime draws per job, shared by every schedule scored with it.
+
+    A plain run's draws are its ``estimated_runtime`` plus zero-mean noise
+    keyed by job id, so a run whose estimate was lowered (e.g. by a reuse
+    discount) keeps the same noise. Merged and chained jobs add up the noise
+    of their parts.
+    """
+
+    def __init__(
+        self,
+        samples: int = 1000,
+        seed: int = 0,
+        history: Optional[Dict[str, List[float]]] = None,
+    ):
+        if samples < 1:
+            raise SchedulerError(f"Need at least one sample, got {samples}")
+        self.samples = samples
+        self.seed = seed
+        self.history = history or {}
+        self._noise: Dict[str, List[float]] = {}
+
+    def _leaf_noise(self, run: Run) -> List[float]:
+        noise = self._noise.get(run.job_name)
+        if noise is not None:
+            return noise
+        rng = random.Random(f"{self.seed}:{run.job_name}")
+        past = self.history.get(run.job_name)
+        std = run.scenario.runtime_stddev
+        mean = run.estimated_runtime
+        if past:
+            centre = sum(past) / len(past)
+            noise = [rng.choice(past) - centre for _ in range(self.samples)]
+        elif std > 0 and mean > 0:
+            # Lognormal with this mean and standard deviation.
+            sigma2 = math.log1p((std / mean) ** 2)
+            mu = math.log(mean) - sigma2 / 2
+            sigma = math.sqrt(sigma2)
+            noise = [
+                rng.lognormvariate(mu, sigma) - mean
+                for _ in range(self.samples)
+            ]
+        else:
+            noise = [0.0] * self.samples
+        self._noise[run.job_name] = noise
+        return noise
+
+    def _noise_of(self, run: Run) -> List[float]:
+        if isinstance(run, (ChainedRun, CoalescedRun)):
+            return [sum(col) for col in zip(*map(self._noise_of, run.parts))]
+        return self._leaf_noise(run)
+
+    def draws(self, run: Run) -> List[float]:
+        """``samples`` runtimes of ``run`` in minutes."""
+        mean = run.estimated_runtime
+        return [max(0.0, mean + n) for n in self._noise_of(run)]
+
+    def stage_draws(self, stage: Stage) -> List[float]:
+        """Per-sample duration of ``stage``: the slowest lane."""
+        columns = [self.draws(run) for run in stage.runs]
+        if len(columns) < 2:
+            return columns[0] if columns else [0.0] * self.samples
+        return list(map(max, *columns))
+
+    def makespans(self, schedule: Schedule) -> List[float]:
+        """Per-sample makespan of ``schedule``."""
+        totals = [0.0] * self.samples
+        for stage in schedule.stages:
+            totals = [
+                t + d for t, d in zip(totals, self.stage_draws(stage))
+            ]
+        return totals
+
+
+def _feasible(stage: List[Run], run: Run, queue_count: int) -> bool:
+    return len(stage) < queue_count and all(
+        run.machines_used.isdisjoint(other.machines_used) for other in stage
+    )
+
+
+def refine(
+    schedule: Schedule,
+    queue_count: int,
+    sampler: Sampler,
+    q: float,
+    iterations: int,
+    seed: int = 0,
+) -> Schedule:
+    """Move and swap runs between stages while the ``q`` quantile shrinks.
+
+    Runs with :func:`scheduler.sequence_links` stay in their stages. The
+    search is seeded so the result is reproducible.
+    """
+    rng = random.Random(seed)
+    stages = [list(st.runs) for st in schedule.stages]
+    if not stages:
+        return schedule
+    draws = [sampler.stage_draws(Stage(runs=st)) for st in stages]
+    totals = [sum(col) for col in zip(*draws)] or [0.0] * sampler.samples
+    best = quantile(totals, q)
+    links = sequence_links([run for st in stages for run in st])
+    pinned = set(links) | {
+        link.before.job_name for found in links.values() for link in found
+    }
+
+    for _ in range(iterations):
+        a = rng.randrange(len(stages))
+        movable = [r for r in stages[a] if r.job_name not in pinned]
+        if not movable:
+            continue
+        run = rng.choice(movable)
+        b = rng.randrange(len(stages) + 1)
+        if b == a:
+            continue
+        rest_a = [r for r in stages[a] if r is not run]
+        target = stages[b] if b < len(stages) else []
+        if _feasible(target, run, queue_count):
+            new_a, new_b = rest_a, target + [run]
+        else:
+            # Swap with a run of the target stage that frees the way.
+            options = [
+                other for other in target
+                if other.job_name not in pinned
+                and _feasible([r for r in target if r is not other], run,
+                              queue_count)
+                and _feasible(rest_a, other, queue_count)
+            ]
+            if not options:
+                continue
+            other = rng.choice(options)
+            new_a = rest_a + [other]
+            new_b = [r for r in target if r is not other] + [run]
+        draws_a = sampler.stage_draws(Stage(runs=new_a))
+        draws_b = sampler.stage_draws(Stage(runs=new_b))
+        old_b = draws[b] if b < len(stages) else [0.0] * sampler.samples
+        candidate = [
+            t - oa - ob + na + nb
+            for t, oa, ob, na, nb in zip(totals, draws[a], old_b,
+                                         draws_a, draws_b)
+        ]
+        span = quantile(candidate, q)
+        if span >= best:
+            continue
+        best, totals = span, candidate
+        if b == len(stages):
+            stages.append(new_b)
+            draws.append(draws_b)
+        else:
+            stages[b], draws[b] = new_b, draws_b
+        stages[a], draws[a] = new_a, draws_a
+        if not new_a:
+            del stages[a], draws[a]
+    return Schedule(stages=[Stage(runs=st) for st in stages])
+
+
+def quantile_pack(
+    runs: List[Run], queue_count: int, sampler: Sampler, q: float = 0.9
+) -> Schedule:
+    """Pack ``runs`` by each run's own ``q`` quantile instead of its mean.
+
+    The packed runs carry their estimates again, less any reuse discount
+    the packer gave them.
+    """
+    originals: Dict[str, Tuple[Run, float]] = {}
+    pessimistic = []
+    for run in runs:
+        proxy = replace(run, estimated_runtime=quantile(sampler.draws(run), q))
+        originals[run.job_name] = (run, proxy.estimated_runtime)
+        pessimistic.append(proxy)
+
+    def original(packed_run: Run) -> Run:
+        run, inflated = originals[packed_run.job_name]
+        discount = inflated - packed_run.estimated_runtime
+        if not discount:
+            return run
+        return replace(
+            run, estimated_runtime=max(0.0, run.estimated_runtime - discount)
+        )
+
+    packed = pack_runs(pessimistic, queue_count)
+    return Schedule(stages=[
+        Stage(runs=[original(r) for r in st.runs]) for st in packed.stages
+    ])
+
+
+def risk_pack(
+    runs: List[Run],
+    queue_count: int,
+    sampler: Sampler,
+    q: float = 0.9,
+    iterations: int = 2000,
+    seed: int = 0,
+) -> Schedule:
+    """Pack ``runs`` into stages minimising the ``q`` makespan quantile."""
+    start = min(
+        (pack_runs(runs, queue_count),
+         quantile_pack(runs, queue_count, sampler, q)),
+        key=lambda s: quantile(sampler.makespans(s), q),
+    )
+    return refine(start, queue_count, sampler, q, iterations, seed)
+
+
+def risk_schedule(
+    config: ScheduleConfig,
+    strict: bool = True,
+    q: float = 0.9,
+    samples: int = 1000,
+    iterations: int = 2000,
+    seed: int = 0,
+    history: Optional[Dict[str, List[float]]] = None,
+) -> Schedule:
+    """Like :func:`scheduler.create_schedule`, minimising a makespan quantile.
+
+    Backfill is kept only when it does not raise the quantile, since chained
+    runs add up their spread. Priority reordering never changes the total.
+    With ``config.health`` each pod's sentinel runs first, as in
+    :func:`scheduler.lead_sentinels`. Filler scenarios then go into the idle time left, as with the estimates
+    (see :func:`scheduler.fill_idle`).
+    """
+    if not 0 < q < 1:
+        raise SchedulerError(f"Quantile must be between 0 and 1, got {q}")
+    sampler = Sampler(samples, seed, history)
+    runs = plan_runs(config, strict=strict)
+    schedule = risk_pack(
+        runs, len(config.queues), sampler, q, iterations, seed
+    )
+    if config.backfill:
+        filled = backfill_schedule(schedule)
+        if (quantile(sampler.makespans(filled), q)
+                <= quantile(sampler.makespans(schedule), q)):
+            schedule = filled
+    if any(run_priority(r) for r in runs):
+        schedule = order_stages_by_priority(schedule)
+    if config.health is not None:
+        schedule = lead_sentinels(schedule, set(config.health.sentinels))
+    fillers = expand_runs(config, strict=strict, filler=True)
+    if fillers:
+        schedule = fill_idle(schedule, fillers, len(config.queues))
+    return schedule
+
+
+def risk_report(
+    config: ScheduleConfig,
+    schedules: List[Schedule],
+    sampler: Sampler,
+    q: float,
+    label: str = "",
+) -> List[Tuple[str, float, float, float, float]]:
+    """``(label, mean, quantile, window, P(overrun))`` per split YAML.
+
+    The window is the time until the next trigger of any YAML, as in
+    :func:`freshness.cron_headroom`.
+    """
+    headroom = cron_headroom(
+        [(config, schedules, label)], config.schedule_offset_hours
+    )
+    rows = []
+    for i, sched in enumerate(schedules):
+        name = f"{label} YAML {i + 1}"
+        spans = sampler.makespans(sched)
+        window = headroom[name] + sched.total_duration
+        overrun = sum(1 for s in spans if s > window) / len(spans)
+        rows.append((
+            name, sum(spans) / len(spans), quantile(spans, q), window, overrun
+        ))
+    return rows
+
+
+def print_risk_report(
+    title: str,
+    rows: List[Tuple[str, float, float, float, float]],
+    q: float,
+) -> None:
+    """Print :func:`risk_report` rows under ``title``."""
+    width = max([len("Pipeline")] + [len(row[0]) for row in rows])
+    print(f"{title}:")
+    print(f"  {'Pipeline':<{width}} {'Mean':>7} {f'p{q * 100:g}':>7} "
+          f"{'Window':>7}  P(overrun)")
+    for name, mean, span, window, overrun in rows:
+        print(f"  {name:<{width}} {mean:>6.0f}m {span:>6.0f}m "
+              f"{window:>6.0f}m  {overrun * 100:5.1f}%")
+    print()
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare the stage engine with risk-aware packing on a "
+                    "makespan quantile"
+    )
+    parser.add_argument(
+        "--config", required=True,
+        help="Path to JSON configuration file"
+    )
+    parser.add_argument(
+        "--quantile", type=float, default=0.9,
+        help="Makespan quantile to minimise (default: 0.9)"
+    )
+    parser.add_argument(
+        "--history", metavar="PATH",
+        help="JSON {job_id: [minutes, ...]} of measured durations; other "
+             "runs use their scenario's runtime_stddev"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=1000,
+        help="Runtime draws per run (default: 1000)"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=2000,
+        help="Local-search moves to try (default: 2000)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Random seed for draws and search (default: 0)"
+    )
+    parser.add_argument(
+        "--target-yamls", type=int,
+        help="Override number of YAML files to split into"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    strict = not args.lenient
+    try:
+        config = load_config(args.config)
+        history = load_history(args.history) if args.history else None
+        yaml_count = args.target_yamls or config.target_yaml_count
+        sampler = Sampler(args.samples, args.seed, history)
+        for title, schedule in [
+            ("STAGE ENGINE", create_schedule(config, strict=strict)),
+            ("RISK-AWARE", risk_schedule(
+                config, strict, args.quantile, args.samples,
+                args.iterations, args.seed, history,
+            )),
+        ]:
+            print_risk_report(
+                f"{title} ({schedule.total_duration:.0f} min estimated)",
+                risk_report(
+                    config, split_schedule(schedule, yaml_count), sampler,
+                    args.quantile, config.name,
+                ),
+                args.quantile,
+            )
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
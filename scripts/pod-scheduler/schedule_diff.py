@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Compare the schedules of two config revisions.
+
+A config PR only shows reviewers a YAML diff, which says nothing about what
+the change costs. This command schedules both revisions the way ``main.py``
+would and reports the makespan delta, per-machine utilization deltas, runs
+that moved, and how close every YAML comes to overrunning the next cron
+trigger.
+
+Usage:
+    python schedule_diff.py OLD NEW
+
+Each side is a path, or ``REF:PATH`` to read the file at a git ref of the
+local checkout (e.g. ``origin/main:build/benchmarks_ci_pods.json``).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config_loader import ConfigError, load_config, parse_config
+from freshness import Outputs, cron_headroom, freshness_split
+from generator import GeneratorError
+from metrics import schedule_metrics
+from models import Schedule, ScheduleConfig
+from multirate import cycle_period, phase_configs
+from scheduler import (
+    SchedulerError,
+    create_schedule,
+    lead_sentinels_per_split,
+    split_schedule,
+)
+
+
+@dataclass
+class Revision:
+    """One side of the comparison, already scheduled."""
+    label: str
+    config: ScheduleConfig
+    outputs: Outputs
+
+    @property
+    def makespan(self) -> float:
+        """Longest single YAML; what a cron cycle has to fit."""
+        return max(
+            (s.total_duration for _, scheds, _ in self.outputs for s in scheds),
+            default=0.0,
+        )
+
+    @property
+    def total_minutes(self) -> float:
+        return sum(
+            s.total_duration for _, scheds, _ in self.outputs for s in scheds
+        )
+
+
+@dataclass
+class ScheduleDiff:
+    """What changed between two scheduled revisions."""
+    old: Revision
+    new: Revision
+    # machine -> (old utilization, new utilization); None when absent.
+    utilization: Dict[str, Tuple[Optional[float], Optional[float]]] = field(
+        default_factory=dict
+    )
+    # (run name, old YAML, new YAML)
+    moved: List[Tuple[str, str, str]] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # YAML label -> (old headroom, new headroom) in minutes before the next
+    # cron trigger; negative means the YAML overruns it.
+    headroom: Dict[str, Tuple[Optional[float], Optional[float]]] = field(
+        default_factory=dict
+    )
+
+
+def read_config(spec: str) -> ScheduleConfig:
+    """Load a config from a path, or from ``REF:PATH`` in the local git repo."""
+    if os.path.exists(spec) or ":" not in spec:
+        return load_config(spec)
+    result = subprocess.run(
+        ["git", "show", spec],
+        capture_output=True, text=True, encoding="utf-8", check=False,
+    )
+    if result.returncode != 0:
+        raise ConfigError(
+            f"Cannot read {spec!r} from git: {result.stderr.strip()}"
+        )
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError as exc:
+        raise ConfigError(f"{spec} is not valid JSON: {exc}") from exc
+    return parse_config(data)
+
+
+def plan_outputs(
+    config: ScheduleConfig,
+    base_name: str = "benchmarks-ci",
+    yaml_count: Optional[int] = None,
+    strict: bool = True,
+) -> Outputs:
+    """Schedule and split ``config`` the way ``main.py`` does by default."""
+    yaml_count = yaml_count or config.target_yaml_count
+    if cycle_period(config) > 1:
+        phases = phase_configs(config, strict=strict)
+        splits = freshness_split(
+            [create_schedule(p, strict=strict) for p in phases],
+            [p.schedule for p in phases],
+            yaml_count,
+            config.schedule_offset_hours,
+            sentinels=(set(config.health.sentinels)
+                       if config.health else None),
+        )
+        outputs = [
+            (p, splits[i], f"{base_name}-phase{i + 1}")
+            for i, p in enumerate(phases)
+        ]
+    else:
+        schedule = create_schedule(config, strict=strict)
+        outputs = [(config, split_schedule(schedule, yaml_count), base_name)]
+    if config.health is not None:
+        outputs = [
+            (out_config, lead_sentinels_per_split(
+                out_schedules, set(config.health.sentinels)
+            ), out_name)
+            for out_config, out_schedules, out_name in outputs
+        ]
+    return outputs
+
+
+def _locations(revision: Revision) -> Dict[str, Tuple[str, frozenset]]:
+    """Run name -> (YAML label, names of the runs sharing its stage)."""
+    result: Dict[str, Tuple[str, frozenset]] = {}
+    for _, schedules, name in revision.outputs:
+        for i, sched in enumerate(schedules):
+            for stage in sched.stages:
+                names = frozenset(r.name for r in stage.runs)
+                for run in stage.runs:
+                    result[run.name] = (f"{name} YAML {i + 1}", names)
+    return result
+
+
+def _utilization(revision: Revision) -> Dict[str, float]:
+    busy: Dict[str, float] = {}
+    total: Dict[str, float] = {}
+    for out_config, schedules, _ in revision.outputs:
+        machines = schedule_metrics(out_config, schedules)["machines"]
+        for m, values in machines.items():
+            busy[m] = busy.get(m, 0.0) + values["busy_minutes"]
+            total[m] = total.get(m, 0.0) + values["total_minutes"]
+    return {m: busy[m] / total[m] if total[m] else 0.0 for m in total}
+
+
+def diff_revisions(old: Revision, new: Revision) -> ScheduleDiff:
+    """Compare two scheduled revisions.
+
+    A run counts as moved when it changes YAML or when the set of runs it
+    shares a stage with changes (ignoring runs added or removed), so a stage
+    being renumbered alone does not flag every run after it.
+    """
+    result = ScheduleDiff(old=old, new=new)
+
+    old_util, new_util = _utilization(old), _utilization(new)
+    for m in sorted(set(old_util) | set(new_util)):
+        result.utilization[m] = (old_util.get(m), new_util.get(m))
+
+    old_loc, new_loc = _locations(old), _locations(new)
+    common = set(old_loc) & set(new_loc)
+    result.added = sorted(set(new_loc) - common)
+    result.removed = sorted(set(old_loc) - common)
+    for name in sorted(common):
+        old_yaml, old_mates = old_loc[name]
+        new_yaml, new_mates = new_loc[name]
+        if old_yaml != new_yaml or (old_mates & common) != (new_mates & common):
+            result.moved.append((name, old_yaml, new_yaml))
+
+    old_room = cron_headroom(old.outputs, old.config.schedule_offset_hours)
+    new_room = cron_headroom(new.outputs, new.config.schedule_offset_hours)
+    for label in sorted(set(old_room) | set(new_room)):
+        result.headroom[label] = (old_room.get(label), new_room.get(label))
+    return result
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_diff(diff: ScheduleDiff) -> None:
+    """Print a reviewer-facing summary of a :class:`ScheduleDiff`."""
+    old, new = diff.old, diff.new
+    print(f"SCHEDULE DIFF: {old.label} -> {new.label}")
+    print(f"  Makespan (longest YAML): {old.makespan:.0f} -> "
+          f"{new.makespan:.0f} min ({new.makespan - old.makespan:+.0f})")
+    print(f"  Total stage time: {old.total_minutes:.0f} -> "
+          f"{new.total_minutes:.0f} min "
+          f"({new.total_minutes - old.total_minutes:+.0f})")
+    print()
+
+    print("CRON HEADROOM (min before the next trigger; negative = overrun):")
+    for label, (before, after) in diff.headroom.items():
+        flag = ""
+        if after is not None and after < 0 <= (before or 0):
+            flag = "  NEW OVERRUN"
+        elif after is not None and after < 0:
+            flag = "  OVERRUN"
+        print(f"  {label:<30} {_fmt(before, '>6.0f')} -> "
+              f"{_fmt(after, '>6.0f')}{flag}")
+    print()
+
+    changed = {
+        m: pair for m, pair in diff.utilization.items()
+        if pair[0] is None or pair[1] is None or abs(pair[1] - pair[0]) >= 0.005
+    }
+    print(f"MACHINE UTILIZATION ({len(changed)} changed):")
+    for m, (before, after) in changed.items():
+        delta = ""
+        if before is not None and after is not None:
+            delta = f" ({(after - before) * 100:+.1f} pts)"
+        print(f"  {m:<25} {_fmt(before and before * 100, '>5.1f')}% -> "
+              f"{_fmt(after and after * 100, '>5.1f')}%{delta}")
+    print()
+
+    print(f"RUNS: {len(diff.added)} added, {len(diff.removed)} removed, "
+          f"{len(diff.moved)} moved")
+    for name in diff.added:
+        print(f"  + {name}")
+    for name in diff.removed:
+        print(f"  - {name}")
+    for name, before, after in diff.moved:
+        where = after if before == after else f"{before} -> {after}"
+        print(f"  ~ {name} ({where})")
+    print()
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare the schedules of two pod-scheduler configs"
+    )
+    parser.add_argument(
+        "old", help="Old config: a path, or REF:PATH in the local git repo"
+    )
+    parser.add_argument(
+        "new", help="New config: a path, or REF:PATH in the local git repo"
+    )
+    parser.add_argument(
+        "--target-yamls", type=int,
+        help="Override number of YAML files for both sides"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    strict = not args.lenient
+    try:
+        revisions = []
+        for spec in (args.old, args.new):
+            config = read_config(spec)
+            revisions.append(Revision(
+                label=spec,
+                config=config,
+                outputs=plan_outputs(
+                    config, yaml_count=args.target_yamls, strict=strict
+                ),
+            ))
+        print_diff(diff_revisions(*revisions))
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
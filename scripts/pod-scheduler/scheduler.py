@@ -9,10 +9,15 @@ Output is deterministic: identical input JSON always produces identical
 schedules, so generated YAML files diff cleanly across regenerations.
 """
 
-from typing import List, Tuple
+import heapq
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from models import (
     DEFAULT_RUNTIMES,
+    ChainedRun,
+    CoalescedRun,
+    CoalesceSettings,
     Run,
     Schedule,
     ScheduleConfig,
@@ -24,15 +29,51 @@ class SchedulerError(ValueError):
     """Raised when the scheduler refuses to build a schedule."""
 
 
-def expand_runs(config: ScheduleConfig, strict: bool = True) -> List[Run]:
+@dataclass
+class Rejection:
+    """An existing stage :func:`pack_runs` could not put a run into."""
+    run: Run
+    # Index of the stage in packing order (before backfill or reordering).
+    stage: int
+    # Machines the run shares with runs already in the stage.
+    machines: Set[str]
+    # The stage already had one run per queue.
+    queue_full: bool
+    # Job ids of the run's ``after``/``reuses`` predecessors it waited for.
+    held_behind: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Link:
+    """A job that should follow ``before`` (see :func:`sequence_links`)."""
+    before: Run
+    # The part of the following job the link belongs to; the job itself
+    # unless it is coalesced or chained.
+    part: Run
+    # ``before`` must finish first (``after``); otherwise only the reuse
+    # discount depends on the order.
+    hard: bool
+    discount: float
+
+
+def expand_runs(
+    config: ScheduleConfig,
+    strict: bool = True,
+    filler: bool = False,
+) -> List[Run]:
     """Expand scenarios x pods into individual runs.
 
     With ``strict=True`` (the default) an unknown pod or a pod that cannot
     satisfy a scenario's type raises :class:`SchedulerError`. With
     ``strict=False`` the offending entry is skipped and a warning is printed.
+
+    Only the runs every cycle must place are returned; ``filler=True``
+    returns the optional filler runs instead (see :func:`fill_idle`).
     """
     runs: List[Run] = []
     for scenario in config.scenarios:
+        if scenario.filler != filler:
+            continue
         for pod_name in scenario.pods:
             pod = config.pods.get(pod_name)
             if pod is None:
@@ -57,60 +98,841 @@ def expand_runs(config: ScheduleConfig, strict: bool = True) -> List[Run]:
             runs.append(Run(
                 scenario=scenario,
                 pod=pod,
-                estimated_runtime=runtime,
+                estimated_runtime=runtime + config.job_overhead_minutes,
             ))
     return runs
 
 
-def create_schedule(config: ScheduleConfig, strict: bool = True) -> Schedule:
-    """Create a schedule by greedy longest-job-first packing.
+def coalesce_runs(
+    runs: List[Run],
+    settings: CoalesceSettings,
+    overhead: float = 0.0,
+) -> List[Run]:
+    """Merge short runs on the same pod into :class:`CoalescedRun` jobs.
 
-    1. Expand all scenario x pod combinations into runs.
-    2. Sort by runtime descending (longest-job-first heuristic).
-    3. Greedily pack runs into stages, checking machine collisions.
+    Candidates (own runtime <= ``max_run_minutes``) are packed per pod,
+    longest-first, into jobs whose parts add up to at most
+    ``max_job_minutes``. Each merged job pays ``overhead`` once instead of
+    once per part. Jobs that end up with a single part stay plain runs.
+    """
+    result: List[Run] = []
+    by_pod: Dict[str, List[Run]] = {}
+    for run in runs:
+        if run.estimated_runtime - overhead <= settings.max_run_minutes:
+            by_pod.setdefault(run.pod.name, []).append(run)
+        else:
+            result.append(run)
 
-    Sort key includes the run name as a tie-breaker so the result is stable.
+    for pod_name in sorted(by_pod):
+        candidates = sorted(
+            by_pod[pod_name], key=lambda r: (-r.estimated_runtime, r.name)
+        )
+        bins: List[List[Run]] = []
+        loads: List[float] = []
+        for run in candidates:
+            own = run.estimated_runtime - overhead
+            for i, load in enumerate(loads):
+                if load + own <= settings.max_job_minutes:
+                    bins[i].append(run)
+                    loads[i] += own
+                    break
+            else:
+                bins.append([run])
+                loads.append(own)
+        for parts, load in zip(bins, loads):
+            if len(parts) == 1:
+                result.append(parts[0])
+                continue
+            parts.sort(key=lambda r: r.name)
+            parts = sequence_order(parts, sequence_links(parts))
+            result.append(CoalescedRun(
+                scenario=parts[0].scenario,
+                pod=parts[0].pod,
+                estimated_runtime=load + overhead,
+                parts=parts,
+            ))
+    return result
+
+
+def plan_runs(config: ScheduleConfig, strict: bool = True) -> List[Run]:
+    """Return the jobs the scheduler will place for ``config``.
+
+    Without ``config.coalesce`` these are the expanded runs. Otherwise the
+    coalesced variant is used unless it packs into a longer schedule than the
+    plain runs, so merging never costs makespan.
     """
     runs = expand_runs(config, strict=strict)
+    if config.coalesce is None:
+        return runs
+    merged = coalesce_runs(runs, config.coalesce, config.job_overhead_minutes)
     queue_count = len(config.queues)
+    if (pack_runs(merged, queue_count).total_duration
+            <= pack_runs(runs, queue_count).total_duration):
+        return merged
+    return runs
+
+
+def machine_masks(runs: List[Run]) -> List[int]:
+    """One integer per run with a bit set for each machine it uses.
+
+    Two runs collide exactly when their masks share a bit, which is much
+    cheaper to test than intersecting sets of machine names.
+    """
+    bits: Dict[str, int] = {}
+    return [_mask(run, bits) for run in runs]
+
+
+def _mask(run: Run, bits: Dict[str, int]) -> int:
+    """``run``'s machine mask, giving unseen machines the next free bit."""
+    mask = 0
+    for machine in run.machines_used:
+        mask |= bits.setdefault(machine, 1 << len(bits))
+    return mask
+
+
+def _parts(run: Run) -> List[Run]:
+    if isinstance(run, (ChainedRun, CoalescedRun)):
+        return list(run.parts)
+    return [run]
+
+
+def sequence_links(runs: List[Run]) -> Dict[str, List[Link]]:
+    """Ordering constraints between ``runs``, keyed by the following job id.
+
+    A scenario's ``after`` names scenarios that must finish first on the
+    same pod; its ``reuses`` names scenarios whose artifacts save it minutes
+    when they ran earlier on the same SUT machine. Runs of scenarios that
+    are not in ``runs`` impose nothing, and the result is empty when no
+    scenario sets either field.
+    """
+    if not any(
+        p.scenario.after or p.scenario.reuses
+        for run in runs for p in _parts(run)
+    ):
+        return {}
+    by_pod: Dict[Tuple[str, str], Run] = {}
+    by_sut: Dict[Tuple[str, str], List[Run]] = {}
+    for run in runs:
+        for part in _parts(run):
+            by_pod[(part.pod.name, part.scenario.name)] = run
+            by_sut.setdefault(
+                (part.pod.sut, part.scenario.name), []
+            ).append(run)
+    links: Dict[str, List[Link]] = {}
+    for run in runs:
+        for part in _parts(run):
+            found = []
+            for name in part.scenario.after:
+                before = by_pod.get((part.pod.name, name))
+                if before is not None and before is not run:
+                    found.append(Link(before, part, True, 0.0))
+            for name, minutes in sorted(part.scenario.reuses.items()):
+                for before in by_sut.get((part.pod.sut, name), []):
+                    if before is not run:
+                        found.append(Link(before, part, False, minutes))
+            if found:
+                links.setdefault(run.job_name, []).extend(found)
+    return links
+
+
+def reuse_discount(
+    links: List[Link], earlier: Callable[[Run], bool]
+) -> float:
+    """Minutes a job saves given which of its predecessors ran ``earlier``.
+
+    Each part takes its best discount; parts of merged jobs add up.
+    """
+    best: Dict[str, float] = {}
+    for link in links:
+        if link.discount and earlier(link.before):
+            name = link.part.name
+            best[name] = max(best.get(name, 0.0), link.discount)
+    return sum(best.values())
+
+
+def sequence_order(
+    runs: List[Run], links: Dict[str, List[Link]]
+) -> List[Run]:
+    """Reorder ``runs`` so every job comes after the jobs it links to.
+
+    Otherwise the given order is kept as far as possible. Merged jobs can
+    link both ways; such a cycle is broken by releasing the earliest job.
+    """
+    if not links:
+        return list(runs)
+    position = {id(run): i for i, run in enumerate(runs)}
+    waiting: List[Set[int]] = [set() for _ in runs]
+    followers: List[List[int]] = [[] for _ in runs]
+    for i, run in enumerate(runs):
+        for link in links.get(run.job_name, ()):
+            j = position.get(id(link.before))
+            if j is not None and j not in waiting[i]:
+                waiting[i].add(j)
+                followers[j].append(i)
+    ready = [i for i in range(len(runs)) if not waiting[i]]
+    heapq.heapify(ready)
+    done = [False] * len(runs)
+    result: List[Run] = []
+    while len(result) < len(runs):
+        if not ready:
+            ready.append(min(i for i in range(len(runs)) if not done[i]))
+        i = heapq.heappop(ready)
+        if done[i]:
+            continue
+        done[i] = True
+        result.append(runs[i])
+        for f in followers[i]:
+            waiting[f].discard(i)
+            if not waiting[f] and not done[f]:
+                heapq.heappush(ready, f)
+    return result
+
+
+def pack_runs(
+    runs: List[Run],
+    queue_count: int,
+    rejections: Optional[List[Rejection]] = None,
+) -> Schedule:
+    """Greedily pack runs into stages, longest-job-first.
+
+    Each run goes into the first stage where no physical machine collides and
+    the queue limit isn't exceeded. The sort key includes the run name as a
+    tie-breaker so the result is stable. When ``rejections`` is given, every
+    stage passed over for a run is appended to it with the reason.
+
+    Runs with :func:`sequence_links` are packed after their predecessors
+    and may skip ahead to a later stage to get their reuse discount; their
+    ``estimated_runtime`` then drops by it.
+    """
     if queue_count == 0:
         raise SchedulerError(
             "Cannot schedule with zero queues. Configure metadata.queues."
         )
 
-    runs.sort(key=lambda r: (-r.estimated_runtime, r.name))
+    ordered = sorted(runs, key=lambda r: (-r.estimated_runtime, r.name))
+    links = sequence_links(ordered)
+    ordered = sequence_order(ordered, links)
+    masks = machine_masks(ordered)
 
     schedule = Schedule()
-    for run in runs:
-        for stage in schedule.stages:
-            if stage.can_add(run, queue_count):
+    # Union of the machine masks of each stage's runs, kept alongside it.
+    stage_masks: List[int] = []
+    # Job id -> stage index, for runs other runs are linked to.
+    stage_of: Dict[str, int] = {}
+    for run, mask in zip(ordered, masks):
+        incoming = links.get(run.job_name)
+        if incoming:
+            index = _place_linked(
+                run, mask, incoming, schedule, stage_masks, stage_of,
+                queue_count, rejections,
+            )
+            stage_of[run.job_name] = index
+            continue
+        for index, stage in enumerate(schedule.stages):
+            if len(stage.runs) < queue_count and not mask & stage_masks[index]:
                 stage.runs.append(run)
+                stage_masks[index] |= mask
                 break
+            if rejections is not None:
+                rejections.append(Rejection(
+                    run=run,
+                    stage=index,
+                    machines=run.machines_used & stage.machines_in_use,
+                    queue_full=len(stage.runs) >= queue_count,
+                ))
         else:
             schedule.stages.append(Stage(runs=[run]))
+            stage_masks.append(mask)
+            index = len(schedule.stages) - 1
+        if links:
+            stage_of[run.job_name] = index
 
     return schedule
 
 
+def _place_linked(
+    run: Run,
+    mask: int,
+    incoming: List[Link],
+    schedule: Schedule,
+    stage_masks: List[int],
+    stage_of: Dict[str, int],
+    queue_count: int,
+    rejections: Optional[List[Rejection]],
+) -> int:
+    """Put a run with predecessors into the stage that costs least.
+
+    It must land after the stages of its ``after`` predecessors. Among the
+    stages it fits, it takes the one that lengthens the schedule least, then
+    the one where it saves the most reuse minutes, then the earliest. Every
+    earlier stage is recorded in ``rejections``: those before an ``after``
+    predecessor, or before a ``reuses`` one it waited for, name it in
+    ``held_behind``; a stage it fit but left for a later one that grows
+    less gives no reason at all.
+    """
+    first = 1 + max(
+        (stage_of.get(link.before.job_name, -1)
+         for link in incoming if link.hard),
+        default=-1,
+    )
+
+    def runtime(index: int) -> float:
+        return run.estimated_runtime - reuse_discount(
+            incoming, lambda r: stage_of.get(r.job_name, index) < index
+        )
+
+    best: Optional[Tuple[float, float, int]] = None
+    passed: List[Rejection] = []
+    for index in range(first, len(schedule.stages)):
+        stage = schedule.stages[index]
+        if len(stage.runs) < queue_count and not mask & stage_masks[index]:
+            minutes = runtime(index)
+            option = (max(0.0, minutes - stage.duration), minutes, index)
+            if best is None or option < best:
+                best = option
+        elif rejections is not None:
+            passed.append(Rejection(
+                run=run,
+                stage=index,
+                machines=run.machines_used & stage.machines_in_use,
+                queue_full=len(stage.runs) >= queue_count,
+            ))
+    new_index = len(schedule.stages)
+    minutes = runtime(new_index)
+    if best is None or (minutes, minutes, new_index) < best:
+        best = (minutes, minutes, new_index)
+    _, minutes, index = best
+    if rejections is not None:
+        own = {r.stage: r for r in passed}
+        for stage in range(index):
+            rejection = own.get(stage) or Rejection(run, stage, set(), False)
+            rejection.held_behind = _held_behind(
+                incoming, stage_of, stage, index
+            )
+            rejections.append(rejection)
+    if minutes != run.estimated_runtime:
+        run = replace(run, estimated_runtime=minutes)
+    if index == new_index:
+        schedule.stages.append(Stage(runs=[run]))
+        stage_masks.append(mask)
+    else:
+        schedule.stages[index].runs.append(run)
+        stage_masks[index] |= mask
+    return index
+
+
+def _held_behind(
+    incoming: List[Link], stage_of: Dict[str, int], stage: int, index: int
+) -> List[str]:
+    """Predecessors that kept a run placed in stage ``index`` out of ``stage``.
+
+    Those are its ``after`` predecessors in ``stage`` or later, and the
+    ``reuses`` ones whose discount it only gets after ``stage``.
+    """
+    held = set()
+    for link in incoming:
+        placed = stage_of.get(link.before.job_name)
+        if placed is None or placed < stage:
+            continue
+        if link.hard or (link.discount and placed < index):
+            held.add(link.before.job_name)
+    return sorted(held)
+
+
+def pack_runs_optimal(
+    runs: List[Run],
+    queue_count: int,
+    node_budget: int = 200_000,
+) -> Schedule:
+    """Pack runs minimising total duration, by branch-and-bound.
+
+    Runs are visited longest-first, so adding a run to an existing stage
+    never lengthens it and the cost of a packing is just the sum of the runs
+    that open a stage. The greedy packing seeds the upper bound; when the
+    search exceeds ``node_budget`` nodes the best packing found so far is
+    returned, which is never worse than :func:`pack_runs`. Runs with
+    :func:`sequence_links` get the greedy packing, which honours them.
+    """
+    best = pack_runs(runs, queue_count)
+    if sequence_links(runs):
+        return best
+    ordered = sorted(runs, key=lambda r: (-r.estimated_runtime, r.name))
+    masks = machine_masks(ordered)
+    best_cost = best.total_duration
+    best_stages: Optional[List[List[Run]]] = None
+    stages: List[List[Run]] = []
+    stage_masks: List[int] = []
+    nodes = 0
+
+    def search(index: int, cost: float) -> None:
+        nonlocal best_cost, best_stages, nodes
+        nodes += 1
+        if nodes > node_budget or cost >= best_cost:
+            return
+        if index == len(ordered):
+            best_cost = cost
+            best_stages = [list(st) for st in stages]
+            return
+        run = ordered[index]
+        mask = masks[index]
+        for i, stage in enumerate(stages):
+            if len(stage) < queue_count and not mask & stage_masks[i]:
+                stage.append(run)
+                stage_masks[i] |= mask
+                search(index + 1, cost)
+                stage.pop()
+                stage_masks[i] ^= mask
+        stages.append([run])
+        stage_masks.append(mask)
+        search(index + 1, cost + run.estimated_runtime)
+        stages.pop()
+        stage_masks.pop()
+
+    search(0, 0.0)
+    if best_stages is None:
+        return best
+    return Schedule(stages=[Stage(runs=st) for st in best_stages])
+
+
+def backfill_schedule(schedule: Schedule) -> Schedule:
+    """Chain short runs behind shorter lanes so they fill stage idle time.
+
+    With stage barriers a stage lasts as long as its longest run, so a pod
+    holding a short run idles until the barrier. For each stage in order, and
+    each of its lanes, runs from *later* stages on the same pod are appended
+    longest-first as long as the lane still finishes within the stage's
+    duration and the run's machines don't collide with the stage's other
+    lanes. Moved runs leave their original stage, which can only shorten it;
+    stages left empty are dropped. The makespan therefore never grows.
+    Runs with :func:`sequence_links` stay put, so they keep their place
+    after their predecessors.
+    """
+    stages = [Stage(runs=list(st.runs)) for st in schedule.stages]
+    linked = set(sequence_links(
+        [run for st in stages for run in st.runs]
+    ))
+    bits: Dict[str, int] = {}
+    index = 0
+    while index < len(stages):
+        stage = stages[index]
+        limit = stage.duration
+        for lane_idx, lane in enumerate(stage.runs):
+            others = 0
+            for j, other in enumerate(stage.runs):
+                if j != lane_idx:
+                    others |= _mask(other, bits)
+            if isinstance(lane, ChainedRun):
+                parts = list(lane.parts)
+            else:
+                parts = [lane]
+            total = sum(p.estimated_runtime for p in parts)
+            candidates = [
+                (later, run)
+                for later in stages[index + 1:]
+                for run in later.runs
+                if run.pod.name == lane.pod.name
+                and not isinstance(run, ChainedRun)
+                and run.job_name not in linked
+            ]
+            candidates.sort(
+                key=lambda c: (-c[1].estimated_runtime, c[1].name)
+            )
+            for later, run in candidates:
+                if total + run.estimated_runtime > limit:
+                    continue
+                if _mask(run, bits) & others:
+                    continue
+                later.runs = [r for r in later.runs if r is not run]
+                parts.append(run)
+                total += run.estimated_runtime
+            if len(parts) > 1:
+                stage.runs[lane_idx] = ChainedRun(
+                    scenario=parts[0].scenario,
+                    pod=parts[0].pod,
+                    estimated_runtime=total,
+                    parts=parts,
+                )
+        stages = stages[:index + 1] + [
+            st for st in stages[index + 1:] if st.runs
+        ]
+        index += 1
+    return Schedule(stages=stages)
+
+
+def fill_idle(
+    schedule: Schedule, fillers: List[Run], queue_count: int
+) -> Schedule:
+    """Place optional filler runs into stage idle time.
+
+    Stages are visited in order. A filler is chained behind a lane of its
+    pod that finishes early enough, or else opens a new lane on a free
+    queue, provided its machines are idle in that stage. Either way it ends
+    within the stage's duration, so no stage grows and the makespan is
+    unchanged. Fillers go by ``priority``, then longest first; each runs at
+    most once and those that fit nowhere are left out.
+    """
+    stages = [Stage(runs=list(st.runs)) for st in schedule.stages]
+    pending = sorted(
+        fillers,
+        key=lambda r: (-r.scenario.priority, -r.estimated_runtime, r.name),
+    )
+    bits: Dict[str, int] = {}
+    for stage in stages:
+        limit = stage.duration
+        for run in list(pending):
+            if run.estimated_runtime > limit:
+                continue
+            for lane_idx, lane in enumerate(stage.runs):
+                if lane.pod.name != run.pod.name:
+                    continue
+                others = 0
+                for j, other in enumerate(stage.runs):
+                    if j != lane_idx:
+                        others |= _mask(other, bits)
+                parts = (
+                    list(lane.parts) if isinstance(lane, ChainedRun)
+                    else [lane]
+                )
+                total = sum(p.estimated_runtime for p in parts)
+                if (total + run.estimated_runtime > limit
+                        or _mask(run, bits) & others):
+                    continue
+                parts.append(run)
+                stage.runs[lane_idx] = ChainedRun(
+                    scenario=parts[0].scenario,
+                    pod=parts[0].pod,
+                    estimated_runtime=total + run.estimated_runtime,
+                    parts=parts,
+                )
+                pending.remove(run)
+                break
+            else:
+                if stage.can_add(run, queue_count):
+                    stage.runs.append(run)
+                    pending.remove(run)
+    return Schedule(stages=stages)
+
+
+def _chain(parts: List[Run]) -> Run:
+    """A lane running ``parts`` back-to-back; a single part stays plain."""
+    if len(parts) == 1:
+        return parts[0]
+    return ChainedRun(
+        scenario=parts[0].scenario,
+        pod=parts[0].pod,
+        estimated_runtime=sum(p.estimated_runtime for p in parts),
+        parts=parts,
+    )
+
+
+def lead_sentinels(schedule: Schedule, sentinels: Set[str]) -> Schedule:
+    """Move each pod's sentinel run to the front of the pod's first lane.
+
+    A sentinel (see ``health.py``) only gates the jobs after it, but the
+    packer places short runs such as ``Build`` last. Each pod's earliest
+    sentinel run leaves its stage and is chained in front of the pod's lane
+    in the first stage the pod appears in, provided its machines are free
+    there. That stage can grow by the sentinel's runtime at most. Runs with
+    :func:`sequence_links` stay put.
+    """
+    stages = [Stage(runs=list(st.runs)) for st in schedule.stages]
+    links = sequence_links([run for st in stages for run in st.runs])
+    linked = set(links) | {
+        link.before.job_name for found in links.values() for link in found
+    }
+    pods: List[str] = []
+    for stage in stages:
+        for run in stage.runs:
+            if run.pod.name not in pods:
+                pods.append(run.pod.name)
+
+    for pod in pods:
+        found = next((
+            (index, lane_idx, part)
+            for index, stage in enumerate(stages)
+            for lane_idx, lane in enumerate(stage.runs)
+            if lane.pod.name == pod
+            for part in (lane.parts if isinstance(lane, ChainedRun)
+                         else [lane])
+            if not isinstance(part, CoalescedRun)
+            and part.scenario.name in sentinels
+            and part.job_name not in linked
+        ), None)
+        if found is None:
+            continue
+        index, lane_idx, sentinel = found
+        first = next(
+            i for i, stage in enumerate(stages)
+            if any(lane.pod.name == pod for lane in stage.runs)
+        )
+        head = next(
+            j for j, lane in enumerate(stages[first].runs)
+            if lane.pod.name == pod
+        )
+        lane = stages[first].runs[head]
+        parts = list(lane.parts) if isinstance(lane, ChainedRun) else [lane]
+        if parts[0] is sentinel:
+            continue
+        others: Set[str] = set()
+        for j, other in enumerate(stages[first].runs):
+            if j != head:
+                others |= other.machines_used
+        if not sentinel.machines_used.isdisjoint(others):
+            continue
+        if any(p.job_name in linked for p in parts):
+            continue
+        # Take the sentinel out of its lane, then put it in front.
+        old = stages[index].runs[lane_idx]
+        rest = [
+            p for p in (old.parts if isinstance(old, ChainedRun) else [old])
+            if p is not sentinel
+        ]
+        if rest:
+            stages[index].runs[lane_idx] = _chain(rest)
+        else:
+            del stages[index].runs[lane_idx]
+        if index == first:
+            parts = [p for p in parts if p is not sentinel]
+        stages[first].runs[head] = _chain([sentinel] + parts)
+    return Schedule(stages=[st for st in stages if st.runs])
+
+
+def lead_sentinels_per_split(
+    schedules: List[Schedule], sentinels: Set[str]
+) -> List[Schedule]:
+    """Repeat each pod's sentinel at the front of every split YAML.
+
+    AzDO jobs cannot depend on jobs of another pipeline, so a sentinel only
+    gates its own YAML (see ``health.py``). A split YAML that holds jobs of
+    a pod but not its sentinel gets a copy of the sentinel run, placed by
+    :func:`lead_sentinels`; where its machines are not free in the pod's
+    first stage, the YAML is left without one. The sentinel then runs once
+    per YAML holding its pod.
+    """
+    lanes = [run for sched in schedules for st in sched.stages
+             for run in st.runs]
+    links = sequence_links(lanes)
+    linked = set(links) | {
+        link.before.job_name for found in links.values() for link in found
+    }
+    found: Dict[str, Run] = {}
+    for lane in lanes:
+        for part in (lane.parts if isinstance(lane, ChainedRun) else [lane]):
+            if (not isinstance(part, CoalescedRun)
+                    and part.scenario.name in sentinels
+                    and part.job_name not in linked):
+                found.setdefault(part.pod.name, part)
+
+    result = []
+    for sched in schedules:
+        pods: List[str] = []
+        covered: Set[str] = set()
+        for stage in sched.stages:
+            for lane in stage.runs:
+                if lane.pod.name not in pods:
+                    pods.append(lane.pod.name)
+                for part in _parts(lane):
+                    if part.scenario.name in sentinels:
+                        covered.add(part.pod.name)
+        extra = [found[pod] for pod in pods
+                 if pod in found and pod not in covered]
+        if not extra:
+            result.append(sched)
+            continue
+        led = lead_sentinels(
+            Schedule(stages=list(sched.stages)
+                     + [Stage(runs=[run]) for run in extra]),
+            sentinels,
+        )
+        # A copy left in its own stage could not lead its pod: drop it.
+        led.stages = [
+            st for st in led.stages
+            if not (len(st.runs) == 1
+                    and any(st.runs[0] is run for run in extra))
+        ]
+        result.append(led)
+    return result
+
+
+def run_priority(run: Run) -> int:
+    """Priority of a job; merged and chained jobs take their highest part."""
+    if isinstance(run, (ChainedRun, CoalescedRun)):
+        return max(run_priority(p) for p in run.parts)
+    return run.scenario.priority
+
+
+def _stage_weight(stage: Stage) -> int:
+    total = 0
+    for run in stage.runs:
+        parts = run.parts if isinstance(run, ChainedRun) else [run]
+        total += sum(run_priority(p) for p in parts)
+    return total
+
+
+def order_stages_by_priority(schedule: Schedule) -> Schedule:
+    """Reorder stages to minimise priority-weighted completion time.
+
+    The makespan is a sum of stage durations, so any stage order costs the
+    same; Smith's rule (ascending duration / weight) then minimises the
+    weighted sum of stage completion times. Stages without prioritised runs
+    keep their relative order after the rest, so a config with no priorities
+    is left untouched. An order that would move a run ahead of a stage it
+    is linked to (see :func:`sequence_links`) is not applied.
+    """
+    def key(pair: Tuple[int, Stage]) -> Tuple[float, int]:
+        index, stage = pair
+        weight = _stage_weight(stage)
+        if weight == 0:
+            return (float("inf"), index)
+        return (stage.duration / weight, index)
+
+    ordered = sorted(enumerate(schedule.stages), key=key)
+    new_index = {index: i for i, (index, _) in enumerate(ordered)}
+    for before, after in _stage_links(schedule.stages):
+        if new_index[before] > new_index[after]:
+            return schedule
+    return Schedule(stages=[stage for _, stage in ordered])
+
+
+def _stage_links(stages: List[Stage]) -> Set[Tuple[int, int]]:
+    """``(i, j)`` for each stage ``j`` holding a run linked to stage ``i``."""
+    stage_of: Dict[str, int] = {}
+    jobs: List[Run] = []
+    for index, stage in enumerate(stages):
+        for run in stage.runs:
+            jobs.append(run)
+            stage_of[run.job_name] = index
+            for part in _parts(run):
+                stage_of[part.job_name] = index
+    pairs: Set[Tuple[int, int]] = set()
+    for name, links in sequence_links(jobs).items():
+        for link in links:
+            before = stage_of[link.before.job_name]
+            if before != stage_of[name]:
+                pairs.add((before, stage_of[name]))
+    return pairs
+
+
+def completion_times(schedule: Schedule) -> List[Tuple[Run, float]]:
+    """Expected finish time (minutes from pipeline start) of every run.
+
+    Runs start at their stage's barrier; chained parts start when their
+    predecessor ends.
+    """
+    result: List[Tuple[Run, float]] = []
+    start = 0.0
+    for stage in schedule.stages:
+        for run in stage.runs:
+            parts = run.parts if isinstance(run, ChainedRun) else [run]
+            finish = start
+            for part in parts:
+                finish += part.estimated_runtime
+                result.append((part, finish))
+        start += stage.duration
+    return result
+
+
+def makespan_lower_bound(runs: List[Run], queue_count: int) -> float:
+    """Minutes no stage-barrier packing of ``runs`` can beat.
+
+    Runs sharing a machine sit in different stages, each at least as long
+    as the run, so the busiest machine's total is a bound; so is the total
+    runtime spread evenly over every queue. Each run counts with every
+    reuse discount it could get.
+    """
+    if not runs:
+        return 0.0
+    links = sequence_links(runs)
+    minutes = [
+        r.estimated_runtime
+        - reuse_discount(links.get(r.job_name, []), lambda _: True)
+        for r in runs
+    ]
+    per_machine: Dict[str, float] = {}
+    for run, own in zip(runs, minutes):
+        for machine in run.machines_used:
+            per_machine[machine] = per_machine.get(machine, 0.0) + own
+    spread = sum(minutes) / max(1, queue_count)
+    return max(max(per_machine.values(), default=0.0), spread)
+
+
+def create_schedule(
+    config: ScheduleConfig,
+    strict: bool = True,
+    rejections: Optional[List[Rejection]] = None,
+) -> Schedule:
+    """Create a schedule by greedy longest-job-first packing.
+
+    1. Expand all scenario x pod combinations into runs, coalescing short
+       ones when ``config.coalesce`` is set (see :func:`plan_runs`).
+    2. Sort by runtime descending (longest-job-first heuristic).
+    3. Greedily pack runs into stages, checking machine collisions.
+    4. With ``config.backfill``, chain short runs into stage idle time.
+    5. If any scenario has a ``priority``, reorder stages so prioritised
+       results land early (see :func:`order_stages_by_priority`).
+    6. With ``config.health``, run each pod's sentinel first (see
+       :func:`lead_sentinels`).
+    7. Place ``filler`` scenarios into the idle time that is left (see
+       :func:`fill_idle`).
+
+    Scenario ``after`` and ``reuses`` constraints hold throughout (see
+    :func:`sequence_links`).
+
+    Sort key includes the run name as a tie-breaker so the result is stable.
+    ``rejections`` collects why step 3 passed over stages (see
+    :func:`pack_runs`).
+    """
+    runs = plan_runs(config, strict=strict)
+    schedule = pack_runs(runs, len(config.queues), rejections)
+    if config.backfill:
+        schedule = backfill_schedule(schedule)
+    if any(run_priority(r) for r in runs):
+        schedule = order_stages_by_priority(schedule)
+    if config.health is not None:
+        schedule = lead_sentinels(schedule, set(config.health.sentinels))
+    fillers = expand_runs(config, strict=strict, filler=True)
+    if fillers:
+        schedule = fill_idle(schedule, fillers, len(config.queues))
+    return schedule
+
+
 def split_schedule(schedule: Schedule, target_count: int) -> List[Schedule]:
     """Split a schedule into multiple sub-schedules using bin-packing.
 
     Stages are packed longest-first into the lightest bin to balance total
     runtime, then each bin's stages are restored to their original ordering
-    so the generated YAML files preserve scenario sequence.
+    so the generated YAML files preserve scenario sequence. Stages linked by
+    :func:`sequence_links` go into the same bin as one unit, so a run never
+    lands in a different YAML from the runs it follows.
     """
     if target_count <= 1:
         return [schedule]
 
-    indexed: List[Tuple[int, Stage]] = list(enumerate(schedule.stages))
-    indexed.sort(key=lambda pair: -pair[1].duration)
+    # Union-find over stage indices; each root collects its group.
+    root = list(range(len(schedule.stages)))
+
+    def find(i: int) -> int:
+        while root[i] != i:
+            root[i] = root[root[i]]
+            i = root[i]
+        return i
+
+    for before, after in sorted(_stage_links(schedule.stages)):
+        root[find(after)] = find(before)
+    groups: Dict[int, List[Tuple[int, Stage]]] = {}
+    for pair in enumerate(schedule.stages):
+        groups.setdefault(find(pair[0]), []).append(pair)
+    units = sorted(
+        groups.values(),
+        key=lambda unit: -sum(stage.duration for _, stage in unit),
+    )
 
     bins: List[List[Tuple[int, Stage]]] = [[] for _ in range(target_count)]
     bin_durations = [0.0] * target_count
-    for original_index, stage in indexed:
+    for unit in units:
         target = min(range(target_count), key=lambda i: bin_durations[i])
-        bins[target].append((original_index, stage))
-        bin_durations[target] += stage.duration
+        bins[target].extend(unit)
+        bin_durations[target] += sum(stage.duration for _, stage in unit)
 
     result: List[Schedule] = []
     for entries in bins:
@@ -0,0 +1,377 @@
+"""
+Crank messages of a scenario template.
+
+Each scenario template (``build/*-scenarios.yml``) publishes one crank
+message per ``PublishToAzureServiceBus@2`` step, expanded over its
+``${{ each }}`` loops. The dispatcher (see ``dispatcher.py``) publishes the
+same jobs without going through AzDO, so it expands the templates the way
+AzDO does:
+
+- object and string parameters take their ``default``, unless the job
+  passes them (the generated YAML passes ``arguments``);
+- ``${{ each }}`` loops nest in template order;
+- ``${{ if }}`` blocks and ``enabled:`` expressions are evaluated with
+  ``and``, ``or``, ``not``, ``eq`` and ``ne``;
+- ``${{ x.y }}`` references in the message body are replaced with their
+  values.
+
+Only this subset of the template language is understood; anything else
+raises :class:`TemplateError` rather than sending crank a different job.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models import CoalescedRun, Run, ScheduleConfig
+
+
+class TemplateError(ValueError):
+    """Raised when a template uses something this module does not expand."""
+
+
+_PUBLISH_TASK = "PublishToAzureServiceBus@2"
+_EACH_RE = re.compile(r"^- \$\{\{\s*each\s+(\w+)\s+in\s+parameters\.(\w+)\s*\}\}:$")
+_IF_RE = re.compile(r"^- \$\{\{\s*if\s+(.*?)\s*\}\}:$")
+_REF_RE = re.compile(r"\$\{\{\s*([\w.]+)\s*\}\}")
+_TOKEN_RE = re.compile(r"\s*(?:('(?:[^']|'')*')|([\w.\-]+)|(.))")
+
+
+def job_arguments(profiles: List[str]) -> str:
+    """``arguments`` the generated YAML passes to a job's template."""
+    flags = " ".join(f"--profile {p}" for p in profiles)
+    return f"$(ciProfile) {flags} "
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _scalar(text: str) -> Any:
+    """Value of a YAML scalar as the templates write them."""
+    # Trailing comments, as in ``default: 'true' # see ...``.
+    text = re.sub(r"\s+#.*$", "", text.strip())
+    if text.startswith('"') and text.endswith('"') and len(text) > 1:
+        return json.loads(text)
+    if text.startswith("'") and text.endswith("'") and len(text) > 1:
+        return text[1:-1].replace("''", "'")
+    if text.startswith(("|", ">")):
+        raise TemplateError("Block scalars in parameters are not supported")
+    if text in ("true", "false"):
+        return text == "true"
+    return text
+
+
+def _split_key(text: str) -> Tuple[str, str]:
+    key, sep, value = text.partition(":")
+    if not sep:
+        raise TemplateError(f"Expected 'key: value', got {text!r}")
+    return key.strip(), value
+
+
+def _parse_default(lines: List[str]) -> Any:
+    """Value of a parameter's ``default:``, scalar or list of mappings."""
+    items: List[Dict[str, Any]] = []
+    item_indent: Optional[int] = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if "${{" in stripped:
+            raise TemplateError("Conditional parameter entries are not "
+                                "supported")
+        if stripped.startswith("- ") and (
+            item_indent is None or _indent(line) == item_indent
+        ):
+            item_indent = _indent(line)
+            items.append({})
+            stripped = stripped[2:]
+        if not items:
+            raise TemplateError(f"Unexpected parameter line {line!r}")
+        key, value = _split_key(stripped)
+        items[-1][key] = _scalar(value)
+    return items
+
+
+def _parameters(lines: List[str]) -> Dict[str, Any]:
+    """Defaults of the template's ``parameters:`` block, by name."""
+    params: Dict[str, Any] = {}
+    name: Optional[str] = None
+    body: List[str] = []
+
+    def close() -> None:
+        if name is None:
+            return
+        default = next(
+            (i for i, line in enumerate(body)
+             if line.strip().startswith("default:")), None
+        )
+        if default is None:
+            params[name] = None
+            return
+        inline = body[default].strip()[len("default:"):].strip()
+        params[name] = (
+            _scalar(inline) if inline else _parse_default(body[default + 1:])
+        )
+
+    # Some templates indent the whole parameters list.
+    depth: Optional[int] = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("- name:") and depth in (None, _indent(line)):
+            close()
+            depth = _indent(line)
+            name, body = stripped[len("- name:"):].strip(), []
+        elif name is not None:
+            body.append(line)
+    close()
+    return params
+
+
+@dataclass
+class _Frame:
+    indent: int
+    # ("each", variable, parameter) or ("if", expression)
+    kind: Tuple[str, ...]
+
+
+@dataclass
+class _Step:
+    frames: List[_Frame]
+    body: str
+    enabled: Optional[str] = None
+
+
+@dataclass
+class Template:
+    """Parameters and publish steps of one scenario template."""
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    steps: List[_Step] = field(default_factory=list)
+
+
+def _block(lines: List[str], start: int, indent: int) -> Tuple[List[str], int]:
+    """Lines after ``start`` indented deeper than ``indent``."""
+    end = start + 1
+    while end < len(lines) and (
+        not lines[end].strip() or _indent(lines[end]) > indent
+    ):
+        end += 1
+    return lines[start + 1:end], end
+
+
+def parse_template(text: str) -> Template:
+    """Parse a scenario template into its parameters and publish steps."""
+    lines = text.splitlines()
+    try:
+        steps_at = lines.index("steps:")
+    except ValueError:
+        raise TemplateError("Template has no top-level 'steps:'")
+    params_at = lines.index("parameters:") if "parameters:" in lines else 0
+    template = Template(parameters=_parameters(lines[params_at + 1:steps_at]))
+    stack: List[_Frame] = []
+    i = steps_at + 1
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            i += 1
+            continue
+        indent = _indent(line)
+        while stack and stack[-1].indent >= indent:
+            stack.pop()
+        each, cond = _EACH_RE.match(stripped), _IF_RE.match(stripped)
+        if each:
+            stack.append(_Frame(indent, ("each",) + each.groups()))
+        elif cond:
+            stack.append(_Frame(indent, ("if", cond.group(1))))
+        elif "${{" in stripped and stripped.startswith("- ${{"):
+            raise TemplateError(f"Unsupported template directive {stripped!r}")
+        elif stripped == f"- task: {_PUBLISH_TASK}":
+            task, end = _block(lines, i, indent)
+            step = _Step(frames=list(stack), body="")
+            for j, task_line in enumerate(task):
+                key = task_line.strip()
+                if key.startswith("enabled:"):
+                    step.enabled = key[len("enabled:"):].strip()
+                elif key == "messageBody: |":
+                    body, _ = _block(task, j, _indent(task_line))
+                    depth = min(_indent(b) for b in body if b.strip())
+                    step.body = "\n".join(b[depth:] for b in body)
+            if not step.body:
+                raise TemplateError("Publish step without a messageBody")
+            template.steps.append(step)
+            i = end
+            continue
+        i += 1
+    return template
+
+
+def _tokens(text: str) -> List[str]:
+    tokens = []
+    for quoted, word, other in _TOKEN_RE.findall(text):
+        token = quoted or word or other
+        if token and not token.isspace():
+            tokens.append(token)
+    return tokens
+
+
+def _truthy(value: Any) -> bool:
+    return bool(value) if value is not None else False
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    return str(value)
+
+
+def _lookup(name: str, scope: Dict[str, Any]) -> Any:
+    head, _, rest = name.partition(".")
+    if head not in scope:
+        raise TemplateError(f"Unknown reference {name!r}")
+    value = scope[head]
+    for key in filter(None, rest.split(".")):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def evaluate(expression: str, scope: Dict[str, Any]) -> Any:
+    """Evaluate a template expression (``and``/``or``/``not``/``eq``/``ne``).
+
+    ``scope`` maps ``parameters`` and each loop variable to its value.
+    """
+    tokens = _tokens(expression)
+    pos = 0
+
+    def parse() -> Any:
+        nonlocal pos
+        token = tokens[pos]
+        pos += 1
+        if token.startswith("'"):
+            return token[1:-1].replace("''", "'")
+        if token in ("true", "false"):
+            return token == "true"
+        if pos < len(tokens) and tokens[pos] == "(":
+            pos += 1
+            args = []
+            while tokens[pos] != ")":
+                args.append(parse())
+                if tokens[pos] == ",":
+                    pos += 1
+            pos += 1
+            return _call(token, args)
+        return _lookup(token, scope)
+
+    try:
+        value = parse()
+    except IndexError:
+        raise TemplateError(f"Malformed expression {expression!r}")
+    if pos != len(tokens):
+        raise TemplateError(f"Malformed expression {expression!r}")
+    return value
+
+
+def _call(name: str, args: List[Any]) -> Any:
+    if name == "and":
+        return all(_truthy(a) for a in args)
+    if name == "or":
+        return any(_truthy(a) for a in args)
+    if name == "not" and len(args) == 1:
+        return not _truthy(args[0])
+    if name in ("eq", "ne") and len(args) == 2:
+        same = _text(args[0]).lower() == _text(args[1]).lower()
+        return same if name == "eq" else not same
+    raise TemplateError(f"Unsupported expression function {name}()")
+
+
+def _value(text: str, scope: Dict[str, Any]) -> Any:
+    """Value of a step property: a scalar or a ``${{ }}`` expression."""
+    match = re.fullmatch(r"\$\{\{\s*(.*?)\s*\}\}", text)
+    return evaluate(match.group(1), scope) if match else _scalar(text)
+
+
+def _scopes(
+    frames: List[_Frame], scope: Dict[str, Any]
+) -> Iterator[Dict[str, Any]]:
+    if not frames:
+        yield scope
+        return
+    frame, rest = frames[0], frames[1:]
+    if frame.kind[0] == "if":
+        if _truthy(evaluate(frame.kind[1], scope)):
+            yield from _scopes(rest, scope)
+        return
+    _, variable, parameter = frame.kind
+    entries = scope["parameters"].get(parameter)
+    if not isinstance(entries, list):
+        raise TemplateError(f"Loop over non-list parameter {parameter!r}")
+    for entry in entries:
+        yield from _scopes(rest, {**scope, variable: entry})
+
+
+def expand(template: Template, parameters: Dict[str, Any]) -> List[Dict]:
+    """Message bodies ``template`` publishes, in order, given ``parameters``.
+
+    ``parameters`` override the template's defaults, as a job's
+    ``parameters:`` block does.
+    """
+    scope = {"parameters": {**template.parameters, **parameters}}
+    messages = []
+    for step in template.steps:
+        for inner in _scopes(step.frames, scope):
+            if step.enabled is not None and not _truthy(
+                _value(step.enabled, inner)
+            ):
+                continue
+            body = _REF_RE.sub(
+                lambda m: _text(_lookup(m.group(1), inner)), step.body
+            )
+            try:
+                messages.append(json.loads(body))
+            except json.JSONDecodeError as exc:
+                raise TemplateError(f"Message body is not JSON: {exc}")
+    return messages
+
+
+def load_template(path: str) -> Template:
+    """:func:`parse_template` of the file at ``path``."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError as exc:
+        raise TemplateError(f"Cannot read template {path}: {exc}")
+    try:
+        return parse_template(text)
+    except TemplateError as exc:
+        raise TemplateError(f"{path}: {exc}")
+
+
+def load_templates(
+    config: ScheduleConfig, directory: str
+) -> Dict[str, Template]:
+    """:func:`load_template` of each template of ``config``, by name."""
+    return {
+        name: load_template(os.path.join(directory, name))
+        for name in sorted({sc.template for sc in config.scenarios})
+    }
+
+
+def run_messages(
+    run: Run, templates: Dict[str, Template]
+) -> List[Dict]:
+    """Crank messages of ``run``'s job, as its templates would send them.
+
+    A coalesced job runs each part's template in turn.
+    """
+    parts = run.parts if isinstance(run, CoalescedRun) else [run]
+    messages = []
+    for part in parts:
+        template = templates[part.scenario.template]
+        messages.extend(expand(
+            template, {"arguments": job_arguments(list(part.profiles))}
+        ))
+    return messages
@@ -95,6 +95,24 @@ class TestLoadConfig(unittest.TestCase):
                 cfg.pipeline.service_bus_connection,
                 "ASPNET Benchmarks Service Bus",
             )
+            self.assertFalse(cfg.pipeline.join_jobs)
+            self.assertIsNone(cfg.pipeline.lease_connection)
+
+    def test_join_jobs_loaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["metadata"]["pipeline"] = {"join_jobs": True}
+            path = _write(tmp, payload)
+            self.assertTrue(load_config(path).pipeline.join_jobs)
+
+    def test_lease_connection_loaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["metadata"]["pipeline"] = {"lease_connection": "Leases"}
+            path = _write(tmp, payload)
+            self.assertEqual(
+                load_config(path).pipeline.lease_connection, "Leases"
+            )
 
     def test_optional_timeout_loaded(self):
         with tempfile.TemporaryDirectory() as tmp:
@@ -104,6 +122,153 @@ class TestLoadConfig(unittest.TestCase):
             cfg = load_config(path)
             self.assertEqual(cfg.scenarios[0].timeout, 199)
 
+    def test_coalescing_loaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["metadata"]["job_overhead_minutes"] = 3
+            payload["metadata"]["coalescing"] = {"max_run_minutes": 6}
+            path = _write(tmp, payload)
+            cfg = load_config(path)
+            self.assertEqual(cfg.job_overhead_minutes, 3.0)
+            self.assertEqual(cfg.coalesce.max_run_minutes, 6.0)
+            self.assertEqual(cfg.coalesce.max_job_minutes, 30.0)
+
+    def test_coalescing_off_by_default(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg = load_config(_write(tmp, _BASE))
+            self.assertIsNone(cfg.coalesce)
+            self.assertEqual(cfg.job_overhead_minutes, 0.0)
+
+    def test_negative_overhead_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["metadata"]["job_overhead_minutes"] = -1
+            path = _write(tmp, payload)
+            with self.assertRaises(ConfigError):
+                load_config(path)
+
+    def test_priority_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["priority"] = 2
+            self.assertEqual(
+                load_config(_write(tmp, payload)).scenarios[0].priority, 2
+            )
+            payload["scenarios"][0]["priority"] = -1
+            with self.assertRaises(ConfigError):
+                load_config(_write(tmp, payload))
+
+    def test_every_n_cycles_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["every_n_cycles"] = 0
+            with self.assertRaises(ConfigError):
+                load_config(_write(tmp, payload))
+
+    def test_fallback_pods_loaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["fallback_pods"] = ["p2"]
+            path = _write(tmp, payload)
+            cfg = load_config(path)
+            self.assertEqual(cfg.scenarios[0].fallback_pods, ["p2"])
+
+    def test_duplicate_fallback_pods_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["fallback_pods"] = ["p2", "p2"]
+            path = _write(tmp, payload)
+            with self.assertRaises(ConfigError):
+                load_config(path)
+
+    def test_sequencing_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"].append({
+                "name": "T", "template": "t.yml", "type": 1, "pods": ["p1"],
+                "estimated_runtime": 30, "after": ["S"], "reuses": {"S": 5},
+            })
+            cfg = load_config(_write(tmp, payload))
+            self.assertEqual(cfg.scenarios[1].after, ["S"])
+            self.assertEqual(cfg.scenarios[1].reuses, {"S": 5.0})
+
+            for after, reuses in [
+                (["Missing"], {}),
+                (["T"], {}),
+                ([], {"S": 30}),
+                ([], {"S": 0}),
+            ]:
+                payload["scenarios"][1]["after"] = after
+                payload["scenarios"][1]["reuses"] = reuses
+                with self.assertRaises(ConfigError, msg=(after, reuses)):
+                    load_config(_write(tmp, payload))
+
+    def test_sequencing_cycle_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["after"] = ["T"]
+            payload["scenarios"].append({
+                "name": "T", "template": "t.yml", "type": 1, "pods": ["p1"],
+                "after": ["S"],
+            })
+            with self.assertRaises(ConfigError) as ctx:
+                load_config(_write(tmp, payload))
+            self.assertIn("cycle", str(ctx.exception))
+
+    def test_runtime_stddev_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["runtime_stddev"] = 4
+            cfg = load_config(_write(tmp, payload))
+            self.assertEqual(cfg.scenarios[0].runtime_stddev, 4.0)
+            payload["scenarios"][0]["runtime_stddev"] = -1
+            with self.assertRaises(ConfigError):
+                load_config(_write(tmp, payload))
+
+    def test_deadlines_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            self.assertIsNone(load_config(_write(tmp, payload)).deadlines)
+            payload["metadata"]["deadlines"] = {"quantile": 0.9}
+            deadlines = load_config(_write(tmp, payload)).deadlines
+            self.assertEqual(
+                (deadlines.quantile, deadlines.slack, deadlines.min_minutes),
+                (0.9, 0.25, 15),
+            )
+            for bad in [{"quantile": 1}, {"slack": -0.1},
+                        {"min_minutes": 0}]:
+                payload["metadata"]["deadlines"] = bad
+                with self.assertRaises(ConfigError, msg=bad):
+                    load_config(_write(tmp, payload))
+
+    def test_pod_health_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            self.assertIsNone(load_config(_write(tmp, payload)).health)
+            payload["metadata"]["pod_health"] = {"sentinels": ["S"]}
+            health = load_config(_write(tmp, payload)).health
+            self.assertEqual(health.sentinels, ["S"])
+            for bad in [{}, {"sentinels": ["Nope"]}]:
+                payload["metadata"]["pod_health"] = bad
+                with self.assertRaises(ConfigError, msg=bad):
+                    load_config(_write(tmp, payload))
+
+    def test_filler_cannot_be_sequenced(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = json.loads(json.dumps(_BASE))
+            payload["scenarios"][0]["filler"] = True
+            cfg = load_config(_write(tmp, payload))
+            self.assertTrue(cfg.scenarios[0].filler)
+            other = dict(payload["scenarios"][0], name="T", filler=False,
+                         after=["S"])
+            payload["scenarios"].append(other)
+            with self.assertRaises(ConfigError):
+                load_config(_write(tmp, payload))
+            payload["scenarios"][1] = dict(other, after=[])
+            payload["scenarios"][0]["every_n_cycles"] = 2
+            with self.assertRaises(ConfigError):
+                load_config(_write(tmp, payload))
+
     def test_negative_timeout_rejected(self):
         with tempfile.TemporaryDirectory() as tmp:
             payload = json.loads(json.dumps(_BASE))
@@ -0,0 +1,165 @@
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from deadlines import (
+    hang_report,
+    job_deadlines,
+    template_budget,
+    template_budgets,
+)
+from generator import _render_yaml, schedule_to_template_data
+from models import ChainedRun, DeadlineSettings, ScenarioType, Schedule, Stage
+from risk import Sampler
+from scheduler import create_schedule, expand_runs
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg():
+    # A and B share nothing; C and D are chained on p3.
+    return _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+        scenarios=[
+            _scn("A", ScenarioType.SINGLE, ["p1"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p2"], runtime=5),
+            _scn("C", ScenarioType.SINGLE, ["p3"], runtime=20),
+            _scn("D", ScenarioType.SINGLE, ["p3"], runtime=20),
+        ],
+        queues=("q1", "q2", "q3"),
+    )
+
+
+def _schedule(cfg):
+    runs = {r.job_name: r for r in expand_runs(cfg)}
+    chain = ChainedRun(
+        scenario=runs["C_p3"].scenario, pod=runs["C_p3"].pod,
+        estimated_runtime=40, parts=[runs["C_p3"], runs["D_p3"]],
+    )
+    return Schedule(stages=[
+        Stage(runs=[runs["A_p1"], runs["B_p2"], chain]),
+    ])
+
+
+class TestJobDeadlines(unittest.TestCase):
+    def test_quantile_plus_slack_within_bounds(self):
+        cfg = _cfg()
+        cfg.scenarios[3].timeout = 22
+        timeouts = job_deadlines([_schedule(cfg)], DeadlineSettings())
+        self.assertEqual(timeouts, {
+            "A_p1": 75,
+            # Floored at min_minutes.
+            "B_p2": 15,
+            "C_p3": 25,
+            # Never above the scenario's own timeout.
+            "D_p3": 22,
+        })
+
+    def test_spread_raises_the_deadline(self):
+        cfg = _cfg()
+        cfg.scenarios[0].runtime_stddev = 20
+        timeouts = job_deadlines(
+            [_schedule(cfg)], DeadlineSettings(quantile=0.9),
+            Sampler(samples=500),
+        )
+        self.assertGreater(timeouts["A_p1"], 75)
+        self.assertLessEqual(timeouts["A_p1"], 120)
+
+
+_TEMPLATE = """\
+parameters:
+- name: connection
+  type: string
+  default: ''
+
+# Scenarios
+- name: scenarios
+  type: object
+  default:
+
+  - displayName: One
+    arguments: --scenario one
+
+  - displayName: Two
+    arguments: --scenario two
+    condition: 'true'
+
+steps:
+- ${{ each s in parameters.scenarios }}:
+  - task: PublishToAzureServiceBus@2
+    timeoutInMinutes: 10
+"""
+
+
+class TestTemplateBudgets(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_task_count_times_task_timeout(self):
+        self.assertEqual(template_budget(self._write("a.yml", _TEMPLATE)), 20)
+
+    def test_nested_loops_are_not_understood(self):
+        nested = _TEMPLATE.replace(
+            "  - task:", "  - ${{ each p in parameters.payloads }}:\n"
+            "    - task:",
+        )
+        self.assertIsNone(template_budget(self._write("b.yml", nested)))
+
+    def test_budget_caps_the_deadline(self):
+        cfg = _cfg()
+        cfg.scenarios[0].template = "a.yml"
+        cfg.scenarios[1].template = "missing.yml"
+        self._write("a.yml", _TEMPLATE)
+        budgets = template_budgets(cfg, self.dir.name)
+        self.assertEqual(budgets, {"a.yml": 20})
+        timeouts = job_deadlines(
+            [_schedule(cfg)], DeadlineSettings(), budgets=budgets
+        )
+        self.assertEqual(timeouts["A_p1"], 20)
+        self.assertEqual(timeouts["B_p2"], 15)
+
+
+class TestGroupDeadline(unittest.TestCase):
+    def test_hang_holds_the_lane(self):
+        cfg = _cfg()
+        data = schedule_to_template_data(_schedule(cfg), cfg)
+        # Default timeouts are 120 min; C hanging still lets D run after.
+        self.assertEqual(data["groups"][0]["deadline"], 140)
+
+    def test_timeouts_are_emitted(self):
+        cfg = _cfg()
+        timeouts = job_deadlines([_schedule(cfg)], DeadlineSettings())
+        data = schedule_to_template_data(
+            _schedule(cfg), cfg, timeouts=timeouts
+        )
+        self.assertEqual(data["groups"][0]["deadline"], 75)
+        text = _render_yaml(data, cfg.pipeline)
+        job = text[text.index("- job: A_p1"):]
+        self.assertIn("timeoutInMinutes: 75", job)
+
+
+class TestHangReport(unittest.TestCase):
+    def test_worst_case_under_one_hang(self):
+        cfg = _cfg()
+        cfg.schedule = "0 3 * * *"
+        sched = create_schedule(cfg)
+        timeouts = job_deadlines([sched], DeadlineSettings())
+        [case] = hang_report(cfg, [sched], timeouts, "t")
+        self.assertEqual(case.label, "t YAML 1")
+        self.assertEqual(case.expected, sched.total_duration)
+        self.assertEqual(case.window, 1440)
+        self.assertLess(case.worst, case.default_worst)
+        self.assertGreater(case.worst, case.expected)
+        self.assertGreater(case.group, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
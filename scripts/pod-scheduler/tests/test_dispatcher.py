@@ -0,0 +1,254 @@
+import asyncio
+import os
+import re
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from config_loader import load_config
+from dispatcher import (
+    Broker,
+    Dispatcher,
+    LocalBroker,
+    dispatch_order,
+    noisy_durations,
+    simulate,
+    static_makespan,
+)
+from models import HealthSettings, ScenarioType
+from scheduler import SchedulerError, expand_runs
+from templates import load_template, parse_template, run_messages
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_BUILD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build"
+)
+
+# One message per job, so a run's duration is its message's.
+_TEMPLATE = parse_template("""\
+parameters:
+- name: arguments
+  type: string
+  default: ''
+- name: scenarios
+  type: object
+  default:
+  - displayName: Only
+    arguments: --scenario only
+
+steps:
+- ${{ each s in parameters.scenarios }}:
+  - task: PublishToAzureServiceBus@2
+    inputs:
+      messageBody: |
+        {
+          "name": "crank",
+          "args": [ "${{ s.arguments }} ${{ parameters.arguments }}" ]
+        }
+""")
+
+
+def _templates(cfg):
+    return {sc.template: _TEMPLATE for sc in cfg.scenarios}
+
+
+def _simulate(cfg, durations, **kwargs):
+    return asyncio.run(simulate(cfg, durations, _templates(cfg), **kwargs))
+
+
+def _cfg():
+    # A_p1 and C_p2 share the load machine "l".
+    return _config(
+        pods=[
+            _pod("p1", "m1", load="l"),
+            _pod("p2", "m2", load="l"),
+            _pod("p3", "m3"),
+        ],
+        scenarios=[
+            _scn("A", ScenarioType.DUAL, ["p1"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p3"], runtime=40),
+            _scn("C", ScenarioType.DUAL, ["p2"], runtime=30),
+        ],
+    )
+
+
+class TestCrankMessages(unittest.TestCase):
+    def test_match_the_rendered_template_step(self):
+        cfg = load_config(os.path.join(_BUILD, "benchmarks_ci_pods.json"))
+        templates = {"trend-scenarios.yml": load_template(
+            os.path.join(_BUILD, "trend-scenarios.yml")
+        )}
+        run = next(r for r in expand_runs(cfg)
+                   if r.job_name == "Trends_gold_win")
+        with open(os.path.join(_BUILD, "benchmarks-ci-01.yml"),
+                  encoding="utf-8") as f:
+            text = f.read()
+        job = text[text.index("- job: Trends_gold_win"):]
+        [arguments] = re.findall(r'arguments: "(.*)"', job[:job.index("\n\n")])
+        messages = run_messages(run, templates)
+        # One message per scenario entry of the template.
+        self.assertEqual(len(messages), 47)
+        # The template's first step, rendered with its first entry and the
+        # arguments the generated job passes.
+        self.assertEqual(messages[0], {
+            "name": "crank",
+            "condition": "(true)",
+            "retries": 1,
+            "args": [
+                "--scenario plaintext $(platformJobs) --load.connections 1024"
+                " --property scenario=PlaintextPlatform --property "
+                "protocol=http $(azureProfile) --config https://raw."
+                "githubusercontent.com/aspnet/Benchmarks/main/scenarios/"
+                "steadystate.profile.yml --application.framework net11.0 "
+                "--application.collectDependencies true " + arguments +
+                " --application.options.collectCounters true --no-metadata "
+                "--no-measurements --load.options.reuseBuild true --session "
+                "$(session) --description \"Plaintext Platform "
+                "$(System.JobDisplayName)\" --property buildId=\"$(buildId)\""
+                " --property buildNumber=\"$(buildNumber)\" "
+                "--command-line-property --table TrendBenchmarks --sql "
+                "SQL_CONNECTION_STRING --cert-tenant-id SQL_SERVER_TENANTID "
+                "--cert-client-id SQL_SERVER_CLIENTID --cert-path "
+                "SQL_SERVER_CERT_PATH --cert-sni --chart"
+            ],
+        })
+        self.assertEqual(
+            arguments, "$(ciProfile) --profile gold-win-app "
+                       "--profile gold-load2-load "
+        )
+
+    def test_messages_are_sent_in_turn(self):
+        cfg = _config(pods=[_pod("p1", "m1")], scenarios=[
+            _scn("A", ScenarioType.SINGLE, ["p1"], runtime=60),
+        ])
+        two = parse_template(
+            "parameters:\n- name: scenarios\n  default:\n"
+            "  - arguments: one\n  - arguments: two\n\nsteps:\n"
+            "- ${{ each s in parameters.scenarios }}:\n"
+            "  - task: PublishToAzureServiceBus@2\n    inputs:\n"
+            "      messageBody: |\n        {\"args\": [\"${{ s.arguments }}\"]}\n"
+        )
+
+        async def go():
+            broker = LocalBroker(cfg.queues)
+            runs = expand_runs(cfg)
+            messages = {r.job_name: run_messages(r, {"A.yml": two})
+                        for r in runs}
+            dispatcher = Dispatcher(runs, cfg.queues, broker, messages)
+            task = asyncio.ensure_future(dispatcher.run())
+            for _ in range(2):
+                message_id, _ = await broker.receive(cfg.queues[0])
+                await broker.complete_after(message_id, 30)
+            report = await task
+            return broker.log, report
+
+        log, report = asyncio.run(go())
+        self.assertEqual([(m, b["args"]) for _, m, b in log],
+                         [("A_p1#1", ["one"]), ("A_p1#2", ["two"])])
+        self.assertEqual(report.makespan, 60)
+
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Broker()
+
+
+class TestSimulate(unittest.TestCase):
+    def test_estimates_match_static_plan(self):
+        cfg = _cfg()
+        report = _simulate(cfg, {})
+        self.assertEqual(report.makespan, 90)
+        self.assertEqual(static_makespan(cfg, {}), 90)
+
+    def test_early_finish_frees_machines_before_the_barrier(self):
+        cfg = _cfg()
+        durations = {"A_p1": 20}
+        report = _simulate(cfg, durations)
+        starts = {d.run.job_name: d.start for d in report.dispatches}
+        # C_p2 waits only for A_p1's load machine, not for B_p3's stage.
+        self.assertEqual(starts, {"A_p1": 0, "B_p3": 0, "C_p2": 20})
+        self.assertEqual(report.makespan, 50)
+        self.assertEqual(static_makespan(cfg, durations), 70)
+
+    def test_leases_and_queues_never_overlap(self):
+        cfg = _cfg()
+        report = _simulate(cfg, noisy_durations(cfg, 0.5, seed=3))
+        for a in report.dispatches:
+            for b in report.dispatches:
+                if a is b or not (a.start < b.end and b.start < a.end):
+                    continue
+                self.assertFalse(a.run.machines_used & b.run.machines_used)
+                self.assertNotEqual(a.queue, b.queue)
+
+    def test_failures_are_reported(self):
+        report = _simulate(_cfg(), {}, failures={"B_p3"})
+        status = {d.run.job_name: d.status for d in report.dispatches}
+        self.assertEqual(status["B_p3"], "failed")
+        self.assertEqual(status["A_p1"], "succeeded")
+
+    def test_failed_sentinel_prunes_its_pod(self):
+        cfg = _cfg()
+        sentinel = _scn("S", ScenarioType.SINGLE, ["p3"], runtime=10)
+        sentinel.priority = 1
+        cfg.scenarios.append(sentinel)
+        cfg.scenarios[1].estimated_runtime = 100
+        cfg.health = HealthSettings(sentinels=["S"])
+        healthy = _simulate(cfg, {})
+        report = _simulate(cfg, {}, failures={"S_p3"})
+        status = {d.run.job_name: d.status for d in report.dispatches}
+        self.assertEqual(status["B_p3"], "skipped")
+        self.assertEqual(status["C_p2"], "succeeded")
+        self.assertEqual((healthy.makespan, report.makespan), (110, 90))
+
+    def test_sentinels_are_dispatched_first(self):
+        cfg = _cfg()
+        cfg.scenarios.append(
+            _scn("S", ScenarioType.SINGLE, ["p3"], runtime=10)
+        )
+        cfg.health = HealthSettings(sentinels=["S"])
+        runs = expand_runs(cfg)
+        self.assertEqual(dispatch_order(runs, {"S"})[0].job_name, "S_p3")
+        self.assertNotEqual(dispatch_order(runs)[0].job_name, "S_p3")
+        report = _simulate(cfg, {}, failures={"S_p3"})
+        status = {d.run.job_name: d.status for d in report.dispatches}
+        self.assertEqual(status["B_p3"], "skipped")
+
+    def test_publishes_to_free_queue(self):
+        async def go():
+            broker = LocalBroker(["q1", "q2"])
+            cfg = _cfg()
+            runs = expand_runs(cfg)
+            messages = {r.job_name: run_messages(r, _templates(cfg))
+                        for r in runs}
+            task = asyncio.ensure_future(
+                Dispatcher(runs, ["q1", "q2"], broker, messages).run()
+            )
+            await asyncio.sleep(0)
+            task.cancel()
+            return broker.log
+
+        log = asyncio.run(go())
+        self.assertEqual([(q, m) for q, m, _ in log],
+                         [("q1", "A_p1#1"), ("q2", "B_p3#1")])
+
+    def test_after_waits_for_predecessor(self):
+        # Y is longer, so it would be dispatched first without "after".
+        y = _scn("Y", ScenarioType.SINGLE, ["p1"], runtime=50)
+        y.after = ["X"]
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[_scn("X", ScenarioType.SINGLE, ["p1"], runtime=20), y],
+        )
+        report = _simulate(cfg, {})
+        starts = {d.run.job_name: d.start for d in report.dispatches}
+        self.assertEqual(starts, {"X_p1": 0, "Y_p1": 20})
+
+
+class TestErrors(unittest.TestCase):
+    def test_zero_queues(self):
+        with self.assertRaises(SchedulerError):
+            Dispatcher([], [], LocalBroker([]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from explain import (
+    QUEUE_RESOURCE,
+    add_queue,
+    bottlenecks,
+    duplicate_machine,
+    rejections_for,
+)
+from models import ScenarioType
+from scheduler import create_schedule
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg(queues=("q1", "q2")):
+    # p1 and p2 share the load machine "l".
+    return _config(
+        pods=[
+            _pod("p1", "m1", load="l"),
+            _pod("p2", "m2", load="l"),
+            _pod("p3", "m3"),
+        ],
+        scenarios=[
+            _scn("A", ScenarioType.DUAL, ["p1", "p2"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p3"], runtime=40),
+        ],
+        queues=queues,
+    )
+
+
+class TestRelaxations(unittest.TestCase):
+    def test_duplicate_machine_gives_each_pod_a_copy(self):
+        cfg = duplicate_machine(_cfg(), "l")
+        self.assertEqual(cfg.pods["p1"].load, "l@p1")
+        self.assertEqual(cfg.pods["p2"].load, "l@p2")
+        self.assertEqual(cfg.pods["p3"].sut, "m3")
+        # The original config is untouched.
+        self.assertEqual(_cfg().pods["p1"].load, "l")
+
+    def test_add_queue(self):
+        self.assertEqual(add_queue(_cfg()).queues, ["q1", "q2", "extra3"])
+
+
+class TestBottlenecks(unittest.TestCase):
+    def test_shared_machine_ranked_by_gain(self):
+        cfg = _cfg()
+        rejections = []
+        create_schedule(cfg, rejections=rejections)
+        ranked = bottlenecks(cfg, rejections)
+        self.assertEqual(ranked[0].resource, "l")
+        self.assertEqual(ranked[0].kind, "machine")
+        # A p1 + B, then A p2 alone (120) -> A p1 + A p2, then B (100).
+        self.assertEqual(ranked[0].gain, 20)
+        self.assertEqual(ranked[0].runs, ["A p2"])
+
+    def test_queue_cap(self):
+        cfg = _cfg(queues=("q1",))
+        cfg.pods["p2"].load = "l2"
+        rejections = []
+        create_schedule(cfg, rejections=rejections)
+        ranked = bottlenecks(cfg, rejections)
+        self.assertEqual(
+            [(b.resource, b.kind) for b in ranked],
+            [(QUEUE_RESOURCE, "queue")],
+        )
+        # One stage per run (160) -> A p1 + A p2, then B (100).
+        self.assertEqual(ranked[0].gain, 60)
+
+    def test_rejections_for_matches_name_or_job_id(self):
+        rejections = []
+        create_schedule(_cfg(), rejections=rejections)
+        self.assertEqual(len(rejections_for(rejections, "A p2")), 1)
+        self.assertEqual(len(rejections_for(rejections, "A_p2")), 1)
+        self.assertEqual(rejections_for(rejections, "B p3"), [])
+
+    def test_linked_runs_are_held_behind_their_prerequisites(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Build", ScenarioType.SINGLE, ["p1"], runtime=20),
+                _scn("Other", ScenarioType.SINGLE, ["p2"], runtime=60),
+                _scn("Late", ScenarioType.SINGLE, ["p2"], runtime=30),
+                _scn("Use", ScenarioType.SINGLE, ["p1"], runtime=10),
+            ],
+        )
+        cfg.scenarios[3].after = ["Build"]
+        rejections = []
+        create_schedule(cfg, rejections=rejections)
+        mine = rejections_for(rejections, "Use p1")
+        # Build is in stage 0, so Use goes to stage 1.
+        self.assertEqual(
+            [(r.stage, r.machines, r.held_behind) for r in mine],
+            [(0, set(), ["Build_p1"])],
+        )
+        # Being held behind a run blocks no resource.
+        self.assertNotIn(
+            "m1", [b.resource for b in bottlenecks(cfg, rejections)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+import freshness
+from config_loader import load_config
+from freshness import (
+    cron_fire_minutes,
+    freshness_split,
+    max_gaps,
+    pipelines_for,
+)
+from models import HealthSettings, ScenarioType, Schedule
+from multirate import phase_configs
+from scheduler import (
+    _parts,
+    _stage_weight,
+    create_schedule,
+    sequence_links,
+    split_schedule,
+)
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build",
+    "benchmarks_ci_pods.json",
+)
+
+
+def _worst_excess(pipelines):
+    return max(w - i for w, i in max_gaps(pipelines).values())
+
+
+class TestCronFireMinutes(unittest.TestCase):
+    def test_expands_step(self):
+        self.assertEqual(cron_fire_minutes("30 3/12 * * *"), [210, 930])
+
+    def test_single_hour(self):
+        self.assertEqual(cron_fire_minutes("0 9 * * *"), [540])
+
+
+class TestMaxGaps(unittest.TestCase):
+    def test_single_yaml_is_evenly_spaced(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=30),
+                _scn("B", ScenarioType.SINGLE, ["p1"], runtime=60),
+            ],
+        )
+        gaps = max_gaps([("0 3/12 * * *", create_schedule(cfg))])
+        self.assertEqual(gaps[("A", "p1")], (720, 720))
+
+    def test_uneven_phases_are_detected(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[_scn("A", ScenarioType.SINGLE, ["p1"], runtime=30)],
+        )
+        slow = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("X", ScenarioType.SINGLE, ["p1"], runtime=120),
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=30),
+            ],
+        )
+        gaps = max_gaps([
+            ("0 3 * * *", create_schedule(cfg)),
+            ("0 15 * * *", create_schedule(slow)),
+        ])
+        self.assertEqual(gaps[("A", "p1")], (840, 720))
+
+
+class TestFreshnessSplit(unittest.TestCase):
+    def _phases(self):
+        cfg = _config(
+            pods=[_pod(f"p{i}", f"m{i}") for i in range(4)],
+            scenarios=[
+                _scn("Base", ScenarioType.SINGLE,
+                     ["p0", "p1", "p2", "p3"], runtime=20),
+                _scn("Mid", ScenarioType.SINGLE, ["p0", "p1"], runtime=40),
+                _scn("HeavyA", ScenarioType.SINGLE, ["p2"], runtime=90),
+                _scn("HeavyB", ScenarioType.SINGLE, ["p3"], runtime=90),
+            ],
+            queues=("q1",),
+        )
+        cfg.scenarios[2].every_n_cycles = 2
+        cfg.scenarios[3].every_n_cycles = 2
+        phases = phase_configs(cfg)
+        return phases, [create_schedule(p) for p in phases]
+
+    def _pipelines(self, phases, splits):
+        return [
+            pipeline
+            for phase, schedules in zip(phases, splits)
+            for pipeline in pipelines_for(phase.schedule, schedules, 6)
+        ]
+
+    def test_not_worse_than_balanced_split(self):
+        self._check_not_worse()
+
+    def test_greedy_slot_order_above_the_cap(self):
+        # Swapping slots instead of trying every order is still no worse.
+        with mock.patch.object(freshness, "EXHAUSTIVE_MAX_YAMLS", 1):
+            self._check_not_worse()
+
+    def _check_not_worse(self):
+        phases, schedules = self._phases()
+        naive = [split_schedule(s, 2) for s in schedules]
+        fresh = freshness_split(
+            schedules, [p.schedule for p in phases], 2, 6
+        )
+        self.assertLessEqual(
+            _worst_excess(self._pipelines(phases, fresh)),
+            _worst_excess(self._pipelines(phases, naive)),
+        )
+        for before, after in zip(naive, fresh):
+            self.assertLessEqual(
+                max(s.total_duration for s in after),
+                max(s.total_duration for s in before),
+            )
+            self.assertEqual(
+                sum(s.total_runs for s in after),
+                sum(s.total_runs for s in before),
+            )
+
+    def _shipped(self):
+        with open(_CONFIG, encoding="utf-8") as f:
+            payload = json.load(f)
+        for scenario in payload["scenarios"]:
+            if scenario["name"] in ("Blazor", "Build", "Containers",
+                                    "Frameworks", "Single File"):
+                scenario["every_n_cycles"] = 2
+            if scenario["name"] in ("HttpClient", "NativeAOT", "PGO",
+                                    "Trends"):
+                scenario["after"] = ["Build"]
+            if scenario["name"] == "MVC":
+                scenario["priority"] = 5
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cfg.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            config = load_config(path)
+        config.health = HealthSettings(sentinels=["Build"])
+        phases = phase_configs(config)
+        return phases, [create_schedule(p) for p in phases]
+
+    def test_links_and_priorities_hold_in_every_phase(self):
+        phases, schedules = self._shipped()
+        fresh = freshness_split(
+            schedules, [p.schedule for p in phases], 2, 6,
+            sentinels={"Build"},
+        )
+        links = 0
+        for sched, split in zip(schedules, fresh):
+            where = {
+                part.job_name: (f, s)
+                for f, out in enumerate(split)
+                for s, stage in enumerate(out.stages)
+                for run in stage.runs for part in _parts(run)
+            }
+            runs = [run for stage in sched.stages for run in stage.runs]
+            for job_id, found in sequence_links(runs).items():
+                for link in found:
+                    before = where[link.before.job_name]
+                    self.assertEqual(before[0], where[job_id][0], job_id)
+                    self.assertLess(before[1], where[job_id][1], job_id)
+                    links += 1
+            # Stages holding MVC or leading with Build keep ahead of the
+            # stages packed after them.
+            index = {id(st): i for i, st in enumerate(sched.stages)}
+            for out in split:
+                order = [index[id(st)] for st in out.stages]
+                for pos, i in enumerate(order):
+                    stage = sched.stages[i]
+                    if _stage_weight(stage) or any(
+                        _parts(lane)[0].scenario.name == "Build"
+                        for lane in stage.runs
+                    ):
+                        self.assertTrue(all(j < i for j in order[:pos]))
+        self.assertGreater(links, 0)
+
+    def test_single_phase_single_yaml_is_unchanged(self):
+        phases, schedules = self._phases()
+        result = freshness_split(schedules[:1], [phases[0].schedule], 1, 6)
+        self.assertEqual(len(result), 1)
+        self.assertIsInstance(result[0][0], Schedule)
+        self.assertEqual(
+            [id(st) for st in result[0][0].stages],
+            [id(st) for st in schedules[0].stages],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,38 @@
+import io
+import json
 import os
+import tempfile
 import unittest
+from dataclasses import replace
 
 import tests  # noqa: F401  # ensures sys.path is set up
 
-from generator import GeneratorError, _job_timeout, _offset_cron
+from generator import (
+    IR_SCHEMA_VERSION,
+    JOIN_JOB_PREFIX,
+    GeneratorError,
+    LockFileRenderer,
+    Renderer,
+    _job_timeout,
+    _offset_cron,
+    _render_yaml,
+    generate_yamls,
+    load_lock_file,
+    schedule_to_template_data,
+)
 from main import _format_source_path
-from models import Pod, Run, Scenario, ScenarioType
+from models import (
+    ChainedRun,
+    CoalescedRun,
+    PipelineSettings,
+    Pod,
+    Run,
+    Scenario,
+    ScenarioType,
+    Schedule,
+    Stage,
+)
+from tests.test_scheduler import _config
 
 
 class TestOffsetCron(unittest.TestCase):
@@ -57,6 +84,232 @@ class TestJobTimeout(unittest.TestCase):
     def test_mid_runtime_doubles(self):
         self.assertEqual(_job_timeout(self._run(90)), 180)
 
+    def test_coalesced_job_sums_parts_capped(self):
+        parts = [self._run(5, timeout=30), self._run(5, timeout=40)]
+        job = CoalescedRun(
+            scenario=parts[0].scenario, pod=parts[0].pod,
+            estimated_runtime=10, parts=parts,
+        )
+        self.assertEqual(_job_timeout(job), 70)
+        job = replace(job, parts=[self._run(90), self._run(90)])
+        self.assertEqual(_job_timeout(job), 240)
+
+
+class TestRenderYaml(unittest.TestCase):
+    def _data(self, schedule):
+        return {"schedule": schedule, "queues": ["q"], "groups": []}
+
+    def test_cron_block_rendered(self):
+        text = _render_yaml(self._data("0 3 * * *"), PipelineSettings())
+        self.assertIn('- cron: "0 3 * * *"', text)
+
+    def test_unscheduled_pipeline_has_no_cron(self):
+        text = _render_yaml(self._data(None), PipelineSettings())
+        self.assertNotIn("schedules:", text)
+        self.assertIn("trigger: none", text)
+
+
+class TestChainedJobs(unittest.TestCase):
+    def _run(self, name, sut):
+        scenario = Scenario(
+            name=name, template=f"{name}.yml", type=ScenarioType.SINGLE,
+            pods=[sut], estimated_runtime=10,
+        )
+        pod = Pod(name=sut, sut=sut, sut_profile=f"{sut}-app")
+        return Run(scenario=scenario, pod=pod, estimated_runtime=10)
+
+    def test_chain_shares_lane_and_depends_on_predecessor(self):
+        a, b = self._run("A", "m1"), self._run("B", "m1")
+        chain = ChainedRun(
+            scenario=a.scenario, pod=a.pod, estimated_runtime=20,
+            parts=[a, b],
+        )
+        first = self._run("First", "m2")
+        sched = Schedule(stages=[
+            Stage(runs=[first]),
+            Stage(runs=[self._run("C", "m3"), chain]),
+        ])
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        text = _render_yaml(
+            schedule_to_template_data(sched, cfg), PipelineSettings()
+        )
+        job_b = text[text.index("- job: B_m1"):]
+        self.assertIn("dependsOn: [A_m1]", job_b)
+        self.assertIn("serviceBusQueueName: q2", job_b)
+        job_a = text[text.index("- job: A_m1"):text.index("- job: B_m1")]
+        self.assertIn("dependsOn: [First_m2]", job_a)
+        self.assertIn("serviceBusQueueName: q2", job_a)
+
+
+class TestJoinJobs(unittest.TestCase):
+    _run = TestChainedJobs._run
+
+    def _render(self, widths, join=True, chain=False):
+        stages = []
+        for g, width in enumerate(widths):
+            runs = [self._run(f"G{g}", f"m{i}") for i in range(width)]
+            if chain:
+                tail = self._run(f"T{g}", "m0")
+                runs[0] = ChainedRun(
+                    scenario=runs[0].scenario, pod=runs[0].pod,
+                    estimated_runtime=20, parts=[runs[0], tail],
+                )
+            stages.append(Stage(runs=runs))
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2", "q3"))
+        cfg.pipeline = PipelineSettings(join_jobs=join)
+        return _render_yaml(
+            schedule_to_template_data(Schedule(stages=stages), cfg),
+            cfg.pipeline,
+        )
+
+    def test_wide_barrier_goes_through_join(self):
+        text = self._render([3, 3])
+        join = text[text.index(f"- job: {JOIN_JOB_PREFIX}1"):]
+        self.assertIn("dependsOn: [G0_m0, G0_m1, G0_m2]", join)
+        self.assertIn("pool: server", join)
+        self.assertIn("- task: Delay@1", join)
+        self.assertEqual(text.count(f"dependsOn: [{JOIN_JOB_PREFIX}1]"), 3)
+        # The join closes group 1, before the next group's marker.
+        self.assertLess(text.index(JOIN_JOB_PREFIX), text.index("# GROUP 2"))
+
+    def test_narrow_barrier_keeps_direct_edges(self):
+        text = self._render([2, 2])
+        self.assertNotIn(JOIN_JOB_PREFIX, text)
+        self.assertEqual(text.count("dependsOn: [G0_m0, G0_m1]"), 2)
+
+    def test_chain_predecessors_are_not_depended_on(self):
+        text = self._render([3, 3], chain=True)
+        join = text[text.index(f"- job: {JOIN_JOB_PREFIX}1"):]
+        self.assertIn("dependsOn: [T0_m0, G0_m1, G0_m2]", join)
+
+    def test_edges_stay_linear(self):
+        text = self._render([3] * 10)
+        edges = sum(
+            len(line.split(",")) for line in text.splitlines()
+            if line.startswith("  dependsOn: [") and line != "  dependsOn: []"
+        )
+        self.assertEqual(edges, 9 * (3 + 3))
+
+    def test_off_by_default(self):
+        text = self._render([3, 3], join=False)
+        self.assertNotIn(JOIN_JOB_PREFIX, text)
+        self.assertEqual(text.count("dependsOn: [G0_m0, G0_m1, G0_m2]"), 3)
+
+
+class TestLeaseSteps(unittest.TestCase):
+    _run = TestChainedJobs._run
+
+    def _render(self, connection):
+        sched = Schedule(stages=[Stage(runs=[self._run("A", "m1")])])
+        cfg = _config(pods=[], scenarios=[], queues=("q1",))
+        return _render_yaml(
+            schedule_to_template_data(sched, cfg),
+            PipelineSettings(lease_connection=connection),
+        )
+
+    def test_off_by_default(self):
+        self.assertNotIn("InvokeRESTAPI", self._render(None))
+
+    def test_job_is_wrapped(self):
+        text = self._render("Leases")
+        acquire = text.index("displayName: Acquire machine leases")
+        template = text.index("- template: A.yml")
+        release = text.index("displayName: Release machine leases")
+        self.assertLess(acquire, template)
+        self.assertLess(template, release)
+        self.assertIn("serviceConnection: Leases", text)
+        self.assertIn(
+            'body: \'{"holder": "$(Build.BuildId)-A_m1", "machines": ["m1"], '
+            '"ttl": 120}\'', text,
+        )
+        self.assertIn("waitForCompletion: 'true'", text[acquire:template])
+        self.assertIn('"TaskInstanceId": "$(System.TaskInstanceId)"',
+                      text[acquire:template])
+        self.assertIn("condition: always()", text[release:])
+
+
+class TestScheduleIR(unittest.TestCase):
+    _run = TestChainedJobs._run
+
+    def _schedule(self):
+        a, b = self._run("A", "m1"), self._run("B", "m1")
+        chain = ChainedRun(
+            scenario=a.scenario, pod=a.pod, estimated_runtime=20,
+            parts=[a, b],
+        )
+        return Schedule(stages=[
+            Stage(runs=[self._run("First", "m2")]),
+            Stage(runs=[self._run("C", "m3"), chain]),
+        ])
+
+    def test_offsets_and_dependencies(self):
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        data = schedule_to_template_data(self._schedule(), cfg)
+        self.assertEqual(data["schema_version"], IR_SCHEMA_VERSION)
+        self.assertEqual(data["makespan"], 30)
+        jobs = {
+            job["job_id"]: job
+            for group in data["groups"] for job in group["jobs"]
+        }
+        self.assertEqual(
+            (jobs["A_m1"]["start"], jobs["B_m1"]["start"], jobs["B_m1"]["end"]),
+            (10, 20, 30),
+        )
+        self.assertEqual(jobs["A_m1"]["depends_on"], ["First_m2"])
+        self.assertEqual(jobs["B_m1"]["depends_on"], ["A_m1"])
+        self.assertEqual(jobs["B_m1"]["queue"], "q2")
+        self.assertEqual(jobs["C_m3"]["machines"], ["m3"])
+        json.dumps(data)
+
+    def test_filler_times_out_at_its_slot(self):
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        filler = self._run("F", "m3")
+        filler.scenario.filler = True
+        sched = self._schedule()
+        sched.stages[1].runs[0] = ChainedRun(
+            scenario=filler.scenario, pod=filler.pod, estimated_runtime=15,
+            parts=[self._run("C", "m3"), filler],
+        )
+        data = schedule_to_template_data(sched, cfg)
+        job = data["groups"][1]["jobs"][1]
+        self.assertEqual((job["job_id"], job["timeout"]), ("F_m3", 10))
+
+    def test_duplicate_job_ids_rejected(self):
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        sched = Schedule(stages=[
+            Stage(runs=[self._run("A", "m1")]),
+            Stage(runs=[self._run("A", "m1")]),
+        ])
+        with self.assertRaises(GeneratorError):
+            schedule_to_template_data(sched, cfg)
+
+    def test_lock_file_round_trips(self):
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        data = schedule_to_template_data(self._schedule(), cfg)
+        out = io.StringIO()
+        LockFileRenderer().write(data, out)
+        self.assertEqual(json.loads(out.getvalue()), data)
+
+    def test_generate_writes_every_renderer(self):
+        cfg = _config(pods=[], scenarios=[], queues=("q1", "q2"))
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_yamls(
+                [self._schedule()], cfg, tmp, base_name="t",
+                renderers=[LockFileRenderer()],
+            )
+            self.assertEqual(files, [os.path.join(tmp, "t.lock.json")])
+            data = load_lock_file(files[0])
+            self.assertEqual(len(data["groups"]), 2)
+
+            with open(files[0], "w", encoding="utf-8") as f:
+                json.dump({"schema_version": 99}, f)
+            with self.assertRaises(GeneratorError):
+                load_lock_file(files[0])
+
+    def test_renderer_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Renderer()
+
 
 class TestFormatSourcePath(unittest.TestCase):
     def test_paths_in_repo_become_repo_relative(self):
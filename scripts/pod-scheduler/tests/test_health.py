@@ -0,0 +1,207 @@
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+import main
+from generator import GeneratorError, _render_yaml, schedule_to_template_data
+from health import health_report, pod_gates
+from models import ChainedRun, HealthSettings, ScenarioType, Schedule, Stage
+from scheduler import create_schedule, expand_runs, lead_sentinels_per_split
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_BUILD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build"
+)
+
+
+def _cfg():
+    # "Build" is the sentinel on both pods; C and D chain behind it on p1.
+    return _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("Build", ScenarioType.SINGLE, ["p1", "p2"], runtime=5),
+            _scn("A", ScenarioType.SINGLE, ["p2"], runtime=30),
+            _scn("C", ScenarioType.SINGLE, ["p1"], runtime=20),
+            _scn("D", ScenarioType.SINGLE, ["p1"], runtime=20),
+        ],
+    )
+
+
+def _schedule(cfg):
+    runs = {r.job_name: r for r in expand_runs(cfg)}
+    chain = ChainedRun(
+        scenario=runs["C_p1"].scenario, pod=runs["C_p1"].pod,
+        estimated_runtime=40, parts=[runs["C_p1"], runs["D_p1"]],
+    )
+    # A runs on p2 before that pod's sentinel, so it is not gated.
+    return Schedule(stages=[
+        Stage(runs=[runs["Build_p1"], runs["A_p2"]]),
+        Stage(runs=[chain, runs["Build_p2"]]),
+    ])
+
+
+class TestPodGates(unittest.TestCase):
+    def test_later_jobs_on_the_pod_are_gated(self):
+        gates = pod_gates(
+            [_schedule(_cfg())], HealthSettings(sentinels=["Build"])
+        )
+        self.assertEqual(gates, {"C_p1": "Build_p1", "D_p1": "Build_p1"})
+
+    def test_split_yamls_are_gated_on_their_own(self):
+        sched = _schedule(_cfg())
+        gates = pod_gates(
+            [Schedule(stages=[st]) for st in sched.stages],
+            HealthSettings(sentinels=["Build"]),
+        )
+        self.assertEqual(gates, {})
+
+    def test_every_split_yaml_gets_its_sentinel(self):
+        sched = _schedule(_cfg())
+        split = lead_sentinels_per_split(
+            [Schedule(stages=[st]) for st in sched.stages], {"Build"}
+        )
+        lanes = [
+            [[p.job_name for p in (r.parts if isinstance(r, ChainedRun)
+                                   else [r])] for r in st.runs]
+            for s in split for st in s.stages
+        ]
+        self.assertEqual(lanes, [
+            [["Build_p1"], ["Build_p2", "A_p2"]],
+            [["Build_p1", "C_p1", "D_p1"], ["Build_p2"]],
+        ])
+        gates = pod_gates(split, HealthSettings(sentinels=["Build"]))
+        self.assertEqual(
+            gates, {"A_p2": "Build_p2", "C_p1": "Build_p1", "D_p1": "Build_p1"}
+        )
+
+    def test_shipped_config_gates_every_yaml(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                code = main.main([
+                    "--config", os.path.join(_BUILD, "benchmarks_ci_pods.json"),
+                    "--pod-health", "Build", "--base-name", "x",
+                    "--yaml-output", tmp,
+                ])
+            self.assertEqual(code, 0)
+            files = sorted(os.listdir(tmp))
+            self.assertEqual(len(files), 2)
+            for name in files:
+                with open(os.path.join(tmp, name), encoding="utf-8") as f:
+                    text = f.read()
+                self.assertIn("dependencies.Build_gold_lin", text, name)
+                self.assertIn("dependencies.Build_gold_win", text, name)
+
+
+class TestLeadSentinels(unittest.TestCase):
+    def test_short_sentinel_runs_first_and_gates_real_jobs(self):
+        cfg = _cfg()
+        # Longest-job-first packing puts the 5-minute Build last on p1.
+        plain = [
+            [p.name for p in (r.parts if isinstance(r, ChainedRun) else [r])]
+            for st in create_schedule(cfg).stages for r in st.runs
+        ]
+        self.assertNotEqual(plain[0][0], "Build p1")
+
+        cfg.health = HealthSettings(sentinels=["Build"])
+        sched = create_schedule(cfg)
+        gates = pod_gates([sched], cfg.health)
+        self.assertEqual(gates["C_p1"], "Build_p1")
+        self.assertEqual(gates["D_p1"], "Build_p1")
+        self.assertEqual(gates["A_p2"], "Build_p2")
+        data = schedule_to_template_data(sched, cfg, gates=gates)
+        first = data["groups"][0]["jobs"]
+        self.assertIn("Build_p1", [j["job_id"] for j in first])
+
+    def test_gate_outside_the_pipeline_is_rejected(self):
+        cfg = _cfg()
+        with self.assertRaises(GeneratorError):
+            schedule_to_template_data(
+                _schedule(cfg), cfg, gates={"C_p1": "Elsewhere"}
+            )
+
+
+class TestMultiRateGates(unittest.TestCase):
+    def test_every_yaml_references_only_its_own_jobs(self):
+        with open(os.path.join(_BUILD, "benchmarks_ci_pods.json"),
+                  encoding="utf-8") as f:
+            payload = json.load(f)
+        for scenario in payload["scenarios"]:
+            if scenario["name"] in ("Containers", "PGO", "NativeAOT",
+                                    "Proxies", "Grpc"):
+                scenario["every_n_cycles"] = 2
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cfg.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            out = os.path.join(tmp, "out")
+            with contextlib.redirect_stdout(io.StringIO()):
+                code = main.main([
+                    "--config", path, "--pod-health", "Build",
+                    "--base-name", "x", "--yaml-output", out,
+                ])
+            self.assertEqual(code, 0)
+            files = sorted(os.listdir(out))
+            self.assertEqual(len(files), 4)
+            gated = 0
+            for name in files:
+                with open(os.path.join(out, name), encoding="utf-8") as f:
+                    text = f.read()
+                jobs = set(re.findall(r"^- job: (\S+)", text, re.M))
+                for deps in re.findall(r"dependsOn: \[(.*)\]", text):
+                    for dep in filter(None, deps.split(", ")):
+                        self.assertIn(dep, jobs, name)
+                gated += text.count("dependencies.Build_")
+            self.assertGreater(gated, 0)
+
+
+class TestGatedYaml(unittest.TestCase):
+    def test_gated_jobs_depend_on_the_sentinel(self):
+        cfg = _cfg()
+        gates = pod_gates([_schedule(cfg)], HealthSettings(["Build"]))
+        data = schedule_to_template_data(_schedule(cfg), cfg, gates=gates)
+        jobs = {j["job_id"]: j for g in data["groups"] for j in g["jobs"]}
+        self.assertEqual(jobs["C_p1"]["depends_on"], ["Build_p1", "A_p2"])
+        self.assertEqual(jobs["D_p1"]["depends_on"], ["C_p1", "Build_p1"])
+        self.assertIsNone(jobs["Build_p2"]["gate"])
+
+        text = _render_yaml(data, cfg.pipeline)
+        job = text[text.index("- job: D_p1"):]
+        self.assertIn(
+            "condition: and(not(canceled()), "
+            "ne(dependencies.Build_p1.result, 'Failed'))",
+            job[:job.index("steps:")],
+        )
+        # Skipped jobs must not stop the rest of the pipeline.
+        self.assertNotIn("succeededOrFailed()", text.split("steps:")[0])
+
+    def test_ungated_yaml_is_unchanged(self):
+        cfg = _cfg()
+        text = _render_yaml(
+            schedule_to_template_data(_schedule(cfg), cfg), cfg.pipeline
+        )
+        self.assertNotIn("canceled()", text)
+
+
+class TestHealthReport(unittest.TestCase):
+    def test_skipping_reclaims_the_timeouts(self):
+        cfg = _cfg()
+        sched = _schedule(cfg)
+        gates = pod_gates([sched], HealthSettings(["Build"]))
+        [case] = health_report(cfg, [sched], gates, {"C_p1": 60}, "t")
+        self.assertEqual((case.label, case.pod, case.sentinel, case.jobs),
+                         ("t YAML 1", "p1", "Build_p1", 2))
+        # C times out after 60 min and D after its default of 120.
+        self.assertEqual(case.reclaimed, 180)
+        self.assertEqual(case.timing_out, 30 + 180)
+        self.assertEqual(case.skipped, 30 + 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+import main
+from generator import generate_yamls
+from incremental import (
+    load_baseline,
+    parse_baseline_yaml,
+    reschedule_incremental,
+    schedules_to_baseline,
+    write_baseline,
+)
+from models import ChainedRun, ScenarioType
+from scheduler import SchedulerError, create_schedule, split_schedule
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build",
+    "benchmarks_ci_pods.json",
+)
+
+
+def _backfill_cfg():
+    # C is chained behind B, in the idle time A leaves on p1.
+    cfg = _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("A", ScenarioType.SINGLE, ["p2"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p1"], runtime=20),
+            _scn("C", ScenarioType.SINGLE, ["p1"], runtime=20),
+        ],
+    )
+    cfg.backfill = True
+    return cfg
+
+
+def _layout(schedules):
+    return [
+        [[r.job_name for r in stage.runs] for stage in sched.stages]
+        for sched in schedules
+    ]
+
+
+class TestBaselineRoundTrip(unittest.TestCase):
+    def test_yaml_and_json_baselines_agree(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1", "p2"], runtime=30),
+                _scn("B", ScenarioType.SINGLE, ["p1"], runtime=10),
+            ],
+        )
+        schedules = split_schedule(create_schedule(cfg), 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_yamls(schedules, cfg, tmp, base_name="t")
+            sidecar = os.path.join(tmp, "baseline.json")
+            write_baseline(schedules, sidecar)
+            self.assertEqual(
+                parse_baseline_yaml(files), schedules_to_baseline(schedules)
+            )
+            self.assertEqual(
+                load_baseline([sidecar]), schedules_to_baseline(schedules)
+            )
+
+    def test_join_jobs_are_not_part_of_the_baseline(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1", "p2", "p3"], 30),
+                _scn("B", ScenarioType.SINGLE, ["p1", "p2", "p3"], 10),
+            ],
+            queues=("q1", "q2", "q3"),
+        )
+        cfg.pipeline.join_jobs = True
+        schedules = [create_schedule(cfg)]
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_yamls(schedules, cfg, tmp, base_name="t")
+            with open(files[0]) as f:
+                self.assertIn("- job: join_group_1", f.read())
+            self.assertEqual(
+                parse_baseline_yaml(files), schedules_to_baseline(schedules)
+            )
+
+    def test_chained_jobs_are_listed_one_by_one(self):
+        cfg = _backfill_cfg()
+        schedules = [create_schedule(cfg)]
+        self.assertEqual(
+            schedules_to_baseline(schedules), [[["A_p2", "B_p1", "C_p1"]]]
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            files = generate_yamls(schedules, cfg, tmp, base_name="t")
+            self.assertEqual(
+                parse_baseline_yaml(files), schedules_to_baseline(schedules)
+            )
+
+
+class TestRescheduleIncremental(unittest.TestCase):
+    def _base(self):
+        return _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1", "p2"], runtime=30),
+                _scn("B", ScenarioType.SINGLE, ["p1", "p2"], runtime=20),
+                _scn("C", ScenarioType.SINGLE, ["p3"], runtime=10),
+            ],
+        )
+
+    def test_unchanged_config_is_identity(self):
+        cfg = self._base()
+        fresh = split_schedule(create_schedule(cfg), 2)
+        schedules, report = reschedule_incremental(
+            cfg, schedules_to_baseline(fresh)
+        )
+        self.assertEqual(_layout(schedules), _layout(fresh))
+        self.assertEqual(report.moved, [])
+        self.assertEqual(report.inserted, [])
+
+    def test_new_run_does_not_move_existing_ones(self):
+        cfg = self._base()
+        baseline = schedules_to_baseline([create_schedule(cfg)])
+        cfg.scenarios.append(
+            _scn("D", ScenarioType.SINGLE, ["p3"], runtime=25)
+        )
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(report.inserted, ["D p3"])
+        self.assertEqual(report.moved, [])
+        layout = _layout(schedules)[0]
+        for before, after in zip(baseline[0], layout):
+            self.assertEqual(after[:len(before)], before)
+
+    def test_removed_run_is_reported(self):
+        cfg = self._base()
+        baseline = schedules_to_baseline([create_schedule(cfg)])
+        cfg.scenarios = cfg.scenarios[:2]
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(report.removed, ["C_p3"])
+        self.assertEqual(sum(s.total_runs for s in schedules), 4)
+
+    def test_changed_machines_displace_run(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=30),
+                _scn("B", ScenarioType.SINGLE, ["p2"], runtime=30),
+            ],
+        )
+        baseline = schedules_to_baseline([create_schedule(cfg)])
+        cfg.pods["p2"].sut = "m1"
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(report.moved, ["B p2"])
+        self.assertEqual(len(schedules[0].stages), 2)
+        self.assertEqual(report.stability_cost, 0)
+
+    def _after_cfg(self):
+        # D must run after A on p1; X keeps stage 1 busy on p2.
+        d = _scn("D", ScenarioType.SINGLE, ["p1"], runtime=20)
+        d.after = ["A"]
+        return _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("X", ScenarioType.SINGLE, ["p2"], runtime=60),
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=30),
+                d,
+            ],
+        )
+
+    def _stage_of(self, schedules):
+        return {
+            r.job_name: (f, i)
+            for f, sched in enumerate(schedules)
+            for i, stage in enumerate(sched.stages) for r in stage.runs
+        }
+
+    def test_new_run_goes_after_its_predecessor(self):
+        # Stage 1 has room for D, but A only runs in stage 2.
+        schedules, report = reschedule_incremental(
+            self._after_cfg(), [[["X_p2"], ["A_p1"]], []]
+        )
+        where = self._stage_of(schedules)
+        self.assertEqual(report.inserted, ["D p1"])
+        self.assertEqual(where["D_p1"][0], where["A_p1"][0])
+        self.assertGreater(where["D_p1"][1], where["A_p1"][1])
+
+    def test_kept_run_before_its_predecessor_moves(self):
+        schedules, report = reschedule_incremental(
+            self._after_cfg(), [[["D_p1", "X_p2"], ["A_p1"]]]
+        )
+        where = self._stage_of(schedules)
+        self.assertEqual(report.moved, ["D p1"])
+        self.assertGreater(where["D_p1"][1], where["A_p1"][1])
+
+    def test_linked_runs_share_a_file(self):
+        schedules, report = reschedule_incremental(
+            self._after_cfg(), [[["X_p2"]], [["A_p1"]], [["D_p1"]]]
+        )
+        where = self._stage_of(schedules)
+        self.assertEqual(report.moved, ["D p1"])
+        self.assertEqual(where["D_p1"][0], where["A_p1"][0])
+        self.assertGreater(where["D_p1"][1], where["A_p1"][1])
+
+    def test_fillers_are_placed_again(self):
+        filler = _scn("F", ScenarioType.SINGLE, ["p2"], runtime=40)
+        filler.filler = True
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Long", ScenarioType.SINGLE, ["p1"], runtime=90),
+                _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=30),
+                filler,
+            ],
+        )
+        fresh = create_schedule(cfg)
+        baseline = [[
+            [p.job_name for r in st.runs
+             for p in (r.parts if isinstance(r, ChainedRun) else [r])]
+            for st in fresh.stages
+        ]]
+        self.assertIn("F_p2", baseline[0][0])
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(report.removed, [])
+        self.assertEqual(sorted(report.kept), ["Long p1", "Short p2"])
+        lanes = [
+            [p.name for p in (r.parts if isinstance(r, ChainedRun) else [r])]
+            for st in schedules[0].stages for r in st.runs
+        ]
+        self.assertIn(["Short p2", "F p2"], lanes)
+        self.assertEqual(report.makespan, 90)
+
+    def test_backfilled_baseline_keeps_its_chains(self):
+        cfg = _backfill_cfg()
+        baseline = schedules_to_baseline([create_schedule(cfg)])
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(schedules_to_baseline(schedules), baseline)
+        self.assertEqual((report.moved, report.inserted), ([], []))
+        self.assertEqual(report.makespan, 60)
+
+    def test_backfill_chains_new_runs(self):
+        cfg = _backfill_cfg()
+        baseline = [[["A_p2", "B_p1"], ["C_p1"]]]
+        schedules, report = reschedule_incremental(cfg, baseline)
+        self.assertEqual(
+            schedules_to_baseline(schedules), [[["A_p2", "B_p1", "C_p1"]]]
+        )
+        self.assertEqual(report.moved, ["C p1"])
+        self.assertEqual(report.makespan, 60)
+
+    def test_backfill_with_own_baseline_is_idempotent(self):
+        def body(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read().split("\n\n", 1)[1]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, "first")
+            second = os.path.join(tmp, "second")
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main.main([
+                    "--config", _CONFIG, "--backfill",
+                    "--yaml-output", first,
+                ]), 0)
+                files = sorted(
+                    os.path.join(first, name) for name in os.listdir(first)
+                )
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    self.assertEqual(main.main([
+                        "--config", _CONFIG, "--backfill",
+                        "--baseline", *files, "--yaml-output", second,
+                    ]), 0)
+            self.assertIn("Moved: 0", out.getvalue())
+            for path in files:
+                self.assertEqual(
+                    body(path),
+                    body(os.path.join(second, os.path.basename(path))),
+                )
+
+    def test_bad_sidecar_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "b.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"nope": []}, f)
+            with self.assertRaises(SchedulerError):
+                load_baseline([path])
+
+
+if __name__ == "__main__":
+    unittest.main()
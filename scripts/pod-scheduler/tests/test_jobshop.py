@@ -0,0 +1,190 @@
+import os
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from config_loader import load_config
+from jobshop import PRIORITY_RULES, place, refine, timeline_schedule
+from models import ScenarioType
+from scheduler import SchedulerError, create_schedule, expand_runs
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_BUILD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build"
+)
+
+
+def _barrier_cfg():
+    # Y and Z share m2; the stage engine makes Z wait for X's stage.
+    return _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("X", ScenarioType.SINGLE, ["p1"], runtime=60),
+            _scn("Y", ScenarioType.SINGLE, ["p2"], runtime=30),
+            _scn("Z", ScenarioType.SINGLE, ["p2"], runtime=30),
+        ],
+    )
+
+
+def _queue_cfg():
+    # Five runs on distinct machines; only the queues constrain them.
+    pods = [_pod(f"p{i}", f"m{i}") for i in range(5)]
+    runtimes = [30, 30, 20, 20, 20]
+    return _config(
+        pods=pods,
+        scenarios=[
+            _scn(f"S{i}", ScenarioType.SINGLE, [f"p{i}"], runtime=t)
+            for i, t in enumerate(runtimes)
+        ],
+    )
+
+
+class TestPlace(unittest.TestCase):
+    def test_runs_start_when_their_machines_free(self):
+        cfg = _barrier_cfg()
+        plan = timeline_schedule(cfg)
+        slots = {s.run.job_name: s for s in plan.slots}
+        self.assertEqual(slots["X_p1"].start, 0)
+        self.assertEqual(sorted(
+            (slots[j].start, slots[j].end) for j in ("Y_p2", "Z_p2")
+        ), [(0, 30), (30, 60)])
+        self.assertEqual(plan.makespan, 60)
+        self.assertEqual(create_schedule(cfg).total_duration, 90)
+
+    def test_dependencies_name_previous_holders(self):
+        plan = timeline_schedule(_barrier_cfg(), rule="ljf")
+        slots = {s.run.job_name: s for s in plan.slots}
+        self.assertEqual(slots["X_p1"].after, [])
+        self.assertEqual(slots["Y_p2"].after, [])
+        # Z waits for Y on m2, and takes the queue Y freed.
+        self.assertEqual(slots["Z_p2"].after, ["Y_p2"])
+        self.assertEqual(slots["Z_p2"].queue, slots["Y_p2"].queue)
+
+    def test_fills_idle_gaps(self):
+        cfg = _barrier_cfg()
+        runs = {r.job_name: r for r in expand_runs(cfg)}
+        # X is placed last but still starts at 0 on the other queue.
+        plan = place([runs["Y_p2"], runs["Z_p2"], runs["X_p1"]], cfg.queues)
+        self.assertEqual(plan.slots[-1].start, 0)
+        self.assertEqual(plan.makespan, 60)
+
+    def test_gap_insertion_updates_the_later_holder(self):
+        # B needs m1 and m2 and waits for A on m1; C then fills m2's gap
+        # ahead of B, so B must now also wait for C.
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"),
+                  _pod("p3", "m1", load="m2")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=60),
+                _scn("B", ScenarioType.DUAL, ["p3"], runtime=10),
+                _scn("C", ScenarioType.SINGLE, ["p2"], runtime=30),
+            ],
+        )
+        runs = {r.job_name: r for r in expand_runs(cfg)}
+        plan = place([runs["A_p1"], runs["B_p3"], runs["C_p2"]], cfg.queues)
+        slots = {s.run.job_name: s for s in plan.slots}
+        self.assertEqual((slots["B_p3"].start, slots["C_p2"].start), (60, 0))
+        self.assertEqual(slots["B_p3"].after, ["A_p1", "C_p2"])
+
+    def test_shared_machines_are_ordered_by_dependencies(self):
+        for name in ("benchmarks_ci_pods.json",
+                     "benchmarks_ci_azure_pods.json"):
+            plan = timeline_schedule(load_config(os.path.join(_BUILD, name)))
+            after = {s.run.job_name: s.after for s in plan.slots}
+
+            def ancestors(job, seen=None):
+                seen = set() if seen is None else seen
+                for dep in after[job]:
+                    if dep not in seen:
+                        seen.add(dep)
+                        ancestors(dep, seen)
+                return seen
+
+            reach = {job: ancestors(job) for job in after}
+            for a in plan.slots:
+                for b in plan.slots:
+                    if a.start < b.start and (
+                        a.run.machines_used & b.run.machines_used
+                    ):
+                        self.assertIn(a.run.job_name, reach[b.run.job_name],
+                                      (name, b.run.job_name))
+
+    def test_no_resource_overlaps(self):
+        for rule in PRIORITY_RULES:
+            plan = timeline_schedule(_queue_cfg(), rule=rule)
+            for a in plan.slots:
+                for b in plan.slots:
+                    if a is b or not (a.start < b.end and b.start < a.end):
+                        continue
+                    self.assertNotEqual(a.queue, b.queue)
+                    self.assertFalse(a.run.machines_used & b.run.machines_used)
+
+    def test_zero_queues(self):
+        with self.assertRaises(SchedulerError):
+            place(expand_runs(_barrier_cfg()), [])
+
+    def test_unknown_rule(self):
+        with self.assertRaises(SchedulerError):
+            timeline_schedule(_barrier_cfg(), rule="nope")
+
+    def test_to_json(self):
+        data = timeline_schedule(_barrier_cfg()).to_json()
+        self.assertEqual(data["makespan"], 60)
+        self.assertEqual(
+            sorted(r["job"] for r in data["runs"]), ["X_p1", "Y_p2", "Z_p2"]
+        )
+
+
+class TestSequencing(unittest.TestCase):
+    def _cfg(self):
+        build = _scn("Build", ScenarioType.SINGLE, ["p1"], runtime=20)
+        crossgen = _scn("Crossgen", ScenarioType.SINGLE, ["p1"], runtime=40)
+        crossgen.after = ["Build"]
+        grpc = _scn("Grpc", ScenarioType.SINGLE, ["p2"], runtime=30)
+        grpc.reuses = {"Build": 10}
+        return _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m1")],
+            scenarios=[build, crossgen, grpc],
+        )
+
+    def test_predecessors_finish_first_and_discount_applies(self):
+        for rule in PRIORITY_RULES:
+            plan = timeline_schedule(self._cfg(), rule=rule)
+            slots = {s.run.job_name: s for s in plan.slots}
+            build = slots["Build_p1"]
+            self.assertLessEqual(build.end, slots["Crossgen_p1"].start)
+            self.assertLessEqual(build.end, slots["Grpc_p2"].start)
+            self.assertEqual(slots["Grpc_p2"].end - slots["Grpc_p2"].start, 20)
+            self.assertEqual(plan.makespan, 80)
+
+    def test_refine_keeps_precedence(self):
+        cfg = self._cfg()
+        runs = expand_runs(cfg)
+        order = refine(runs, cfg.queues, 50, seed=3)
+        slots = {s.run.job_name: s for s in place(order, cfg.queues).slots}
+        self.assertLessEqual(
+            slots["Build_p1"].end, slots["Crossgen_p1"].start
+        )
+
+
+class TestRefine(unittest.TestCase):
+    def test_local_search_reaches_optimum(self):
+        cfg = _queue_cfg()
+        # Longest-first puts both 30s on separate queues: 30+20+20 = 70.
+        self.assertEqual(timeline_schedule(cfg).makespan, 70)
+        self.assertEqual(timeline_schedule(cfg, iterations=200).makespan, 60)
+
+    def test_never_worse(self):
+        cfg = _queue_cfg()
+        ordered = PRIORITY_RULES["ljf"](expand_runs(cfg))
+        for seed in range(5):
+            better = refine(ordered, cfg.queues, 20, seed)
+            self.assertLessEqual(
+                place(better, cfg.queues).makespan,
+                place(ordered, cfg.queues).makespan,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import base64
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from leases import (
+    CALLBACK_HEADERS,
+    LeaseError,
+    LeaseRegistry,
+    LeaseServer,
+    is_under,
+)
+
+
+_AZDO = "https://dev.azure.com/org/"
+_AUTH = {"Authorization": "Basic " + base64.b64encode(b"any:s3cret").decode()}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.registry = LeaseRegistry(self.clock)
+
+    def test_all_or_nothing(self):
+        self.assertTrue(self.registry.acquire("a", ["db", "m1"], 10))
+        self.assertFalse(self.registry.acquire("b", ["db", "m2"], 10))
+        # b holds nothing, so m2 is still free.
+        self.assertTrue(self.registry.acquire("c", ["m2"], 10))
+        self.assertEqual(self.registry.release("a"), ["db", "m1"])
+        self.assertTrue(self.registry.acquire("b", ["db"], 10))
+
+    def test_reacquire_by_holder(self):
+        self.assertTrue(self.registry.acquire("a", ["db"], 10))
+        self.assertTrue(self.registry.acquire("a", ["db"], 10))
+
+    def test_waiter_granted_on_release(self):
+        granted = []
+        self.registry.acquire("a", ["db"], 10)
+        self.assertFalse(self.registry.acquire(
+            "b", ["db"], 10, lambda: granted.append("b")
+        ))
+        self.assertEqual(granted, [])
+        self.registry.release("a")
+        self.assertEqual(granted, ["b"])
+        self.assertEqual(
+            self.registry.snapshot()["leases"]["db"]["holder"], "b"
+        )
+
+    def test_waiters_are_not_overtaken(self):
+        granted = []
+        self.registry.acquire("a", ["db"], 10)
+        self.registry.acquire(
+            "b", ["db", "m1"], 10, lambda: granted.append("b")
+        )
+        # m1 is free, but b is waiting for it.
+        self.assertFalse(self.registry.acquire(
+            "c", ["m1"], 10, lambda: granted.append("c")
+        ))
+        self.registry.release("a")
+        self.assertEqual(granted, ["b"])
+        self.registry.release("b")
+        self.assertEqual(granted, ["b", "c"])
+
+    def test_leases_lapse_after_ttl(self):
+        granted = []
+        self.registry.acquire("a", ["db"], 1)
+        self.registry.acquire("b", ["db"], 1, lambda: granted.append("b"))
+        self.clock.now = 59
+        self.assertEqual(self.registry.expire(), [])
+        self.clock.now = 60
+        self.assertEqual(self.registry.expire(), ["db"])
+        self.assertEqual(granted, ["b"])
+
+    def test_bad_request(self):
+        with self.assertRaises(LeaseError):
+            self.registry.acquire("", ["db"], 10)
+        with self.assertRaises(LeaseError):
+            self.registry.acquire("a", [], 10)
+
+
+class TestIsUnder(unittest.TestCase):
+    def test_prefix_match(self):
+        self.assertTrue(is_under("https://dev.azure.com/org", _AZDO))
+        self.assertTrue(is_under("https://DEV.azure.com/org/x/", _AZDO))
+        self.assertFalse(is_under("https://dev.azure.com/", _AZDO))
+        self.assertFalse(is_under("https://dev.azure.com/org?x=1", _AZDO))
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.server = LeaseServer(("127.0.0.1", 0), "s3cret", _AZDO)
+        self.completed = []
+        self.changed = threading.Condition()
+
+        def callback(headers):
+            def complete():
+                with self.changed:
+                    self.completed.append(headers["JobId"])
+                    self.changed.notify_all()
+            return complete
+
+        self.server.callback = callback
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def _completed(self, count):
+        # Immediate grants call back after the reply is sent.
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.completed) >= count, 5)
+        return self.completed
+
+    def _post(self, path, body, headers=None, auth=_AUTH):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(body).encode("utf-8"),
+            method="POST", headers={**auth, **(headers or {})},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as exc:
+            return exc.code, json.load(exc)
+
+    def test_plain_clients_get_409_on_collision(self):
+        body = {"holder": "a", "machines": ["db"], "ttl": 10}
+        self.assertEqual(self._post("/acquire", body),
+                         (200, {"granted": True}))
+        body["holder"] = "b"
+        self.assertEqual(self._post("/acquire", body),
+                         (409, {"granted": False}))
+        self.assertEqual(self._post("/release", {"holder": "a"}),
+                         (200, {"released": ["db"]}))
+        request = urllib.request.Request(self.url + "/leases", headers=_AUTH)
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(json.load(response)["leases"], {})
+
+    def test_callback_mode_completes_when_granted(self):
+        headers = {**{h: "x" for h in CALLBACK_HEADERS}, "PlanUrl": _AZDO}
+        self._post("/acquire", {"holder": "a", "machines": ["db"], "ttl": 10},
+                   {**headers, "JobId": "job-a"})
+        self.assertEqual(self._completed(1), ["job-a"])
+        status, _ = self._post(
+            "/acquire", {"holder": "b", "machines": ["db"], "ttl": 10},
+            {**headers, "JobId": "job-b"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(self.completed, ["job-a"])
+        self._post("/release/", {"holder": "a"})
+        self.assertEqual(self._completed(2), ["job-a", "job-b"])
+
+    def test_requests_need_the_secret(self):
+        body = {"holder": "a", "machines": ["db"], "ttl": 10}
+        wrong = {"Authorization": "Basic "
+                 + base64.b64encode(b"any:guess").decode()}
+        for auth in ({}, wrong, {"Authorization": "Bearer s3cret"}):
+            status, _ = self._post("/acquire", body, auth=auth)
+            self.assertEqual(status, 401, auth)
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(self.url + "/leases")
+        ctx.exception.close()
+        self.assertEqual(ctx.exception.code, 401)
+        self.assertEqual(self.server.registry.snapshot()["leases"], {})
+
+    def test_callbacks_only_go_to_the_azdo_url(self):
+        headers = {h: "x" for h in CALLBACK_HEADERS}
+        for url in ("https://evil.example/", "http://dev.azure.com/org/",
+                    "https://dev.azure.com/org-evil/",
+                    "https://dev.azure.com@evil.example/org/"):
+            status, _ = self._post(
+                "/acquire", {"holder": "a", "machines": ["db"], "ttl": 10},
+                {**headers, "PlanUrl": url},
+            )
+            self.assertEqual(status, 403, url)
+        self.assertEqual(self.server.registry.snapshot()["leases"], {})
+        self.assertEqual(self.completed, [])
+
+    def test_server_needs_a_secret(self):
+        with self.assertRaises(LeaseError):
+            LeaseServer(("127.0.0.1", 0), "", _AZDO)
+
+    def test_malformed_request(self):
+        status, _ = self._post("/acquire", {"holder": "a", "ttl": 10})
+        self.assertEqual(status, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from metrics import SCHEMA_VERSION, build_metrics, config_hash, schedule_metrics
+from models import ScenarioType
+from scheduler import create_schedule, split_schedule
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg():
+    return _config(
+        pods=[_pod("p1", "m1", load="l"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("Long", ScenarioType.DUAL, ["p1"], runtime=60),
+            _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=20),
+            _scn("Next", ScenarioType.SINGLE, ["p1"], runtime=10),
+        ],
+    )
+
+
+class TestScheduleMetrics(unittest.TestCase):
+    def test_single_yaml(self):
+        cfg = _cfg()
+        m = schedule_metrics(cfg, [create_schedule(cfg)])
+        self.assertEqual(m["stage_count"], 2)
+        self.assertEqual(m["run_count"], 3)
+        self.assertEqual(m["total_minutes"], 70)
+        # m1 is busy for Long + Next.
+        self.assertEqual(m["lower_bound_minutes"], 70)
+        self.assertEqual(m["lower_bound_gap"], 0)
+        self.assertEqual(m["machines"]["m2"], {
+            "busy_minutes": 20, "total_minutes": 60,
+            "utilization": round(20 / 60, 3),
+        })
+        self.assertEqual(m["queues"], {"q1": 70, "q2": 20})
+        first = m["stages"][0]
+        self.assertEqual(first["duration"], 60)
+        self.assertEqual(first["slack"], 40)
+        self.assertEqual(
+            [(r["job"], r["slack"]) for r in first["runs"]],
+            [("Long_p1", 0), ("Short_p2", 40)],
+        )
+
+    def test_run_count_ignores_chaining(self):
+        cfg = _cfg()
+        cfg.scenarios.append(
+            _scn("After", ScenarioType.SINGLE, ["p2"], runtime=20)
+        )
+        plain = schedule_metrics(cfg, [create_schedule(cfg)])
+        cfg.backfill = True
+        backfilled = schedule_metrics(cfg, [create_schedule(cfg)])
+        self.assertEqual(plain["run_count"], 4)
+        self.assertEqual(backfilled["run_count"], 4)
+        self.assertEqual(plain["lane_count"], 4)
+        self.assertEqual(backfilled["lane_count"], 3)
+
+    def test_split_balance(self):
+        cfg = _cfg()
+        split = split_schedule(create_schedule(cfg), 2)
+        m = schedule_metrics(cfg, split)
+        self.assertEqual(m["split"]["yaml_minutes"], [60, 10])
+        self.assertEqual(m["split"]["makespan"], 60)
+        self.assertEqual(m["split"]["imbalance"], round(60 / 35, 3))
+        self.assertEqual([s["yaml"] for s in m["stages"]], [1, 2])
+
+
+class TestBuildMetrics(unittest.TestCase):
+    def test_document_and_hash_ignore_formatting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = os.path.join(tmp, "a.json")
+            b = os.path.join(tmp, "b.json")
+            with open(a, "w") as f:
+                json.dump({"x": 1, "y": [1, 2]}, f)
+            with open(b, "w") as f:
+                f.write('{\n  "y": [1, 2],\n  "x": 1\n}\n')
+            self.assertEqual(config_hash(a), config_hash(b))
+
+            cfg = _cfg()
+            doc = build_metrics(
+                a, cfg, [(cfg, [create_schedule(cfg)], "bench")]
+            )
+        self.assertEqual(doc["schema_version"], SCHEMA_VERSION)
+        self.assertEqual(len(doc["config"]["hash"]), 64)
+        self.assertEqual(doc["pipelines"][0]["name"], "bench")
+        self.assertEqual(doc["pipelines"][0]["cron"], cfg.schedule)
+        json.dumps(doc)
+
+
+if __name__ == "__main__":
+    unittest.main()
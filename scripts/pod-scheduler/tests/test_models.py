@@ -1,9 +1,13 @@
+import sys
 import unittest
+from dataclasses import FrozenInstanceError, replace
 
 import tests  # noqa: F401  # ensures sys.path is set up
 
 from models import (
     JOB_ID_RE,
+    ChainedRun,
+    CoalescedRun,
     Pod,
     Run,
     Scenario,
@@ -102,5 +106,48 @@ class TestStageCanAdd(unittest.TestCase):
         self.assertTrue(stage.can_add(self._run("a3", sut="m3"), queue_count=4))
 
 
+class TestRunDerivedValues(unittest.TestCase):
+    _run = TestStageCanAdd._run
+
+    def test_values_computed_once(self):
+        run = self._run("Proxies", sut="gold-lin", load="gold-load")
+        self.assertEqual(run.name, "Proxies p")
+        self.assertEqual(run.job_name, "Proxies_p")
+        self.assertEqual(run.machines_used, {"gold-lin", "gold-load"})
+        self.assertEqual(run.profiles, ("sut", "load"))
+        self.assertIs(run.machines_used, run.machines_used)
+        self.assertIs(run.job_name, sys.intern("Proxies_p"))
+
+    def test_immutable_views_and_no_instance_dict(self):
+        run = self._run("a", sut="m1")
+        self.assertIsInstance(run.machines_used, frozenset)
+        self.assertIsInstance(run.profiles, tuple)
+        self.assertFalse(hasattr(run, "__dict__"))
+
+    def test_replace_recomputes(self):
+        run = self._run("a", sut="m1")
+        moved = replace(run, pod=replace(run.pod, name="q", sut="m2"))
+        self.assertEqual(moved.job_name, "a_q")
+        self.assertEqual(moved.machines_used, {"m2"})
+        self.assertEqual(run, self._run("a", sut="m1"))
+
+    def test_fields_cannot_go_stale(self):
+        run = self._run("a", sut="m1")
+        with self.assertRaises(FrozenInstanceError):
+            run.pod = replace(run.pod, name="q", sut="m2")
+        with self.assertRaises(FrozenInstanceError):
+            run.estimated_runtime = 5
+        self.assertEqual(run.job_name, "a_p")
+
+    def test_grouped_runs_build_without_parts(self):
+        run = self._run("a", sut="m1")
+        for cls in (CoalescedRun, ChainedRun):
+            empty = cls(run.scenario, run.pod, 0)
+            self.assertEqual(empty.machines_used, frozenset())
+            self.assertEqual(empty.profiles, ())
+            grouped = cls(run.scenario, run.pod, 5, parts=[run])
+            self.assertEqual(grouped.profiles, run.profiles)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from generator import GeneratorError
+from models import ScenarioType
+from multirate import assign_phases, cycle_period, phase_configs, phase_cron
+from scheduler import create_schedule, expand_runs
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg():
+    cfg = _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("Base", ScenarioType.SINGLE, ["p1", "p2"], runtime=30),
+            _scn("HeavyA", ScenarioType.SINGLE, ["p1"], runtime=90),
+            _scn("HeavyB", ScenarioType.SINGLE, ["p1"], runtime=90),
+        ],
+    )
+    cfg.scenarios[1].every_n_cycles = 2
+    cfg.scenarios[2].every_n_cycles = 2
+    return cfg
+
+
+class TestPhaseCron(unittest.TestCase):
+    def test_twice_daily_splits_into_daily_phases(self):
+        self.assertEqual(phase_cron("0 3/12 * * *", 0, 2), "0 3 * * *")
+        self.assertEqual(phase_cron("0 3/12 * * *", 1, 2), "0 15 * * *")
+
+    def test_keeps_step_when_pattern_is_sub_daily(self):
+        self.assertEqual(phase_cron("0 1/4 * * *", 1, 2), "0 5/8 * * *")
+
+    def test_period_one_is_identity(self):
+        self.assertEqual(phase_cron("0 3 * * *", 0, 1), "0 3 * * *")
+
+    def test_unrepresentable_pattern_raises(self):
+        for cron, period in [("0 3 * * *", 2), ("0 3/12 * * *", 3)]:
+            with self.assertRaises(GeneratorError, msg=cron):
+                phase_cron(cron, 0, period)
+
+
+class TestAssignPhases(unittest.TestCase):
+    def test_period_is_lcm(self):
+        cfg = _cfg()
+        self.assertEqual(cycle_period(cfg), 2)
+        cfg.scenarios[0].every_n_cycles = 3
+        self.assertEqual(cycle_period(cfg), 6)
+
+    def test_heavy_runs_spread_across_phases(self):
+        offsets = assign_phases(_cfg())
+        self.assertNotEqual(offsets["HeavyA_p1"], offsets["HeavyB_p1"])
+        self.assertEqual(offsets["Base_p1"], 0)
+
+    def test_phase_configs_cover_every_run_at_its_rate(self):
+        cfg = _cfg()
+        phases = phase_configs(cfg)
+        self.assertEqual(len(phases), 2)
+        counts = {}
+        for phase_cfg in phases:
+            for run in expand_runs(phase_cfg):
+                counts[run.name] = counts.get(run.name, 0) + 1
+        self.assertEqual(counts, {
+            "Base p1": 2, "Base p2": 2, "HeavyA p1": 1, "HeavyB p1": 1,
+        })
+        full = create_schedule(cfg).total_duration
+        for phase_cfg in phases:
+            self.assertLess(create_schedule(phase_cfg).total_duration, full)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from incremental import reschedule_incremental, schedules_to_baseline
+from models import ScenarioType
+from outage import apply_outage, parse_offline, repack_affected
+from scheduler import create_schedule, expand_runs
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg():
+    return _config(
+        pods=[
+            _pod("p1", "m1", load="l1", db="db"),
+            _pod("p2", "m2", load="l2", db="db"),
+            _pod("p3", "m3", load="l3"),
+        ],
+        scenarios=[
+            _scn("Dual", ScenarioType.DUAL, ["p1", "p2"], runtime=30),
+            _scn("Triple", ScenarioType.TRIPLE, ["p1", "p2"], runtime=20),
+        ],
+    )
+
+
+class TestParseOffline(unittest.TestCase):
+    def test_strips_and_dedupes(self):
+        self.assertEqual(parse_offline(" b,a,,b "), ["a", "b"])
+
+
+class TestApplyOutage(unittest.TestCase):
+    def test_only_runs_touching_offline_machines_are_lost(self):
+        cfg, report = apply_outage(_cfg(), ["db"])
+        names = sorted(r.name for r in expand_runs(cfg))
+        self.assertEqual(names, ["Dual p1", "Dual p2"])
+        self.assertEqual(report.lost, ["Triple p1", "Triple p2"])
+
+    def test_reroutes_to_fallback_pod(self):
+        cfg = _cfg()
+        cfg.scenarios[0].fallback_pods = ["p1", "p3"]
+        new_cfg, report = apply_outage(cfg, ["l2"])
+        self.assertEqual(report.rerouted, [("Dual", "p2", "p3")])
+        self.assertEqual(report.lost, ["Triple p2"])
+        self.assertEqual(new_cfg.scenarios[0].pods, ["p1", "p3"])
+
+    def test_fallback_lacking_role_is_skipped(self):
+        cfg = _cfg()
+        cfg.scenarios[1].fallback_pods = ["p3"]  # no db machine
+        _, report = apply_outage(cfg, ["m2"])
+        self.assertEqual(report.rerouted, [])
+        self.assertEqual(report.lost, ["Dual p2", "Triple p2"])
+
+    def test_input_config_is_not_mutated(self):
+        cfg = _cfg()
+        apply_outage(cfg, ["db"])
+        self.assertEqual(cfg.scenarios[1].pods, ["p1", "p2"])
+
+    def test_repack_keeps_unaffected_runs_in_place(self):
+        cfg = _cfg()
+        baseline = schedules_to_baseline([create_schedule(cfg)])
+        new_cfg, _ = apply_outage(cfg, ["l2"])
+        schedules, report = reschedule_incremental(new_cfg, baseline)
+        self.assertEqual(report.moved, [])
+        self.assertEqual(sorted(report.removed), ["Dual_p2", "Triple_p2"])
+        self.assertEqual(sum(s.total_runs for s in schedules), 2)
+
+
+class TestRepackAffected(unittest.TestCase):
+    def _plan(self, offline):
+        cfg = _cfg()
+        cfg.scenarios.append(_scn("Solo", ScenarioType.SINGLE, ["p3"], 10))
+        baseline = [
+            [["Dual_p1", "Dual_p2"]],
+            [["Triple_p1"], ["Triple_p2"]],
+            [["Solo_p3"]],
+        ]
+        new_cfg, _ = apply_outage(cfg, offline)
+        schedules, _ = reschedule_incremental(new_cfg, baseline)
+        return new_cfg, baseline, schedules
+
+    def test_only_changed_yamls_are_repacked(self):
+        cfg, baseline, schedules = self._plan(["m2"])
+        repacked, affected = repack_affected(cfg, baseline, schedules)
+        self.assertEqual(affected, [0, 1])
+        self.assertIs(repacked[2], schedules[2])
+        self.assertEqual(
+            sorted(r.name for s in repacked[:2] for st in s.stages
+                   for r in st.runs),
+            ["Dual p1", "Triple p1"],
+        )
+
+    def test_untouched_plan_is_kept(self):
+        cfg, baseline, schedules = self._plan(["unused"])
+        self.assertEqual(
+            repack_affected(cfg, baseline, schedules), (schedules, [])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from config_loader import ConfigError, load_config
+from models import ScenarioType
+from pareto import Candidate, explore, pareto_front, step_cron, write_settings
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cand(makespan, daily, overrun, queues=("q1",), yamls=1, offset=0):
+    return Candidate(
+        yaml_count=yamls, offset_hours=offset, schedule="0 3 * * *",
+        queues=list(queues), makespan=makespan, daily_runs=daily,
+        overrun=overrun,
+    )
+
+
+_CONFIG = """{
+    "metadata": {
+        "name": "t",
+        "schedule": "0 3/12 * * *",
+        "queues": [
+            "a",
+            "b"
+        ],
+        "yaml_generation": {
+            "target_yaml_count": 2,
+            "schedule_offset_hours": 6
+        }
+    },
+    "pods": [
+        { "name": "p1", "machines": { "sut": "m1" }, "profiles": { "sut": "m1-app" } }
+    ],
+    "scenarios": [
+        { "name": "A", "template": "a.yml", "type": 1, "pods": ["p1"] }
+    ]
+}
+"""
+
+
+class TestStepCron(unittest.TestCase):
+    def test_keeps_first_trigger(self):
+        self.assertEqual(step_cron("0 3/12 * * *", 6), "0 3/6 * * *")
+        self.assertEqual(step_cron("0 3/12 * * *", 24), "0 3 * * *")
+        self.assertEqual(step_cron("30 9 * * *", 4), "30 1/4 * * *")
+
+
+class TestParetoFront(unittest.TestCase):
+    def test_drops_dominated_and_duplicates(self):
+        front = pareto_front([
+            _cand(100, 2, 0),
+            _cand(100, 2, 0, queues=("q1", "q2")),
+            _cand(120, 2, 0),           # dominated: slower, same cadence
+            _cand(80, 4, 30),           # faster and more often, but overruns
+            _cand(90, 1, 0),
+        ])
+        self.assertEqual(
+            [(c.makespan, c.daily_runs, c.overrun) for c in front],
+            [(80, 4, 30), (100, 2, 0), (90, 1, 0)],
+        )
+        # Of two equal scores, the one with fewer queues is kept.
+        self.assertEqual(front[1].queues, ["q1"])
+
+
+class TestExplore(unittest.TestCase):
+    def test_more_yamls_shorten_makespan(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=300),
+                _scn("B", ScenarioType.SINGLE, ["p1"], runtime=300),
+            ],
+        )
+        found = explore(cfg, max_yamls=2)
+        twice = [
+            c for c in found
+            if c.schedule == "0 3/12 * * *" and len(c.queues) == 1
+        ]
+        by_count = {c.yaml_count: c for c in twice if c.offset_hours in (0, 6)}
+        self.assertEqual(by_count[1].makespan, 600)
+        self.assertEqual(by_count[2].makespan, 300)
+        self.assertEqual(by_count[2].daily_runs, 2)
+        self.assertEqual(by_count[2].overrun, 0)
+        self.assertEqual(by_count[1].overrun, 0)
+        front = pareto_front(found)
+        self.assertTrue(all(c.overrun == 0 or c.daily_runs > 2
+                            for c in front))
+
+
+class TestWriteSettings(unittest.TestCase):
+    def test_rewrites_values_and_keeps_layout(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "c.json")
+            with open(path, "w") as f:
+                f.write(_CONFIG)
+            cand = _cand(0, 0, 0, queues=("a",), yamls=3, offset=4)
+            cand.schedule = "0 1/8 * * *"
+            write_settings(path, cand)
+            with open(path) as f:
+                text = f.read()
+            cfg = load_config(path)
+        self.assertEqual(cfg.schedule, "0 1/8 * * *")
+        self.assertEqual(cfg.queues, ["a"])
+        self.assertEqual(cfg.target_yaml_count, 3)
+        self.assertEqual(cfg.schedule_offset_hours, 4)
+        self.assertIn('"queues": [\n            "a"\n        ],', text)
+        self.assertIn('{ "name": "p1", "machines": { "sut": "m1" }', text)
+
+    def test_missing_setting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "c.json")
+            with open(path, "w") as f:
+                f.write(_CONFIG.replace(
+                    ',\n            "schedule_offset_hours": 6', ""
+                ))
+            with self.assertRaises(ConfigError):
+                write_settings(path, _cand(0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
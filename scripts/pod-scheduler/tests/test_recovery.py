@@ -0,0 +1,133 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+import main
+from models import ScenarioType
+from recovery import create_recovery_schedule, load_results
+from scheduler import SchedulerError
+from tests.test_scheduler import _config, _pod, _scn
+
+
+_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build",
+    "benchmarks_ci_pods.json",
+)
+
+def _write(tmp, payload):
+    path = os.path.join(tmp, "results.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    return path
+
+
+class TestLoadResults(unittest.TestCase):
+    def test_accepts_mapping_list_and_jobs_wrapper(self):
+        expected = {"A_p1": "failed", "B_p1": "succeeded"}
+        payloads = [
+            {"A_p1": "Failed", "B_p1": "succeeded"},
+            [
+                {"job_id": "A_p1", "status": "failed"},
+                {"job_id": "B_p1", "status": "succeeded"},
+            ],
+            {"jobs": [
+                {"identifier": "A_p1", "result": "failed"},
+                {"identifier": "B_p1", "result": "succeeded"},
+            ]},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for payload in payloads:
+                self.assertEqual(load_results(_write(tmp, payload)), expected)
+
+    def test_entry_without_status_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = _write(tmp, [{"job_id": "A_p1"}])
+            with self.assertRaises(SchedulerError):
+                load_results(path)
+
+
+class TestCreateRecoverySchedule(unittest.TestCase):
+    def test_only_failed_runs_are_scheduled(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1", "p2"], runtime=30),
+                _scn("B", ScenarioType.SINGLE, ["p1", "p2"], runtime=20),
+            ],
+        )
+        results = {
+            "A_p1": "failed",
+            "A_p2": "succeeded",
+            "B_p1": "canceled",
+            "B_p2": "timed_out",
+            "Gone_p9": "failed",
+        }
+        schedule, unknown = create_recovery_schedule(cfg, results)
+        names = sorted(r.name for st in schedule.stages for r in st.runs)
+        self.assertEqual(names, ["A p1", "B p1", "B p2"])
+        self.assertEqual(unknown, ["Gone_p9"])
+        self.assertEqual(schedule.total_duration, 50)
+
+    def test_jobs_skipped_by_a_gate_are_rerun(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("Build", ScenarioType.SINGLE, ["p1"], runtime=5),
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=30),
+            ],
+        )
+        schedule, _ = create_recovery_schedule(
+            cfg, {"Build_p1": "failed", "A_p1": "skipped"}
+        )
+        names = sorted(r.name for st in schedule.stages for r in st.runs)
+        self.assertEqual(names, ["A p1", "Build p1"])
+
+    def test_nothing_failed_gives_empty_schedule(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[_scn("A", ScenarioType.SINGLE, ["p1"])],
+        )
+        schedule, unknown = create_recovery_schedule(cfg, {"A_p1": "succeeded"})
+        self.assertEqual(schedule.total_runs, 0)
+        self.assertEqual(unknown, [])
+
+
+class TestRecoveryCli(unittest.TestCase):
+    def _main(self, tmp, *flags):
+        results = _write(tmp, {"Grpc_gold_win": "failed"})
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            return main.main([
+                "--config", _CONFIG, "--rerun-failed", results,
+                "--base-name", "x", "--yaml-output", tmp, *flags,
+            ])
+
+    def test_regen_command_keeps_the_other_flags(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                self._main(tmp, "--backfill", "--join-jobs",
+                           "--pod-health", "Build"),
+                0,
+            )
+            with open(os.path.join(tmp, "x-recovery.yml"),
+                      encoding="utf-8") as f:
+                header = f.read().split("\n\n")[0]
+            for flag in ("--backfill", "--join-jobs", "--pod-health",
+                         "--rerun-failed"):
+                self.assertIn(flag, header)
+
+    def test_risk_quantile_is_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(self._main(tmp, "--risk-quantile", "0.9"), 1)
+            self.assertFalse(os.path.exists(
+                os.path.join(tmp, "x-recovery.yml")
+            ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from health import pod_gates
+from models import ChainedRun, HealthSettings, ScenarioType
+from risk import (
+    Sampler,
+    quantile,
+    quantile_pack,
+    refine,
+    risk_pack,
+    risk_report,
+    risk_schedule,
+)
+from scheduler import (
+    SchedulerError,
+    create_schedule,
+    expand_runs,
+    pack_runs,
+)
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _mixed_cfg():
+    # Two stable and two volatile runs of the same mean on four machines.
+    # By name, the stage engine pairs each volatile run with a stable one.
+    pods = [_pod(f"p{i}", f"m{i}") for i in range(4)]
+    scenarios = []
+    for i, (name, std) in enumerate([("A", 0), ("B", 20), ("C", 0),
+                                     ("D", 20)]):
+        scn = _scn(name, ScenarioType.SINGLE, [f"p{i}"], runtime=30)
+        scn.runtime_stddev = std
+        scenarios.append(scn)
+    return _config(pods=pods, scenarios=scenarios)
+
+
+class TestSampler(unittest.TestCase):
+    def test_quantile_is_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual(quantile(values, 0.9), 9)
+        self.assertEqual(quantile(values, 0.5), 5)
+        self.assertEqual(quantile([7.0], 0.99), 7.0)
+
+    def test_deterministic_runs_draw_their_estimate(self):
+        run = expand_runs(_mixed_cfg())[0]
+        self.assertEqual(Sampler(samples=5).draws(run), [30.0] * 5)
+
+    def test_lognormal_matches_mean_and_is_reproducible(self):
+        run = expand_runs(_mixed_cfg())[1]
+        draws = Sampler(samples=4000, seed=1).draws(run)
+        self.assertAlmostEqual(sum(draws) / len(draws), 30, delta=1.5)
+        self.assertGreater(max(draws), 60)
+        self.assertEqual(draws, Sampler(samples=4000, seed=1).draws(run))
+        self.assertNotEqual(draws, Sampler(samples=4000, seed=2).draws(run))
+
+    def test_history_spread_is_centred_on_the_estimate(self):
+        run = expand_runs(_mixed_cfg())[0]
+        sampler = Sampler(samples=2000, history={"A_p0": [10, 30]})
+        draws = sampler.draws(run)
+        self.assertEqual(set(draws), {20.0, 40.0})
+
+    def test_makespan_sums_stage_maxima(self):
+        sampler = Sampler(samples=3, history={"B_p1": [10, 50]})
+        sched = pack_runs(expand_runs(_mixed_cfg()), 2)
+        for span, stage_a, stage_b in zip(
+            sampler.makespans(sched),
+            sampler.stage_draws(sched.stages[0]),
+            sampler.stage_draws(sched.stages[1]),
+        ):
+            self.assertEqual(span, stage_a + stage_b)
+
+    def test_rejects_no_samples(self):
+        with self.assertRaises(SchedulerError):
+            Sampler(samples=0)
+
+
+class TestRiskPack(unittest.TestCase):
+    def test_lowers_the_quantile(self):
+        cfg = _mixed_cfg()
+        sampler = Sampler(samples=500, seed=3)
+        baseline = quantile(sampler.makespans(create_schedule(cfg)), 0.9)
+        sched = risk_pack(expand_runs(cfg), 2, sampler, 0.9, 200)
+        self.assertLess(quantile(sampler.makespans(sched), 0.9), baseline)
+        # Volatile runs share a stage, so only one stage carries spread.
+        stages = [{r.scenario.name for r in st.runs} for st in sched.stages]
+        self.assertIn({"B", "D"}, stages)
+
+    def test_refine_keeps_constraints(self):
+        cfg = _mixed_cfg()
+        cfg.scenarios[3].after = ["B"]
+        cfg.scenarios[3].pods = ["p1"]
+        sampler = Sampler(samples=200)
+        start = pack_runs(expand_runs(cfg), 2)
+        sched = refine(start, 2, sampler, 0.9, 300)
+        stage_of = {
+            r.job_name: i for i, st in enumerate(sched.stages)
+            for r in st.runs
+        }
+        self.assertLess(stage_of["B_p1"], stage_of["D_p1"])
+        for stage in sched.stages:
+            self.assertLessEqual(len(stage.runs), 2)
+            machines = [m for r in stage.runs for m in r.machines_used]
+            self.assertEqual(len(machines), len(set(machines)))
+
+    def test_quantile_pack_restores_the_estimates(self):
+        build = _scn("Build", ScenarioType.SINGLE, ["p1"], runtime=10)
+        use = _scn("Use", ScenarioType.SINGLE, ["p1"], runtime=40)
+        plain = _scn("Plain", ScenarioType.SINGLE, ["p1"], runtime=20)
+        for scn in (build, use, plain):
+            scn.runtime_stddev = 10
+        use.reuses = {"Build": 5}
+        cfg = _config(pods=[_pod("p1", "m1")], scenarios=[build, use, plain])
+        sched = quantile_pack(expand_runs(cfg), 2, Sampler(samples=200))
+        minutes = {
+            r.job_name: r.estimated_runtime
+            for st in sched.stages for r in st.runs
+        }
+        # Use keeps its reuse discount, but not the quantile inflation.
+        self.assertEqual(minutes, {"Build_p1": 10, "Use_p1": 35,
+                                   "Plain_p1": 20})
+
+    def test_invalid_quantile(self):
+        with self.assertRaises(SchedulerError):
+            risk_schedule(_mixed_cfg(), q=1.0)
+
+    def test_fillers_use_idle_time(self):
+        filler = _scn("F", ScenarioType.SINGLE, ["p2"], runtime=40)
+        filler.filler = True
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Long", ScenarioType.SINGLE, ["p1"], runtime=90),
+                _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=30),
+                filler,
+            ],
+        )
+        sched = risk_schedule(cfg, samples=50, iterations=10)
+        lanes = [
+            [p.name for p in (r.parts if isinstance(r, ChainedRun) else [r])]
+            for st in sched.stages for r in st.runs
+        ]
+        self.assertIn(["Short p2", "F p2"], lanes)
+        self.assertEqual(sched.total_duration, 90)
+
+    def test_sentinels_run_first(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Build", ScenarioType.SINGLE, ["p1", "p2"], runtime=5),
+                _scn("A", ScenarioType.SINGLE, ["p2"], runtime=30),
+                _scn("C", ScenarioType.SINGLE, ["p1"], runtime=20),
+                _scn("D", ScenarioType.SINGLE, ["p1"], runtime=20),
+            ],
+        )
+        cfg.health = HealthSettings(sentinels=["Build"])
+        sched = risk_schedule(cfg, samples=50, iterations=10)
+        self.assertEqual(
+            pod_gates([sched], cfg.health),
+            {"A_p2": "Build_p2", "C_p1": "Build_p1", "D_p1": "Build_p1"},
+        )
+
+    def test_report_counts_overruns(self):
+        cfg = _mixed_cfg()
+        cfg.schedule = "0 3 * * *"
+        sched = risk_schedule(cfg, samples=200, iterations=50)
+        [(name, mean, span, window, overrun)] = risk_report(
+            cfg, [sched], Sampler(samples=200), 0.9, "t"
+        )
+        self.assertEqual((name, window, overrun), ("t YAML 1", 1440, 0.0))
+        self.assertGreaterEqual(span, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
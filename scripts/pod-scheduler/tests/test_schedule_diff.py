@@ -0,0 +1,106 @@
+import copy
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from config_loader import ConfigError
+from freshness import cron_headroom
+from models import ScenarioType
+from schedule_diff import (
+    Revision,
+    diff_revisions,
+    plan_outputs,
+    read_config,
+)
+from tests.test_scheduler import _config, _pod, _scn
+
+
+def _cfg():
+    cfg = _config(
+        pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("A", ScenarioType.SINGLE, ["p1"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p2"], runtime=40),
+            _scn("C", ScenarioType.SINGLE, ["p1", "p2"], runtime=30),
+        ],
+    )
+    cfg.schedule_offset_hours = 6
+    return cfg
+
+
+def _revision(label, cfg):
+    return Revision(label=label, config=cfg, outputs=plan_outputs(cfg))
+
+
+class TestCronHeadroom(unittest.TestCase):
+    def test_window_is_time_to_next_trigger(self):
+        cfg = _cfg()
+        cfg.target_yaml_count = 2
+        # 0 3/12 with a 6h offset fires every 6h across the two YAMLs.
+        room = cron_headroom(plan_outputs(cfg), 6)
+        self.assertEqual(set(room), {"benchmarks-ci YAML 1",
+                                     "benchmarks-ci YAML 2"})
+        self.assertEqual(room["benchmarks-ci YAML 1"], 360 - 60)
+        self.assertEqual(room["benchmarks-ci YAML 2"], 360 - 30)
+
+    def test_single_yaml_gets_the_whole_cycle(self):
+        cfg = _cfg()
+        cfg.target_yaml_count = 1
+        room = cron_headroom(plan_outputs(cfg), 6)
+        self.assertEqual(room["benchmarks-ci YAML 1"], 720 - 90)
+
+    def test_colliding_triggers_overrun(self):
+        cfg = _cfg()
+        cfg.target_yaml_count = 3
+        cfg.scenarios.append(_scn("D", ScenarioType.SINGLE, ["p2"], 5))
+        # Offsets 0/6/12h on a 12h cron: YAML 3 fires with YAML 1.
+        room = cron_headroom(plan_outputs(cfg), 6)
+        self.assertLess(room["benchmarks-ci YAML 1"], 0)
+
+
+class TestDiffRevisions(unittest.TestCase):
+    def test_identical_configs(self):
+        diff = diff_revisions(_revision("a", _cfg()), _revision("b", _cfg()))
+        self.assertEqual((diff.added, diff.removed, diff.moved), ([], [], []))
+        self.assertEqual(diff.old.makespan, diff.new.makespan)
+        for before, after in diff.utilization.values():
+            self.assertEqual(before, after)
+
+    def test_added_removed_and_makespan(self):
+        new = copy.deepcopy(_cfg())
+        new.scenarios[2].pods = ["p2"]
+        new.scenarios.append(_scn("D", ScenarioType.SINGLE, ["p1"], 700))
+        diff = diff_revisions(_revision("a", _cfg()), _revision("b", new))
+        self.assertEqual(diff.added, ["D p1"])
+        self.assertEqual(diff.removed, ["C p1"])
+        # D + B, then A + C p2; one YAML gets the full 12h cycle.
+        self.assertEqual(diff.old.makespan, 90)
+        self.assertEqual(diff.new.makespan, 760)
+        before, after = diff.headroom["benchmarks-ci YAML 1"]
+        self.assertLess(after, 0)
+        self.assertGreater(before, 0)
+
+    def test_stage_renumbering_is_not_a_move(self):
+        new = copy.deepcopy(_cfg())
+        new.pods["p3"] = _pod("p3", "m3")
+        new.scenarios.append(_scn("D", ScenarioType.SINGLE, ["p3"], 5))
+        diff = diff_revisions(_revision("a", _cfg()), _revision("b", new))
+        self.assertEqual(diff.added, ["D p3"])
+        self.assertEqual(diff.moved, [])
+
+    def test_moved_when_stage_mates_change(self):
+        new = copy.deepcopy(_cfg())
+        new.scenarios[1].estimated_runtime = 20
+        new.scenarios[2].estimated_runtime = 50
+        diff = diff_revisions(_revision("a", _cfg()), _revision("b", new))
+        self.assertIn("B p2", [name for name, _, _ in diff.moved])
+
+
+class TestReadConfig(unittest.TestCase):
+    def test_bad_git_ref(self):
+        with self.assertRaises(ConfigError):
+            read_config("no-such-ref-xyz:build/benchmarks_ci_pods.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,9 @@ import unittest
 import tests  # noqa: F401  # ensures sys.path is set up
 
 from models import (
+    ChainedRun,
+    CoalescedRun,
+    CoalesceSettings,
     PipelineSettings,
     Pod,
     Scenario,
@@ -12,9 +15,20 @@ from models import (
     Stage,
 )
 from scheduler import (
+    Rejection,
     SchedulerError,
+    backfill_schedule,
+    coalesce_runs,
+    completion_times,
     create_schedule,
     expand_runs,
+    fill_idle,
+    machine_masks,
+    makespan_lower_bound,
+    pack_runs,
+    order_stages_by_priority,
+    pack_runs_optimal,
+    sequence_links,
     split_schedule,
 )
 
@@ -134,6 +148,325 @@ class TestCreateSchedule(unittest.TestCase):
         self.assertEqual(names_of(s1), names_of(s2))
 
 
+class TestPackRunsOptimal(unittest.TestCase):
+    def _cfg(self):
+        return _config(
+            pods=[
+                _pod("pa", "a"), _pod("pd", "d"),
+                _pod("pac", "a", load="c"), _pod("pcd", "c", load="d"),
+            ],
+            scenarios=[
+                _scn("S0", ScenarioType.SINGLE, ["pa"], runtime=20),
+                _scn("S1", ScenarioType.SINGLE, ["pa"], runtime=5),
+                _scn("S2", ScenarioType.SINGLE, ["pd"], runtime=10),
+                _scn("S3", ScenarioType.DUAL, ["pac"], runtime=10),
+                _scn("S4", ScenarioType.DUAL, ["pcd"], runtime=10),
+            ],
+        )
+
+    def test_beats_greedy_when_greedy_blocks(self):
+        runs = expand_runs(self._cfg())
+        self.assertEqual(pack_runs(runs, 2).total_duration, 40)
+        optimal = pack_runs_optimal(runs, 2)
+        self.assertEqual(optimal.total_duration, 35)
+        self.assertEqual(optimal.total_runs, 5)
+        for stage in optimal.stages:
+            self.assertLessEqual(len(stage.runs), 2)
+            used = [m for r in stage.runs for m in r.machines_used]
+            self.assertEqual(len(used), len(set(used)))
+
+    def test_exhausted_budget_falls_back_to_greedy(self):
+        runs = expand_runs(self._cfg())
+        self.assertEqual(
+            pack_runs_optimal(runs, 2, node_budget=0).total_duration, 40
+        )
+
+
+class TestCoalescing(unittest.TestCase):
+    def _cfg(self, overhead=5.0, coalesce=CoalesceSettings(10, 30)):
+        cfg = _config(
+            pods=[_pod("p1", "m1", load="l1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Build", ScenarioType.SINGLE, ["p1", "p2"], runtime=1),
+                _scn("Crossgen", ScenarioType.DUAL, ["p1"], runtime=5),
+                _scn("Long", ScenarioType.SINGLE, ["p1", "p2"], runtime=60),
+            ],
+        )
+        cfg.job_overhead_minutes = overhead
+        cfg.coalesce = coalesce
+        return cfg
+
+    def test_overhead_added_per_job(self):
+        runs = expand_runs(self._cfg())
+        self.assertEqual(
+            sorted(r.estimated_runtime for r in runs), [6, 6, 10, 65, 65]
+        )
+
+    def test_short_runs_on_same_pod_merge(self):
+        cfg = self._cfg()
+        merged = coalesce_runs(
+            expand_runs(cfg), cfg.coalesce, cfg.job_overhead_minutes
+        )
+        combined = [r for r in merged if isinstance(r, CoalescedRun)]
+        self.assertEqual(len(combined), 1)
+        job = combined[0]
+        self.assertEqual(job.name, "Build + Crossgen p1")
+        self.assertEqual(job.job_name, "Build_Crossgen_p1")
+        self.assertEqual(job.estimated_runtime, 11)
+        self.assertEqual(job.machines_used, {"m1", "l1"})
+        # The lone short run on p2 stays a plain run.
+        self.assertIn("Build p2", [r.name for r in merged])
+
+    def test_job_cap_limits_merge(self):
+        cfg = self._cfg(coalesce=CoalesceSettings(10, 5))
+        merged = coalesce_runs(
+            expand_runs(cfg), cfg.coalesce, cfg.job_overhead_minutes
+        )
+        self.assertFalse(any(isinstance(r, CoalescedRun) for r in merged))
+
+    def test_schedule_uses_merged_jobs_and_saves_overhead(self):
+        plain = create_schedule(self._cfg(coalesce=None))
+        merged = create_schedule(self._cfg())
+        self.assertEqual(plain.total_runs, 5)
+        self.assertEqual(merged.total_runs, 4)
+        self.assertLess(merged.total_duration, plain.total_duration)
+
+
+class TestBackfill(unittest.TestCase):
+    def _cfg(self):
+        return _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2")],
+            scenarios=[
+                _scn("Long", ScenarioType.SINGLE, ["p1"], runtime=90),
+                _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=5),
+                _scn("Mid", ScenarioType.SINGLE, ["p2"], runtime=60),
+                _scn("Tiny", ScenarioType.SINGLE, ["p2"], runtime=20),
+            ],
+        )
+
+    def test_short_runs_chain_into_idle_lane(self):
+        plain = create_schedule(self._cfg())
+        self.assertEqual(plain.total_duration, 90 + 20 + 5)
+        filled = backfill_schedule(plain)
+        self.assertEqual(len(filled.stages), 1)
+        self.assertEqual(filled.total_duration, 90)
+        chain = filled.stages[0].runs[1]
+        self.assertIsInstance(chain, ChainedRun)
+        self.assertEqual(
+            [p.name for p in chain.parts], ["Mid p2", "Tiny p2", "Short p2"]
+        )
+        self.assertEqual(chain.estimated_runtime, 85)
+
+    def test_never_lengthens_a_stage(self):
+        cfg = self._cfg()
+        cfg.scenarios[0].estimated_runtime = 10
+        plain = create_schedule(cfg)
+        filled = backfill_schedule(plain)
+        self.assertLessEqual(filled.total_duration, plain.total_duration)
+        for stage in filled.stages:
+            for run in stage.runs:
+                self.assertLessEqual(run.estimated_runtime, stage.duration)
+
+    def test_chained_runs_respect_other_lanes(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1", load="l"), _pod("p2", "m2", load="l")],
+            scenarios=[
+                _scn("Long", ScenarioType.DUAL, ["p1"], runtime=90),
+                _scn("Head", ScenarioType.SINGLE, ["p2"], runtime=10),
+                _scn("Dual", ScenarioType.DUAL, ["p2"], runtime=10),
+            ],
+        )
+        filled = backfill_schedule(create_schedule(cfg))
+        self.assertFalse(any(
+            isinstance(r, ChainedRun) for st in filled.stages for r in st.runs
+        ))
+
+    def test_config_flag_enables_backfill(self):
+        cfg = self._cfg()
+        cfg.backfill = True
+        self.assertEqual(create_schedule(cfg).total_duration, 90)
+
+
+class TestFillers(unittest.TestCase):
+    def _cfg(self, queues=("q1", "q2")):
+        scenarios = [
+            _scn("Long", ScenarioType.SINGLE, ["p1"], runtime=90),
+            _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=30),
+            _scn("F1", ScenarioType.SINGLE, ["p2"], runtime=40),
+            _scn("F2", ScenarioType.SINGLE, ["p2"], runtime=30),
+            _scn("F3", ScenarioType.SINGLE, ["p3"], runtime=60),
+            _scn("Huge", ScenarioType.SINGLE, ["p3"], runtime=100),
+        ]
+        for scn in scenarios[2:]:
+            scn.filler = True
+        return _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+            scenarios=scenarios,
+            queues=queues,
+        )
+
+    def _names(self, sched):
+        return [
+            [p.name for p in (r.parts if isinstance(r, ChainedRun) else [r])]
+            for st in sched.stages for r in st.runs
+        ]
+
+    def test_fillers_are_not_packed(self):
+        self.assertEqual(
+            [r.name for r in expand_runs(self._cfg())],
+            ["Long p1", "Short p2"],
+        )
+        self.assertEqual(
+            len(expand_runs(self._cfg(), filler=True)), 4
+        )
+
+    def test_fillers_only_use_idle_time(self):
+        sched = create_schedule(self._cfg())
+        self.assertEqual(sched.total_duration, 90)
+        # F2 no longer fits behind F1, and every queue is taken.
+        self.assertEqual(
+            self._names(sched), [["Long p1"], ["Short p2", "F1 p2"]]
+        )
+
+    def test_free_queue_takes_a_filler(self):
+        sched = create_schedule(self._cfg(queues=("q1", "q2", "q3")))
+        self.assertEqual(sched.total_duration, 90)
+        self.assertIn(["F3 p3"], self._names(sched))
+        self.assertNotIn(["Huge p3"], self._names(sched))
+
+    def test_priority_goes_first(self):
+        cfg = self._cfg()
+        cfg.scenarios[3].priority = 1
+        self.assertEqual(
+            self._names(create_schedule(cfg))[1], ["Short p2", "F2 p2"]
+        )
+
+    def test_never_lengthens_a_stage(self):
+        cfg = self._cfg(queues=("q1", "q2", "q3"))
+        plain = create_schedule(cfg)
+        fillers = expand_runs(cfg, filler=True)
+        filled = fill_idle(plain, fillers * 2, 3)
+        self.assertEqual(
+            [st.duration for st in filled.stages],
+            [st.duration for st in plain.stages],
+        )
+
+
+class TestPriorityOrdering(unittest.TestCase):
+    def _cfg(self, priority=0):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("Long", ScenarioType.SINGLE, ["p1"], runtime=90),
+                _scn("Mid", ScenarioType.SINGLE, ["p1"], runtime=30),
+                _scn("Key", ScenarioType.SINGLE, ["p1"], runtime=40),
+            ],
+        )
+        cfg.scenarios[2].priority = priority
+        return cfg
+
+    def _order(self, sched):
+        return [st.runs[0].scenario.name for st in sched.stages]
+
+    def test_no_priorities_keeps_ljf_order(self):
+        sched = create_schedule(self._cfg())
+        self.assertEqual(self._order(sched), ["Long", "Key", "Mid"])
+
+    def test_priority_stage_moves_first_without_cost(self):
+        plain = create_schedule(self._cfg())
+        sched = create_schedule(self._cfg(priority=2))
+        self.assertEqual(self._order(sched), ["Key", "Long", "Mid"])
+        self.assertEqual(sched.total_duration, plain.total_duration)
+
+    def test_smiths_rule_weighs_duration(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[
+                _scn("Heavy", ScenarioType.SINGLE, ["p1"], runtime=100),
+                _scn("Light", ScenarioType.SINGLE, ["p1"], runtime=10),
+            ],
+        )
+        cfg.scenarios[0].priority = 2
+        cfg.scenarios[1].priority = 1
+        sched = order_stages_by_priority(create_schedule(cfg))
+        # 10/1 < 100/2, so the short stage goes first.
+        self.assertEqual(self._order(sched), ["Light", "Heavy"])
+
+    def test_completion_times_follow_stage_barriers(self):
+        sched = create_schedule(self._cfg())
+        finishes = {r.name: t for r, t in completion_times(sched)}
+        self.assertEqual(
+            finishes, {"Long p1": 90, "Key p1": 130, "Mid p1": 160}
+        )
+
+
+class TestRejections(unittest.TestCase):
+    def test_records_machine_and_queue_reasons(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1", "p2"], runtime=50),
+                _scn("B", ScenarioType.SINGLE, ["p1"], runtime=30),
+                _scn("C", ScenarioType.SINGLE, ["p3"], runtime=20),
+            ],
+        )
+        rejections = []
+        sched = create_schedule(cfg, rejections=rejections)
+        self.assertEqual(sched.total_duration, 80)
+        self.assertEqual(
+            [(r.run.name, r.stage, r.machines, r.queue_full)
+             for r in rejections],
+            [
+                ("B p1", 0, {"m1"}, True),
+                ("C p3", 0, set(), True),
+            ],
+        )
+        self.assertIsInstance(rejections[0], Rejection)
+
+
+class TestMachineMasks(unittest.TestCase):
+    def test_shared_machines_share_bits(self):
+        cfg = _config(
+            pods=[
+                _pod("p1", "m1", load="l"),
+                _pod("p2", "m2", load="l"),
+                _pod("p3", "m3"),
+            ],
+            scenarios=[
+                _scn("A", ScenarioType.DUAL, ["p1", "p2"]),
+                _scn("B", ScenarioType.SINGLE, ["p3"]),
+            ],
+        )
+        runs = expand_runs(cfg)
+        a, b, c = machine_masks(runs)
+        self.assertTrue(a & b)
+        self.assertFalse(a & c)
+        self.assertFalse(b & c)
+        self.assertEqual(bin(a).count("1"), 2)
+
+
+class TestLowerBound(unittest.TestCase):
+    def test_busiest_machine_or_queue_spread(self):
+        cfg = _config(
+            pods=[_pod("p1", "m1"), _pod("p2", "m2"), _pod("p3", "m3")],
+            scenarios=[
+                _scn("A", ScenarioType.SINGLE, ["p1"], runtime=50),
+                _scn("B", ScenarioType.SINGLE, ["p1"], runtime=30),
+                _scn("C", ScenarioType.SINGLE, ["p2", "p3"], runtime=40),
+            ],
+        )
+        runs = expand_runs(cfg)
+        # m1 carries 80 min; 160 min over two queues is also 80.
+        self.assertEqual(makespan_lower_bound(runs, 2), 80)
+        self.assertEqual(makespan_lower_bound(runs, 1), 160)
+        self.assertLessEqual(
+            makespan_lower_bound(runs, 2), create_schedule(cfg).total_duration
+        )
+
+    def test_empty(self):
+        self.assertEqual(makespan_lower_bound([], 2), 0.0)
+
+
 class TestSplitSchedule(unittest.TestCase):
     def test_single_target_returns_input(self):
         sched = Schedule(stages=[Stage(runs=[])])
@@ -156,5 +489,89 @@ class TestSplitSchedule(unittest.TestCase):
         self.assertEqual(durations, [30, 30])
 
 
+class TestSequencing(unittest.TestCase):
+    def _cfg(self, queues=("q1", "q2")):
+        # Build warms m1 for Grpc on both pods; Crossgen must follow Build.
+        build = _scn("Build", ScenarioType.SINGLE, ["p1"], runtime=20)
+        crossgen = _scn("Crossgen", ScenarioType.SINGLE, ["p1"], runtime=40)
+        crossgen.after = ["Build"]
+        grpc = _scn("Grpc", ScenarioType.DUAL, ["p1", "p2"], runtime=30)
+        grpc.reuses = {"Build": 10}
+        other = _scn("Other", ScenarioType.SINGLE, ["p3"], runtime=50)
+        return _config(
+            pods=[
+                _pod("p1", "m1", load="l1"),
+                _pod("p2", "m1", load="l2"),
+                _pod("p3", "m3"),
+            ],
+            scenarios=[build, crossgen, grpc, other],
+            queues=queues,
+        )
+
+    def _stage_of(self, sched):
+        return {
+            run.job_name: i
+            for i, stage in enumerate(sched.stages) for run in stage.runs
+        }
+
+    def test_links(self):
+        links = sequence_links(expand_runs(self._cfg()))
+        self.assertEqual(sorted(links), ["Crossgen_p1", "Grpc_p1", "Grpc_p2"])
+        # p2 shares p1's SUT machine, so it reuses Build too.
+        [link] = links["Grpc_p2"]
+        self.assertEqual(
+            (link.before.job_name, link.hard, link.discount),
+            ("Build_p1", False, 10),
+        )
+        self.assertEqual(sequence_links(expand_runs(_config(
+            pods=[_pod("p1", "m1")],
+            scenarios=[_scn("A", ScenarioType.SINGLE, ["p1"])],
+        ))), {})
+
+    def test_after_and_reuse_are_honoured(self):
+        sched = create_schedule(self._cfg())
+        stage_of = self._stage_of(sched)
+        self.assertLess(stage_of["Build_p1"], stage_of["Crossgen_p1"])
+        self.assertLess(stage_of["Build_p1"], stage_of["Grpc_p1"])
+        self.assertLess(stage_of["Build_p1"], stage_of["Grpc_p2"])
+        runtimes = {
+            run.job_name: run.estimated_runtime
+            for stage in sched.stages for run in stage.runs
+        }
+        self.assertEqual(runtimes["Grpc_p1"], 20)
+        self.assertEqual(runtimes["Grpc_p2"], 20)
+        self.assertEqual(runtimes["Crossgen_p1"], 40)
+
+    def test_optimal_packing_keeps_the_greedy_order(self):
+        runs = expand_runs(self._cfg())
+        self.assertEqual(
+            pack_runs_optimal(runs, 2).total_duration,
+            pack_runs(runs, 2).total_duration,
+        )
+
+    def test_backfill_keeps_linked_runs(self):
+        sched = backfill_schedule(create_schedule(self._cfg()))
+        stage_of = self._stage_of(sched)
+        self.assertLess(stage_of["Build_p1"], stage_of["Grpc_p1"])
+
+    def test_priority_order_cannot_break_links(self):
+        cfg = self._cfg()
+        cfg.scenarios[2].priority = 5
+        sched = create_schedule(cfg)
+        stage_of = self._stage_of(sched)
+        self.assertLess(stage_of["Build_p1"], stage_of["Grpc_p1"])
+
+    def test_split_keeps_linked_stages_together(self):
+        sched = create_schedule(self._cfg(queues=("q1",)))
+        bins = split_schedule(sched, 3)
+        for job in ("Build_p1", "Crossgen_p1", "Grpc_p1", "Grpc_p2"):
+            self.assertIn(job, self._stage_of(bins[0]))
+
+    def test_lower_bound_counts_discounts(self):
+        runs = expand_runs(self._cfg())
+        # m1 carries 20 + 40 + 2 * (30 - 10) min.
+        self.assertEqual(makespan_lower_bound(runs, 10), 100)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,111 @@
+import os
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from templates import (
+    TemplateError,
+    evaluate,
+    expand,
+    job_arguments,
+    load_template,
+    parse_template,
+)
+
+
+_BUILD = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "build"
+)
+
+_TEXT = """\
+# Test scenarios
+
+parameters:
+  - name: arguments
+    type: string
+    default: ''
+  - name: condition
+    type: string
+    default: 'true' # a comment
+  - name: scenarios
+    type: object
+    default:
+
+    - displayName: "A \\"quoted\\""
+      arguments: --scenario a
+      fast: true
+    - displayName: B
+      arguments: --scenario b
+  - name: sizes
+    type: object
+    default:
+      - displayName: small
+      - displayName: large
+
+steps:
+  - ${{ each s in parameters.scenarios }}:
+    - ${{ each size in parameters.sizes }}:
+      - ${{ if or(s.fast, ne(size.displayName, 'large')) }}:
+        - task: PublishToAzureServiceBus@2
+          enabled: ${{ not(eq(size.displayName, 'SMALL')) }}
+          inputs:
+            messageBody: |
+              {
+                "condition": "(${{ parameters.condition }})",
+                "args": [ "${{ s.arguments }} ${{ parameters.arguments }}" ]
+              }
+  - task: PublishToAzureServiceBus@2
+    inputs:
+      messageBody: |
+        {"args": ["${{ size.displayName }}"]}
+"""
+
+
+class TestExpand(unittest.TestCase):
+    def test_loops_conditions_and_enabled(self):
+        template = parse_template(_TEXT.replace(
+            '  - task: PublishToAzureServiceBus@2\n    inputs:\n'
+            '      messageBody: |\n        {"args": ["${{ size.displayName '
+            '}}"]}\n', ""
+        ))
+        self.assertEqual(
+            template.parameters["scenarios"][0]["displayName"], 'A "quoted"'
+        )
+        messages = expand(template, {"arguments": "--x"})
+        # A keeps only "large" ("small" is disabled); B has no large run.
+        self.assertEqual(messages, [
+            {"condition": "(true)", "args": ["--scenario a --x"]},
+        ])
+
+    def test_unknown_reference_rejected(self):
+        with self.assertRaises(TemplateError):
+            expand(parse_template(_TEXT), {})
+
+    def test_unsupported_function_rejected(self):
+        with self.assertRaises(TemplateError):
+            evaluate("contains(parameters.a, 'b')", {"parameters": {}})
+
+    def test_job_arguments(self):
+        self.assertEqual(job_arguments(["a-app", "b-load"]),
+                         "$(ciProfile) --profile a-app --profile b-load ")
+
+
+class TestShippedTemplates(unittest.TestCase):
+    def test_every_scenario_template_expands(self):
+        names = sorted(n for n in os.listdir(_BUILD)
+                       if n.endswith("-scenarios.yml"))
+        for name in names:
+            messages = expand(load_template(os.path.join(_BUILD, name)),
+                              {"arguments": job_arguments(["p-app"])})
+            self.assertTrue(messages, name)
+            for message in messages:
+                self.assertEqual(message["name"], "crank", name)
+                self.assertIn("--profile p-app", message["args"][0], name)
+
+    def test_missing_template(self):
+        with self.assertRaises(TemplateError):
+            load_template(os.path.join(_BUILD, "missing-scenarios.yml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from models import ScenarioType
+from scheduler import backfill_schedule, create_schedule
+from tests.test_scheduler import _config, _pod, _scn
+from generator import schedule_to_template_data
+from timeline import (
+    TraceRenderer,
+    data_layout,
+    idle_gaps,
+    layout,
+    to_trace_events,
+    write_timeline,
+)
+
+
+def _cfg():
+    return _config(
+        pods=[_pod("p1", "m1", load="l"), _pod("p2", "m2")],
+        scenarios=[
+            _scn("Long", ScenarioType.DUAL, ["p1"], runtime=60),
+            _scn("Short", ScenarioType.SINGLE, ["p2"], runtime=20),
+            _scn("Next", ScenarioType.SINGLE, ["p1"], runtime=10),
+        ],
+    )
+
+
+class TestLayout(unittest.TestCase):
+    def test_stage_barriers_and_placements(self):
+        timeline = layout(create_schedule(_cfg()), ["q1", "q2"])
+        self.assertEqual(timeline.barriers, [0, 60, 70])
+        spans = {p.run.name: (p.queue, p.start, p.end)
+                 for p in timeline.placements}
+        self.assertEqual(spans["Long p1"], ("q1", 0, 60))
+        self.assertEqual(spans["Short p2"], ("q2", 0, 20))
+        self.assertEqual(spans["Next p1"], ("q1", 60, 70))
+
+    def test_chained_parts_run_back_to_back(self):
+        cfg = _cfg()
+        cfg.scenarios[2].pods = ["p2"]
+        cfg.scenarios[2].estimated_runtime = 30
+        sched = backfill_schedule(create_schedule(cfg))
+        timeline = layout(sched, ["q1", "q2"])
+        spans = {p.run.name: (p.start, p.end) for p in timeline.placements}
+        self.assertEqual(spans["Next p2"], (0, 30))
+        self.assertEqual(spans["Short p2"], (30, 50))
+
+    def test_measured_durations_override_estimates(self):
+        timeline = layout(
+            create_schedule(_cfg()), ["q1", "q2"], {"Short_p2": 90}
+        )
+        self.assertEqual(timeline.barriers, [0, 90, 100])
+
+    def test_idle_gaps(self):
+        gaps = idle_gaps(layout(create_schedule(_cfg()), ["q1", "q2"]))
+        self.assertEqual(gaps["m2"], [[20, 60]])
+        self.assertNotIn("m1", gaps)
+
+
+class TestTraceEvents(unittest.TestCase):
+    def test_tracks_per_machine_and_queue(self):
+        doc = to_trace_events([create_schedule(_cfg())], _cfg())
+        names = {
+            e["args"]["name"] for e in doc["traceEvents"]
+            if e["name"] == "thread_name"
+        }
+        self.assertEqual(names, {
+            "machine m1", "machine m2", "machine l",
+            "queue q1", "queue q2",
+        })
+        phases = {e["cat"] for e in doc["traceEvents"] if "cat" in e}
+        self.assertEqual(phases, {"run", "idle", "barrier"})
+
+    def test_write_json_and_html(self):
+        sched = create_schedule(_cfg())
+        with tempfile.TemporaryDirectory() as tmp:
+            trace = os.path.join(tmp, "t.json")
+            page = os.path.join(tmp, "t.html")
+            write_timeline(trace, [sched], _cfg())
+            write_timeline(page, [sched], _cfg())
+            with open(trace, encoding="utf-8") as f:
+                self.assertIn("traceEvents", json.load(f))
+            with open(page, encoding="utf-8") as f:
+                text = f.read()
+            self.assertIn("<!DOCTYPE html>", text)
+            self.assertIn("Long p1", text)
+            self.assertNotIn("<script", text)
+
+
+
+class TestTraceRenderer(unittest.TestCase):
+    def test_matches_trace_of_the_schedule(self):
+        cfg = _cfg()
+        for sched in (create_schedule(cfg), backfill_schedule(create_schedule(cfg))):
+            out = io.StringIO()
+            TraceRenderer("YAML 1").write(
+                schedule_to_template_data(sched, cfg), out
+            )
+            events = json.loads(out.getvalue())["traceEvents"]
+            self.assertEqual(
+                events, to_trace_events([sched], cfg)["traceEvents"]
+            )
+            cats = {e.get("cat") for e in events}
+            self.assertTrue({"run", "idle", "barrier"} <= cats)
+
+    def test_data_layout_matches_layout(self):
+        cfg = _cfg()
+        sched = create_schedule(cfg)
+        expected = layout(sched, cfg.queues)
+        actual = data_layout(schedule_to_template_data(sched, cfg))
+        self.assertEqual(actual.barriers, expected.barriers)
+        self.assertEqual(idle_gaps(actual), idle_gaps(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+import tests  # noqa: F401  # ensures sys.path is set up
+
+from config_loader import ConfigError
+from models import ScenarioType
+from tests.test_scheduler import _config, _pod, _scn
+from whatif import apply_mutation, apply_variant, auto_variants, evaluate, sweep
+
+
+def _cfg():
+    # p1 and p2 share the load machine "l".
+    return _config(
+        pods=[
+            _pod("p1", "m1", load="l"),
+            _pod("p2", "m2", load="l"),
+            _pod("p3", "m3"),
+        ],
+        scenarios=[
+            _scn("A", ScenarioType.DUAL, ["p1", "p2"], runtime=60),
+            _scn("B", ScenarioType.SINGLE, ["p3"], runtime=40),
+        ],
+    )
+
+
+class TestMutations(unittest.TestCase):
+    def test_each_kind(self):
+        cfg = _cfg()
+        self.assertEqual(apply_mutation(cfg, "dup:l").pods["p2"].load, "l@p2")
+        self.assertEqual(len(apply_mutation(cfg, "queue:2").queues), 4)
+        self.assertEqual(apply_mutation(cfg, "yamls:3").target_yaml_count, 3)
+        self.assertEqual(
+            apply_mutation(cfg, "offset:4").schedule_offset_hours, 4
+        )
+        dropped = apply_mutation(cfg, "drop-pod:p3")
+        self.assertNotIn("p3", dropped.pods)
+        self.assertEqual([s.name for s in dropped.scenarios], ["A"])
+        # The input config is never modified.
+        self.assertEqual(len(cfg.queues), 2)
+        self.assertIn("p3", cfg.pods)
+
+    def test_combined_variant(self):
+        cfg = apply_variant(_cfg(), "dup:l+queue")
+        self.assertEqual(cfg.pods["p1"].load, "l@p1")
+        self.assertEqual(len(cfg.queues), 3)
+
+    def test_invalid(self):
+        for spec in ("dup:nope", "drop-pod:nope", "queue:0", "yamls:x",
+                     "offset:30", "bogus"):
+            with self.assertRaises(ConfigError, msg=spec):
+                apply_mutation(_cfg(), spec)
+
+    def test_auto_variants(self):
+        self.assertEqual(auto_variants(_cfg()), ["dup:l", "queue"])
+
+
+class TestSweep(unittest.TestCase):
+    def test_evaluate(self):
+        base = evaluate(_cfg(), "")
+        self.assertEqual(base.name, "(baseline)")
+        self.assertEqual(base.makespan, 120)
+        self.assertTrue(base.fits_cron)
+        self.assertEqual(evaluate(_cfg(), "dup:l").makespan, 100)
+
+    def test_parallel_matches_serial(self):
+        variants = ["dup:l", "queue", "yamls:2"]
+        serial = sweep(_cfg(), variants, jobs=1)
+        parallel = sweep(_cfg(), variants, jobs=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(
+            [r.name for r in serial], ["(baseline)"] + variants
+        )
+
+    def test_invalid_variant_fails_before_scheduling(self):
+        with self.assertRaises(ConfigError):
+            sweep(_cfg(), ["dup:l", "dup:nope"], jobs=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
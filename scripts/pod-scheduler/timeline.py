@@ -0,0 +1,326 @@
+"""
+Timeline export for computed schedules.
+
+Lays each split YAML out on a time axis, with one track per physical machine
+and one per service-bus queue, and writes it either as Chrome trace-event
+JSON (load in ``chrome://tracing`` or https://ui.perfetto.dev) or as a
+self-contained HTML Gantt chart for PR reviews.
+
+Runs start at their stage's barrier; chained parts start when their
+predecessor ends. By default durations are the estimates; pass measured or
+simulated minutes per job id to see where real runs drift from the plan.
+"""
+
+import html
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from generator import Renderer
+from models import ChainedRun, Run, Schedule, ScheduleConfig
+
+
+_US_PER_MINUTE = 60_000_000
+
+
+@dataclass
+class Placement:
+    """Where and when one AzDO job runs."""
+    name: str
+    job_id: str
+    machines: List[str]
+    stage: int
+    queue: str
+    start: float
+    end: float
+    # The run, when laid out from a schedule rather than from the IR.
+    run: Optional[Run] = None
+
+
+@dataclass
+class Timeline:
+    """A schedule laid out in minutes from pipeline start."""
+    placements: List[Placement]
+    # Stage start times, plus the end of the last stage.
+    barriers: List[float]
+
+    @property
+    def makespan(self) -> float:
+        return self.barriers[-1] if self.barriers else 0.0
+
+
+def layout(
+    schedule: Schedule,
+    queues: List[str],
+    durations: Optional[Dict[str, float]] = None,
+) -> Timeline:
+    """Place every job of ``schedule`` on the time axis.
+
+    ``durations`` maps job ids to minutes and overrides the estimate of the
+    jobs it names; each stage then lasts as long as its slowest lane.
+    """
+    durations = durations or {}
+    placements: List[Placement] = []
+    barriers = [0.0]
+    for index, stage in enumerate(schedule.stages):
+        start = barriers[-1]
+        stage_end = start
+        for lane, run in enumerate(stage.runs):
+            queue = queues[lane % len(queues)]
+            parts = run.parts if isinstance(run, ChainedRun) else [run]
+            clock = start
+            for part in parts:
+                minutes = durations.get(part.job_name, part.estimated_runtime)
+                placements.append(Placement(
+                    part.name, part.job_name, sorted(part.machines_used),
+                    index, queue, clock, clock + minutes, run=part,
+                ))
+                clock += minutes
+            stage_end = max(stage_end, clock)
+        barriers.append(stage_end)
+    return Timeline(placements=placements, barriers=barriers)
+
+
+def data_layout(data: Dict[str, Any]) -> Timeline:
+    """The timeline of a pipeline IR, from its estimated job offsets.
+
+    Matches :func:`layout` of the schedule the IR was built from (see
+    ``generator.schedule_to_template_data``) without needing it.
+    """
+    groups = data["groups"]
+    # Each group starts when its first jobs do; an empty one takes no time.
+    barriers = [float(data["makespan"])]
+    for group in reversed(groups):
+        barriers.insert(0, min(
+            (job["start"] for job in group["jobs"]), default=barriers[0]
+        ))
+    placements = [
+        Placement(job["name"], job["job_id"], list(job["machines"]), index,
+                  job["queue"], job["start"], job["end"])
+        for index, group in enumerate(groups) for job in group["jobs"]
+    ]
+    return Timeline(placements=placements, barriers=barriers)
+
+
+def idle_gaps(timeline: Timeline) -> Dict[str, List[List[float]]]:
+    """Per machine, the ``[start, end]`` spans it sits idle inside a stage.
+
+    Only stages in which the machine is used at all are considered, matching
+    how ``print_summary`` computes utilization.
+    """
+    busy: Dict[str, Dict[int, List[List[float]]]] = {}
+    for p in timeline.placements:
+        for machine in p.machines:
+            busy.setdefault(machine, {}).setdefault(p.stage, []).append(
+                [p.start, p.end]
+            )
+    gaps: Dict[str, List[List[float]]] = {}
+    for machine, stages in busy.items():
+        for stage, spans in sorted(stages.items()):
+            clock = timeline.barriers[stage]
+            for start, end in sorted(spans):
+                if start > clock:
+                    gaps.setdefault(machine, []).append([clock, start])
+                clock = max(clock, end)
+            if timeline.barriers[stage + 1] > clock:
+                gaps.setdefault(machine, []).append(
+                    [clock, timeline.barriers[stage + 1]]
+                )
+    return gaps
+
+
+def _tracks(timeline: Timeline, queues: List[str]) -> List[str]:
+    machines = sorted({m for p in timeline.placements for m in p.machines})
+    return [f"machine {m}" for m in machines] + [f"queue {q}" for q in queues]
+
+
+def _trace_events(
+    timeline: Timeline, queues: List[str], pid: int, label: str
+) -> Iterator[Dict]:
+    """Trace events of one split YAML: its jobs, idle gaps and barriers."""
+    tracks = _tracks(timeline, queues)
+    tid = {name: i for i, name in enumerate(tracks, start=1)}
+    yield {
+        "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+        "args": {"name": label},
+    }
+    for name, thread in tid.items():
+        yield {
+            "name": "thread_name", "ph": "M", "pid": pid, "tid": thread,
+            "args": {"name": name},
+        }
+        yield {
+            "name": "thread_sort_index", "ph": "M", "pid": pid,
+            "tid": thread, "args": {"sort_index": thread},
+        }
+    for p in timeline.placements:
+        args = {
+            "job": p.job_id,
+            "stage": p.stage + 1,
+            "queue": p.queue,
+            "minutes": p.end - p.start,
+        }
+        targets = [f"machine {m}" for m in sorted(p.machines)]
+        targets.append(f"queue {p.queue}")
+        for track in targets:
+            yield {
+                "name": p.name, "cat": "run", "ph": "X",
+                "ts": p.start * _US_PER_MINUTE,
+                "dur": (p.end - p.start) * _US_PER_MINUTE,
+                "pid": pid, "tid": tid[track], "args": args,
+            }
+    for machine, spans in sorted(idle_gaps(timeline).items()):
+        for start, end in spans:
+            yield {
+                "name": "idle", "cat": "idle", "ph": "X",
+                "ts": start * _US_PER_MINUTE,
+                "dur": (end - start) * _US_PER_MINUTE,
+                "pid": pid, "tid": tid[f"machine {machine}"],
+                "args": {"minutes": end - start},
+            }
+    for stage, ts in enumerate(timeline.barriers[:-1], start=1):
+        yield {
+            "name": f"stage {stage}", "cat": "barrier", "ph": "i",
+            "s": "p", "ts": ts * _US_PER_MINUTE, "pid": pid, "tid": 0,
+        }
+
+
+def to_trace_events(
+    schedules: List[Schedule],
+    config: ScheduleConfig,
+    durations: Optional[Dict[str, float]] = None,
+    labels: Optional[List[str]] = None,
+) -> Dict:
+    """Build a Chrome trace-event document; one process per split YAML."""
+    labels = labels or [f"YAML {i + 1}" for i in range(len(schedules))]
+    events: List[Dict] = []
+    for pid, sched in enumerate(schedules, start=1):
+        events.extend(_trace_events(
+            layout(sched, config.queues, durations), config.queues, pid,
+            labels[pid - 1],
+        ))
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def to_html(
+    schedules: List[Schedule],
+    config: ScheduleConfig,
+    durations: Optional[Dict[str, float]] = None,
+    labels: Optional[List[str]] = None,
+    px_per_minute: float = 2.0,
+) -> str:
+    """Render a self-contained HTML Gantt chart (no scripts, no CDN)."""
+    labels = labels or [f"YAML {i + 1}" for i in range(len(schedules))]
+    row = 22
+    label = 200
+    out: List[str] = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\">",
+        f"<title>{html.escape(config.name)} schedule</title>",
+        "<style>",
+        "body{font:12px sans-serif;margin:16px}",
+        ".g{position:relative;margin-bottom:24px}",
+        ".l{position:absolute;left:0;width:195px;overflow:hidden;"
+        "white-space:nowrap}",
+        ".b{position:absolute;height:18px;overflow:hidden;"
+        "white-space:nowrap;font-size:10px;box-sizing:border-box;"
+        "border:1px solid #246;background:#8ac;color:#012}",
+        ".i{position:absolute;height:18px;background:repeating-linear-"
+        "gradient(45deg,#eee,#eee 4px,#fff 4px,#fff 8px)}",
+        ".s{position:absolute;top:0;bottom:0;border-left:1px dashed #c33}",
+        "</style></head><body>",
+        f"<h1>{html.escape(config.name)}</h1>",
+    ]
+    for title, sched in zip(labels, schedules):
+        timeline = layout(sched, config.queues, durations)
+        tracks = _tracks(timeline, config.queues)
+        height = row * len(tracks)
+        width = label + timeline.makespan * px_per_minute + 20
+        out.append(
+            f"<h2>{html.escape(title)} &mdash; "
+            f"{timeline.makespan:.0f} min</h2>"
+        )
+        out.append(
+            f"<div class=\"g\" style=\"height:{height}px;width:{width:.0f}px\">"
+        )
+        for i, name in enumerate(tracks):
+            out.append(
+                f"<div class=\"l\" style=\"top:{i * row}px\">"
+                f"{html.escape(name)}</div>"
+            )
+        rows = {name: i for i, name in enumerate(tracks)}
+
+        def box(cls, track, start, end, text, title):
+            left = label + start * px_per_minute
+            w = max(1.0, (end - start) * px_per_minute)
+            out.append(
+                f"<div class=\"{cls}\" title=\"{html.escape(title)}\" "
+                f"style=\"top:{rows[track] * row}px;left:{left:.1f}px;"
+                f"width:{w:.1f}px\">{html.escape(text)}</div>"
+            )
+
+        for machine, spans in sorted(idle_gaps(timeline).items()):
+            for start, end in spans:
+                box("i", f"machine {machine}", start, end, "",
+                    f"idle {end - start:.0f} min")
+        for p in timeline.placements:
+            title = (f"{p.name}: stage {p.stage + 1}, "
+                     f"{p.start:.0f}-{p.end:.0f} min")
+            for m in sorted(p.machines):
+                box("b", f"machine {m}", p.start, p.end, p.name, title)
+            box("b", f"queue {p.queue}", p.start, p.end, p.name, title)
+        for ts in timeline.barriers:
+            out.append(
+                f"<div class=\"s\" style=\"left:"
+                f"{label + ts * px_per_minute:.1f}px\"></div>"
+            )
+        out.append("</div>")
+    out.append("</body></html>")
+    return "\n".join(out) + "\n"
+
+
+class TraceRenderer(Renderer):
+    """Writes a pipeline IR as Chrome trace-event JSON, one event per line.
+
+    The events are those :func:`to_trace_events` gives the schedule, laid
+    out by :func:`data_layout` from the estimated offsets stored in the IR,
+    so neither the schedule nor the config is needed.
+    """
+    extension = ".trace.json"
+
+    def __init__(self, label: str = "pipeline"):
+        self.label = label
+
+    def write(self, data: Dict[str, Any], out: TextIO) -> None:
+        out.write('{"displayTimeUnit": "ms", "traceEvents": [')
+        events = _trace_events(data_layout(data), data["queues"], 1,
+                               self.label)
+        for i, event in enumerate(events):
+            out.write(",\n" if i else "\n")
+            out.write(json.dumps(event))
+        out.write("\n]}\n")
+
+
+def load_durations(path: str) -> Dict[str, float]:
+    """Read measured or simulated ``{job_id: minutes}`` from JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {str(k): float(v) for k, v in data.items()}
+
+
+def write_timeline(
+    path: str,
+    schedules: List[Schedule],
+    config: ScheduleConfig,
+    durations: Optional[Dict[str, float]] = None,
+    labels: Optional[List[str]] = None,
+) -> None:
+    """Write HTML when ``path`` ends in ``.html``, trace-event JSON otherwise."""
+    with open(path, "w", newline="\n", encoding="utf-8") as f:
+        if path.lower().endswith((".html", ".htm")):
+            f.write(to_html(schedules, config, durations, labels))
+        else:
+            json.dump(
+                to_trace_events(schedules, config, durations, labels), f
+            )
+            f.write("\n")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+What-if capacity analysis.
+
+Schedules variants of a config, each with one or more candidate mutations
+applied, in parallel across a process pool, and tabulates makespan,
+utilization and cron fit so the payoff of new hardware or queues is known
+before buying it.
+
+Usage:
+    python whatif.py --config build/benchmarks_ci_pods.json \\
+        dup:gold-db queue dup:gold-db+queue drop-pod:gold-win yamls:3
+
+Mutations (combine several into one variant with ``+``):
+
+    dup:MACHINE     give every pod using MACHINE its own copy
+    queue[:N]       add N queues (default 1)
+    drop-pod:POD    remove a pod and all runs on it
+    yamls:N         split into N YAML files
+    offset:H        set schedule_offset_hours between split YAMLs
+
+``--auto`` adds one variant per machine duplication plus one extra queue.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from config_loader import ConfigError, load_config
+from explain import add_queue, duplicate_machine
+from freshness import cron_headroom
+from generator import GeneratorError
+from metrics import schedule_metrics
+from models import ScheduleConfig
+from schedule_diff import Revision, plan_outputs
+from scheduler import SchedulerError
+
+
+@dataclass
+class WhatIfResult:
+    """Scheduling outcome of one variant."""
+    name: str
+    makespan: float
+    total_minutes: float
+    # Busy time over the stage time of the machines' stages, all machines.
+    utilization: float
+    # Smallest headroom before the next cron trigger; negative = overrun.
+    headroom: float
+    yaml_count: int
+
+    @property
+    def fits_cron(self) -> bool:
+        return self.headroom >= 0
+
+
+def apply_mutation(config: ScheduleConfig, spec: str) -> ScheduleConfig:
+    """Return a copy of ``config`` with one ``KIND[:ARG]`` mutation applied."""
+    kind, _, arg = spec.partition(":")
+    if kind == "dup":
+        machines = {
+            m for pod in config.pods.values()
+            for m in (pod.sut, pod.load, pod.db) if m
+        }
+        if arg not in machines:
+            raise ConfigError(f"What-if {spec!r}: unknown machine {arg!r}")
+        return duplicate_machine(config, arg)
+    if kind == "queue":
+        count = 1 if not arg else int(arg) if arg.isdigit() else 0
+        if count < 1:
+            raise ConfigError(f"What-if {spec!r}: expected queue[:N], N >= 1")
+        for _ in range(count):
+            config = add_queue(config)
+        return config
+    if kind == "drop-pod":
+        if arg not in config.pods:
+            raise ConfigError(f"What-if {spec!r}: unknown pod {arg!r}")
+        scenarios = []
+        for scenario in config.scenarios:
+            pods = [p for p in scenario.pods if p != arg]
+            if pods:
+                scenarios.append(replace(
+                    scenario,
+                    pods=pods,
+                    fallback_pods=[
+                        p for p in scenario.fallback_pods if p != arg
+                    ],
+                ))
+        pods = {n: p for n, p in config.pods.items() if n != arg}
+        return replace(config, pods=pods, scenarios=scenarios)
+    if kind == "yamls":
+        if not arg.isdigit() or int(arg) < 1:
+            raise ConfigError(f"What-if {spec!r}: expected yamls:N, N >= 1")
+        return replace(config, target_yaml_count=int(arg))
+    if kind == "offset":
+        if not arg.isdigit() or int(arg) > 23:
+            raise ConfigError(f"What-if {spec!r}: expected offset:H, 0-23")
+        return replace(config, schedule_offset_hours=int(arg))
+    raise ConfigError(
+        f"Unknown what-if mutation {spec!r}; expected dup:MACHINE, "
+        f"queue[:N], drop-pod:POD, yamls:N or offset:H"
+    )
+
+
+def apply_variant(config: ScheduleConfig, variant: str) -> ScheduleConfig:
+    """Apply every ``+``-separated mutation of ``variant`` in order."""
+    for spec in variant.split("+"):
+        if spec:
+            config = apply_mutation(config, spec)
+    return config
+
+
+def evaluate(
+    config: ScheduleConfig,
+    variant: str,
+    strict: bool = True,
+) -> WhatIfResult:
+    """Schedule one variant (``""`` is the unchanged baseline)."""
+    mutated = apply_variant(config, variant)
+    outputs = plan_outputs(mutated, strict=strict)
+    revision = Revision(label=variant, config=mutated, outputs=outputs)
+    busy = total = 0.0
+    for out_config, schedules, _ in outputs:
+        for values in schedule_metrics(out_config, schedules)[
+            "machines"
+        ].values():
+            busy += values["busy_minutes"]
+            total += values["total_minutes"]
+    headroom = cron_headroom(outputs, mutated.schedule_offset_hours)
+    return WhatIfResult(
+        name=variant or "(baseline)",
+        makespan=revision.makespan,
+        total_minutes=revision.total_minutes,
+        utilization=busy / total if total else 0.0,
+        headroom=min(headroom.values(), default=0.0),
+        yaml_count=sum(len(s) for _, s, _ in outputs),
+    )
+
+
+def auto_variants(config: ScheduleConfig) -> List[str]:
+    """One variant per machine shared by several pods, plus one more queue."""
+    users = {}
+    for pod in config.pods.values():
+        for m in {pod.sut, pod.load, pod.db} - {None}:
+            users.setdefault(m, set()).add(pod.name)
+    shared = sorted(m for m, pods in users.items() if len(pods) > 1)
+    return [f"dup:{m}" for m in shared] + ["queue"]
+
+
+def sweep(
+    config: ScheduleConfig,
+    variants: List[str],
+    jobs: Optional[int] = None,
+    strict: bool = True,
+) -> List[WhatIfResult]:
+    """Evaluate the baseline and every variant, in parallel when ``jobs != 1``.
+
+    Variants are validated up front so a typo fails fast instead of inside a
+    worker. Results keep the order of ``variants``, baseline first.
+    """
+    for variant in variants:
+        apply_variant(config, variant)
+    names = [""] + list(variants)
+    if jobs == 1 or len(names) == 1:
+        return [evaluate(config, v, strict) for v in names]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(
+            evaluate,
+            [config] * len(names), names, [strict] * len(names),
+        ))
+
+
+def print_sweep(results: List[WhatIfResult]) -> None:
+    """Print the sweep as a table, with deltas against the baseline."""
+    base = results[0]
+    print(f"{'Variant':<36} {'YAMLs':>5} {'Makespan':>9} {'Delta':>6} "
+          f"{'Util':>6} {'Headroom':>9}  Cron")
+    print("-" * 84)
+    for r in results:
+        delta = r.makespan - base.makespan
+        print(f"{r.name:<36} {r.yaml_count:>5} {r.makespan:>7.0f}m "
+              f"{delta:>+5.0f}m {r.utilization * 100:>5.1f}% "
+              f"{r.headroom:>+8.0f}m  {'fits' if r.fits_cron else 'OVERRUN'}")
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Schedule capacity variants of a pod-scheduler config"
+    )
+    parser.add_argument(
+        "--config", required=True,
+        help="Path to JSON configuration file"
+    )
+    parser.add_argument(
+        "variants", nargs="*", metavar="VARIANT",
+        help="Mutations such as dup:gold-db, queue, queue:2, "
+             "drop-pod:gold-win, yamls:3, offset:4; join with + to combine"
+    )
+    parser.add_argument(
+        "--auto", action="store_true",
+        help="Also try duplicating every shared machine and one more queue"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(),
+        help="Worker processes (default: CPU count; 1 runs in-process)"
+    )
+    parser.add_argument(
+        "--lenient", action="store_true",
+        help="Warn instead of fail on unknown or invalid pod references"
+    )
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    try:
+        config = load_config(args.config)
+        variants = list(args.variants)
+        if args.auto:
+            variants += [v for v in auto_variants(config) if v not in variants]
+        results = sweep(config, variants, args.jobs, not args.lenient)
+        print_sweep(results)
+        return 0
+    except (ConfigError, SchedulerError, GeneratorError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())